@@ -0,0 +1,320 @@
+"""Benchmarks de las operaciones principales del sistema de reservaciones.
+
+Genera datos sintéticos (hoteles, clientes y reservaciones) a distintas
+escalas, mide cada operación y escribe los resultados en JSON para poder
+compararlos entre commits::
+
+    python bench/bench.py --scales 1000,10000 --output base.json
+    python bench/bench.py --scales 1000,10000 --compare base.json
+
+La escala es el número de reservaciones; hay una décima parte de
+clientes y una centésima de hoteles. Cada escala corre en un directorio
+temporal propio.
+
+``--startup N`` mide además el tiempo de arranque de ``src/cli.py``
+(proceso nuevo por consulta) con N corridas de cada comando sobre los
+datos de la escala más grande::
+
+    python bench/bench.py --scales 100000 --ops 1 --startup 20
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+# pylint: disable=wrong-import-position
+import repository  # noqa: E402
+from customer import Customer  # noqa: E402
+from hotel import Hotel  # noqa: E402
+from reservation import Reservation  # noqa: E402
+
+FIRST_DAY = date(2025, 1, 1)
+MEMORY_SAMPLES = 5
+CLI = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'cli.py'
+)
+
+
+def written_bytes():
+    """Bytes escritos por el proceso (Linux), o None si no se sabe."""
+    try:
+        with open("/proc/self/io", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def stay(rng):
+    """Fechas de una estancia aleatoria de 1 a 3 noches en un año."""
+    check_in = FIRST_DAY + timedelta(days=rng.randrange(365))
+    check_out = check_in + timedelta(days=rng.randint(1, 3))
+    return check_in.isoformat(), check_out.isoformat()
+
+
+def populate(scale, rng):
+    """Carga los datos sintéticos con las operaciones masivas."""
+    hotels = max(1, scale // 100)
+    customers = max(1, scale // 10)
+    Hotel.create_hotels(
+        {"hotel_id": f"H{i}", "name": f"Hotel {i}", "location": f"L{i % 50}",
+         "total_rooms": 100}
+        for i in range(hotels)
+    )
+    Customer.create_customers(
+        {"customer_id": f"C{i}", "name": f"Cliente {i}",
+         "email": f"c{i}@x.com", "phone": "555"}
+        for i in range(customers)
+    )
+    records = []
+    for i in range(scale):
+        check_in, check_out = stay(rng)
+        records.append({
+            "reservation_id": f"R{i}", "customer_id": f"C{i % customers}",
+            "hotel_id": f"H{i % hotels}", "check_in": check_in,
+            "check_out": check_out,
+        })
+    Reservation.create_reservations(records)
+    return hotels, customers
+
+
+def operations(scale, hotels, customers, rng):
+    """Operaciones a medir: nombre -> función que recibe el número i."""
+    def random_stay(_):
+        return stay(rng)
+
+    def create_reservation(i):
+        check_in, check_out = random_stay(i)
+        Reservation.create_reservation(
+            f"BR{i}", f"C{rng.randrange(customers)}",
+            f"H{rng.randrange(hotels)}", check_in, check_out,
+        )
+
+    def reserve_room(i):
+        check_in, check_out = random_stay(i)
+        Hotel.reserve_room(
+            f"H{rng.randrange(hotels)}", f"BX{i}", "C0", check_in, check_out
+        )
+
+    return {
+        "create_hotel": lambda i: Hotel.create_hotel(
+            f"BH{i}", "Bench", "L0", 10
+        ),
+        "display_hotel": lambda i: Hotel.display_hotel(
+            f"H{rng.randrange(hotels)}"
+        ),
+        "display_customer": lambda i: Customer.display_customer(
+            f"C{rng.randrange(customers)}"
+        ),
+        "display_reservation": lambda i: Reservation.display_reservation(
+            f"R{rng.randrange(scale)}"
+        ),
+        "reserve_room": reserve_room,
+        "create_reservation": create_reservation,
+        "cancel_reservation": lambda i: Reservation.cancel_reservation(
+            f"BR{i}"
+        ),
+    }
+
+
+def percentile(values, fraction):
+    """Percentil de una lista ya ordenada."""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def measure(operation, count, offset):
+    """Mide latencias, throughput, memoria y bytes escritos."""
+    latencies = []
+    before = written_bytes()
+    start = time.perf_counter()
+    for i in range(count):
+        t0 = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    after = written_bytes()
+    tracemalloc.start()
+    for i in range(offset, offset + MEMORY_SAMPLES):
+        operation(i)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    latencies.sort()
+    return {
+        "count": count,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "ops_per_s": count / elapsed if elapsed else None,
+        "peak_bytes": peak,
+        "bytes_written_per_op": (
+            None if before is None else (after - before) / count
+        ),
+    }
+
+
+def run_scale(scale, count, storage="json", seed=1):
+    """Corre todas las mediciones de una escala en un directorio temporal."""
+    rng = random.Random(seed)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            repository.configure(storage)
+            # Los mensajes (p. ej. hotel lleno) no son parte de la medición.
+            logging.disable(logging.WARNING)
+            start = time.perf_counter()
+            hotels, customers = populate(scale, rng)
+            result = {"populate_s": time.perf_counter() - start}
+            for name, operation in operations(
+                scale, hotels, customers, rng
+            ).items():
+                # Los números de memoria usan IDs distintos (offset).
+                result[name] = measure(operation, count, count)
+        finally:
+            logging.disable(logging.NOTSET)
+            repository.configure("json")
+            os.chdir(cwd)
+    return result
+
+
+def startup_commands(scale):
+    """Comandos de ``cli`` a medir: nombre -> argumentos."""
+    hotels = max(1, scale // 100)
+    return {
+        "python": None,
+        "hotel_show": ["hotel", "show", f"H{hotels - 1}"],
+        "customer_show": ["customer", "show", "C0"],
+        "reservation_show": ["reservation", "show", f"R{scale - 1}"],
+        "reservation_list_hotel": ["reservation", "list", "--hotel", "H0"],
+    }
+
+
+def time_process(argv, runs):
+    """Latencias (p50/p95) de correr ``argv`` como proceso nuevo."""
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, check=True, stdout=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "runs": runs,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+
+def run_startup(scale, runs, seed=1):
+    """Mide el arranque de ``cli`` (un proceso por consulta).
+
+    ``python`` es el intérprete solo, como referencia. La primera
+    corrida de cada comando arma el índice de posiciones y no se cuenta.
+    """
+    rng = random.Random(seed)
+    cwd = os.getcwd()
+    result = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            repository.configure("json")
+            logging.disable(logging.WARNING)
+            populate(scale, rng)
+            repository.reset_repositories()
+            for name, args in startup_commands(scale).items():
+                if args is None:
+                    argv = [sys.executable, "-c", "pass"]
+                else:
+                    argv = [sys.executable, CLI, *args]
+                    subprocess.run(argv, check=True,
+                                   stdout=subprocess.DEVNULL)
+                result[name] = time_process(argv, runs)
+        finally:
+            logging.disable(logging.NOTSET)
+            os.chdir(cwd)
+    return result
+
+
+def git_commit():
+    """Commit actual del repositorio, si se puede saber."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    """Imprime el cambio de p50 y throughput contra otra corrida."""
+    for scale, ops in current["results"].items():
+        base_ops = baseline["results"].get(scale, {})
+        for name, stats in ops.items():
+            base = base_ops.get(name)
+            if not isinstance(stats, dict) or not isinstance(base, dict):
+                continue
+            change = (stats["p50_ms"] / base["p50_ms"] - 1) * 100
+            print(f"{scale:>8} {name:<20} p50 {stats['p50_ms']:9.3f} ms "
+                  f"({change:+.1f}%)")
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1000,10000",
+                        help="escalas separadas por coma (p. ej. "
+                             "1000,10000,100000,1000000)")
+    parser.add_argument("--ops", type=int, default=200,
+                        help="repeticiones de cada operación")
+    parser.add_argument("--storage", default="json",
+                        choices=["json", "wal", "binary", "sqlite",
+                                 "sharded"])
+    parser.add_argument("--output", help="archivo JSON de resultados")
+    parser.add_argument("--compare", help="resultados previos a comparar")
+    parser.add_argument("--startup", type=int, default=0,
+                        help="corridas para medir el arranque de cli.py")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "storage": args.storage,
+        "timestamp": time.time(),
+        "results": {},
+    }
+    scales = [int(s) for s in args.scales.split(",")]
+    for scale in scales:
+        report["results"][str(scale)] = run_scale(
+            scale, args.ops, args.storage
+        )
+    if args.startup:
+        report["startup"] = run_startup(max(scales), args.startup)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+"""Ocupación, llegadas, salidas y duración de estancia por hotel.
+
+Los cálculos se hacen sobre las columnas de ``columnar`` (hotel y fechas
+como enteros): cada reservación suma +1 en la noche de llegada y -1 en
+la de salida de su hotel (una cuadrícula hoteles x días) y la ocupación
+de cada noche es la suma acumulada de cada renglón. Las llegadas,
+salidas, estancias y noches vendidas son conteos por día o por hotel;
+``revenue`` los multiplica por la tarifa de cada hotel.
+
+Las reservaciones con fechas que no se pueden contar (que no son
+'YYYY-MM-DD' o con salida antes de la llegada) se saltan; sus IDs quedan
+en ``skipped``.
+
+Con NumPy (opcional) todo se hace con operaciones sobre arreglos; sin
+NumPy se usan ``array`` y ciclos de Python, con los mismos resultados.
+
+El reporte se actualiza por partes: ``update`` agrega o cambia
+reservaciones y ``remove`` las quita, restando y sumando solo lo que
+cambió en lugar de recalcular todo::
+
+    report = ReservationAnalytics.load()
+    report.summary("2025-01-01", "2025-02-01")
+    report.update([reservation.to_dict()])
+"""
+
+import functools
+from array import array
+from datetime import date
+
+import stream
+from columnar import MISSING_DATE, HotelTable, ReservationTable, StringPool
+from hotel import HOTELS_FILE
+from occupancy import to_ordinal
+from reservation import RESERVATIONS_FILE
+
+try:
+    import numpy
+except ImportError:  # NumPy es opcional.
+    numpy = None
+
+# Días de más al agrandar la cuadrícula, para no rehacerla con cada fecha.
+SLACK_DAYS = 64
+# Estado de cada renglón de la tabla de reservaciones. UNDATED: de un
+# hotel conocido pero sin fechas; no ocupa ninguna noche del reporte.
+NEW, COUNTED, ORPHAN, REMOVED, UNDATED = 0, 1, 2, 3, 4
+
+
+def _iso(ordinal):
+    """Fecha 'YYYY-MM-DD' de un número de día."""
+    return date.fromordinal(ordinal).isoformat()
+
+
+@functools.lru_cache(maxsize=4096)
+def _day(value):
+    """Número de día de una fecha; se repiten mucho entre reservaciones."""
+    return to_ordinal(value)
+
+
+def _countable(data):
+    """Indica si las fechas de la reservación se pueden contar.
+
+    Las que no tienen fechas sí (ver UNDATED).
+    """
+    try:
+        first, last = data["check_in"], data["check_out"]
+        if first is None and last is None:
+            return True
+        return _day(first) <= _day(last)
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def _filtered(records, skipped):
+    """Las reservaciones que se pueden contar; los IDs del resto a skipped."""
+    for data in records:
+        if _countable(data):
+            yield data
+        else:
+            skipped.append(data.get("reservation_id"))
+
+
+def _zeros(count):
+    """Arreglo de enteros en cero."""
+    if numpy is not None:
+        return numpy.zeros(count, dtype=numpy.int64)
+    return array("q", bytes(8 * count))
+
+
+# Las columnas por hotel y por día son paralelas y se recorren juntas en
+# los ciclos de ``_accumulate``; agruparlas solo agregaría indirección.
+class ReservationAnalytics:  # pylint: disable=too-many-instance-attributes
+    """Agregados de ocupación sobre tablas de hoteles y reservaciones.
+
+    Las dos tablas deben compartir el ``StringPool``. Las reservaciones
+    de hoteles que no están en la tabla de hoteles no se cuentan hasta
+    que el hotel se agregue con ``add_hotels``; las que no tienen fechas
+    no se cuentan.
+    """
+
+    def __init__(self, hotels, reservations):
+        """Calcula los agregados de las tablas dadas."""
+        if hotels.pool is not reservations.pool:
+            raise ValueError("Las tablas deben compartir el StringPool.")
+        self.hotels = hotels
+        self.reservations = reservations
+        self.origin = None
+        self.days = 0
+        self._hotel_rows = {}
+        self._lookup = None
+        self._grid = (numpy.zeros((0, 0), dtype=numpy.int32)
+                      if numpy is not None else [])
+        self._arrivals = _zeros(0)
+        self._departures = _zeros(0)
+        self._stays = _zeros(0)
+        self._nights = _zeros(0)
+        self._state = bytearray()
+        self._occupancy = None
+        self.skipped = []
+        self._register_hotels()
+        self.refresh()
+
+    @classmethod
+    def from_records(cls, hotels, reservations):
+        """Reporte a partir de diccionarios con el formato ``to_dict``."""
+        pool = StringPool()
+        skipped = []
+        report = cls(
+            HotelTable.from_records(hotels, pool),
+            ReservationTable.from_records(
+                _filtered(reservations, skipped), pool
+            ),
+        )
+        report.skipped = skipped
+        return report
+
+    @classmethod
+    def load(cls, hotels_path=HOTELS_FILE,
+             reservations_path=RESERVATIONS_FILE):
+        """Reporte leyendo los archivos JSON registro por registro."""
+        return cls.from_records(
+            (value for _, value in stream.iter_records(hotels_path)),
+            (value for _, value in stream.iter_records(reservations_path)),
+        )
+
+    # --- Mantenimiento de la cuadrícula ---
+
+    def _register_hotels(self):
+        """Da renglón en la cuadrícula a los hoteles nuevos de la tabla."""
+        column = self.hotels.columns["hotel_id"]
+        for row in range(len(self._hotel_rows), len(column)):
+            self._hotel_rows[column[row]] = row
+        added = len(column) - len(self._stays)
+        if added <= 0:
+            return
+        if numpy is not None:
+            self._grid = numpy.vstack([
+                self._grid,
+                numpy.zeros((added, self.days), dtype=numpy.int32),
+            ])
+            self._stays = numpy.concatenate([self._stays, _zeros(added)])
+            self._nights = numpy.concatenate([self._nights, _zeros(added)])
+        else:
+            self._grid.extend(_zeros(self.days) for _ in range(added))
+            self._stays.extend(_zeros(added))
+            self._nights.extend(_zeros(added))
+        self._lookup = None
+        self._occupancy = None
+
+    def _hotel_index(self, hotel_ids):
+        """Renglón de hotel de cada ID internado (-1 si no existe)."""
+        if numpy is None:
+            return [self._hotel_rows.get(h, -1) for h in hotel_ids]
+        size = len(self.hotels.pool)
+        current = 0 if self._lookup is None else len(self._lookup)
+        if current < size:
+            # Crece al doble: el pool crece con cada reservación nueva.
+            self._lookup = numpy.full(max(size, 2 * current), -1,
+                                      dtype=numpy.int64)
+            keys = numpy.fromiter(self._hotel_rows, dtype=numpy.int64,
+                                  count=len(self._hotel_rows))
+            self._lookup[keys] = numpy.fromiter(
+                self._hotel_rows.values(), dtype=numpy.int64,
+                count=len(self._hotel_rows),
+            )
+        return self._lookup[hotel_ids]
+
+    def _cover(self, first, last):
+        """Agranda la cuadrícula para que incluya los días first..last."""
+        if self.origin is None:
+            self.origin = first
+        end = self.origin + self.days
+        if first >= self.origin and last < end:
+            return
+        origin = self.origin if first >= self.origin else first - SLACK_DAYS
+        end = end if last < end else last + 1 + SLACK_DAYS
+        before, days = self.origin - origin, end - origin
+        after = days - before - self.days
+        if numpy is not None:
+            grid = numpy.zeros((len(self._stays), days), dtype=numpy.int32)
+            grid[:, before:before + self.days] = self._grid
+            self._grid = grid
+            self._arrivals = numpy.concatenate(
+                [_zeros(before), self._arrivals, _zeros(after)]
+            )
+            self._departures = numpy.concatenate(
+                [_zeros(before), self._departures, _zeros(after)]
+            )
+        else:
+            self._grid = [
+                _zeros(before) + row + _zeros(after) for row in self._grid
+            ]
+            self._arrivals = _zeros(before) + self._arrivals + _zeros(after)
+            self._departures = (_zeros(before) + self._departures
+                                + _zeros(after))
+        self.origin, self.days = origin, days
+
+    def _columns(self, rows):
+        """(hotel, check_in, check_out) de los renglones dados."""
+        columns = self.reservations.columns
+        names = ("hotel_id", "check_in", "check_out")
+        if numpy is None:
+            return [[columns[name][row] for row in rows] for name in names]
+        rows = numpy.asarray(rows, dtype=numpy.int64)
+        return [
+            numpy.frombuffer(columns[name], dtype=numpy.int64)[rows]
+            for name in names
+        ]
+
+    def _accumulate(self, rows, sign):
+        """Suma (sign=1) o resta (sign=-1) las reservaciones de ``rows``.
+
+        Al sumar, las de hoteles desconocidos quedan como ORPHAN y las
+        que no tienen fechas como UNDATED.
+        """
+        hotel_ids, check_in, check_out = self._columns(rows)
+        hotel_rows = self._hotel_index(hotel_ids)
+        if numpy is not None:
+            known = hotel_rows >= 0
+            dated = (check_in != MISSING_DATE) & (check_out != MISSING_DATE)
+            if sign > 0:
+                rows = numpy.asarray(rows, dtype=numpy.int64)
+                state = numpy.frombuffer(self._state, dtype=numpy.uint8)
+                state[rows[known & dated]] = COUNTED
+                state[rows[known & ~dated]] = UNDATED
+                state[rows[~known]] = ORPHAN
+                del state
+            known &= dated
+            hotel_rows = hotel_rows[known]
+            check_in, check_out = check_in[known], check_out[known]
+            if not hotel_rows.size:
+                return
+            self._cover(int(check_in.min()), int(check_out.max()))
+            first, last = check_in - self.origin, check_out - self.origin
+            numpy.add.at(self._grid, (hotel_rows, first), sign)
+            numpy.add.at(self._grid, (hotel_rows, last), -sign)
+            numpy.add.at(self._arrivals, first, sign)
+            numpy.add.at(self._departures, last, sign)
+            numpy.add.at(self._stays, hotel_rows, sign)
+            numpy.add.at(self._nights, hotel_rows, sign * (last - first))
+        else:
+            records = []
+            for row, hotel, first, last in zip(rows, hotel_rows, check_in,
+                                               check_out):
+                dated = MISSING_DATE not in (first, last)
+                if sign > 0:
+                    self._state[row] = (
+                        ORPHAN if hotel < 0
+                        else COUNTED if dated else UNDATED
+                    )
+                if hotel >= 0 and dated:
+                    records.append((hotel, first, last))
+            if not records:
+                return
+            self._cover(min(r[1] for r in records),
+                        max(r[2] for r in records))
+            for hotel, first, last in records:
+                first -= self.origin
+                last -= self.origin
+                self._grid[hotel][first] += sign
+                self._grid[hotel][last] -= sign
+                self._arrivals[first] += sign
+                self._departures[last] += sign
+                self._stays[hotel] += sign
+                self._nights[hotel] += sign * (last - first)
+        self._occupancy = None
+
+    # --- Cambios ---
+
+    def refresh(self):
+        """Cuenta los renglones que se agregaron a la tabla desde antes."""
+        start = len(self._state)
+        end = len(self.reservations)
+        if end > start:
+            self._state.extend(bytes(end - start))
+            self._accumulate(range(start, end), 1)
+
+    def add_hotels(self, records):
+        """Agrega (o actualiza) hoteles y cuenta sus reservaciones."""
+        self.hotels.extend(records)
+        self._register_hotels()
+        orphans = [row for row, state in enumerate(self._state)
+                   if state == ORPHAN]
+        if orphans:
+            self._accumulate(orphans, 1)
+
+    def _forget(self, row):
+        """Resta un renglón contado; regresa True si estaba contado."""
+        if self._state[row] == COUNTED:
+            self._accumulate([row], -1)
+        counted = self._state[row] in (COUNTED, ORPHAN, UNDATED)
+        self._state[row] = REMOVED
+        return counted
+
+    def update(self, records):
+        """Agrega reservaciones nuevas o reemplaza las que cambiaron.
+
+        Las que no se pueden contar se saltan (``skipped``) y, si ya
+        estaban, siguen con sus datos anteriores.
+        """
+        changed = {}
+        for data in _filtered(records, self.skipped):
+            row = self.reservations.row_of(data["reservation_id"])
+            if row is not None and row < len(self._state):
+                self._forget(row)
+                changed[row] = None
+            self.reservations.append(data)
+        if changed:
+            self._accumulate(list(changed), 1)
+        self.refresh()
+
+    def remove(self, reservation_ids):
+        """Quita reservaciones (canceladas); regresa cuántas quitó."""
+        removed = 0
+        for reservation_id in reservation_ids:
+            row = self.reservations.row_of(reservation_id)
+            if row is not None and row < len(self._state):
+                removed += self._forget(row)
+        return removed
+
+    # --- Consultas ---
+
+    def _occupied(self):
+        """Habitaciones ocupadas por hotel y noche (suma acumulada)."""
+        if self._occupancy is None:
+            if numpy is not None:
+                self._occupancy = self._grid.cumsum(axis=1,
+                                                    dtype=numpy.int32)
+            else:
+                self._occupancy = []
+                for row in self._grid:
+                    total = 0
+                    occupied = array("q")
+                    for change in row:
+                        total += change
+                        occupied.append(total)
+                    self._occupancy.append(occupied)
+        return self._occupancy
+
+    def _hotel_row(self, hotel_id):
+        """Renglón del hotel, o None si no está en el reporte."""
+        return self.hotels.row_of(hotel_id)
+
+    def _by_day(self, values):
+        """{fecha: valor} de los días con valor distinto de cero."""
+        return {
+            _iso(self.origin + day): int(value)
+            for day, value in enumerate(values) if value
+        }
+
+    def occupancy(self, hotel_id):
+        """Habitaciones ocupadas por noche: {fecha: habitaciones}."""
+        row = self._hotel_row(hotel_id)
+        if row is None or not self.days:
+            return {}
+        return self._by_day(self._occupied()[row])
+
+    def occupancy_rate(self, hotel_id):
+        """Fracción de habitaciones ocupadas por noche: {fecha: tasa}."""
+        row = self._hotel_row(hotel_id)
+        if row is None:
+            return {}
+        rooms = self.hotels.columns["total_rooms"][row]
+        return {
+            night: occupied / rooms
+            for night, occupied in self.occupancy(hotel_id).items()
+        }
+
+    def arrivals(self):
+        """Llegadas por día en todos los hoteles: {fecha: llegadas}."""
+        return self._by_day(self._arrivals)
+
+    def departures(self):
+        """Salidas por día en todos los hoteles: {fecha: salidas}."""
+        return self._by_day(self._departures)
+
+    def average_length_of_stay(self, hotel_id=None):
+        """Noches promedio por reservación (de un hotel o de todos).
+
+        None si no hay reservaciones.
+        """
+        if hotel_id is None:
+            stays, nights = sum(self._stays), sum(self._nights)
+        else:
+            row = self._hotel_row(hotel_id)
+            if row is None:
+                return None
+            stays, nights = self._stays[row], self._nights[row]
+        return int(nights) / int(stays) if stays else None
+
+    def _window(self, first, last):
+        """Columnas [inicio, fin) de la cuadrícula para las fechas dadas.
+
+        Sin fechas: de la primera llegada a la última salida.
+        """
+        origin = self.origin or 0
+        if first is None:
+            start = next((day for day, count in enumerate(self._arrivals)
+                          if count), 0)
+        else:
+            start = to_ordinal(first) - origin
+        if last is None:
+            end = next((self.days - 1 - day
+                        for day, count in enumerate(reversed(self._departures))
+                        if count), 0)
+        else:
+            end = to_ordinal(last) - origin
+        return start, end
+
+    def summary(self, first=None, last=None):
+        """Resumen por hotel entre las noches ``first`` y ``last`` (sin ella).
+
+        Cada hotel trae ``reservations``, ``room_nights`` (noches vendidas
+        en el periodo), ``occupancy_rate`` del periodo y
+        ``average_length_of_stay``. Sin fechas, el periodo va de la primera
+        llegada a la última salida.
+        """
+        start, end = self._window(first, last)
+        nights = max(0, end - start)
+        start, end = max(0, start), max(0, min(end, self.days))
+        occupied = self._occupied()
+        if numpy is not None:
+            room_nights = (
+                occupied[:, start:end].sum(axis=1, dtype=numpy.int64)
+                if end > start else _zeros(len(self._stays))
+            )
+        else:
+            room_nights = [sum(row[start:end]) for row in occupied]
+        pool = self.hotels.pool.strings
+        total_rooms = self.hotels.columns["total_rooms"]
+        result = []
+        for row, hotel_id in enumerate(self.hotels.columns["hotel_id"]):
+            stays = int(self._stays[row])
+            capacity = total_rooms[row] * nights
+            result.append({
+                "hotel_id": pool[hotel_id],
+                "reservations": stays,
+                "room_nights": int(room_nights[row]),
+                "occupancy_rate": (int(room_nights[row]) / capacity
+                                   if capacity else None),
+                "average_length_of_stay": (
+                    int(self._nights[row]) / stays if stays else None
+                ),
+            })
+        return result
+
+    def revenue(self, rates, first=None, last=None):
+        """Ingresos por hotel en el periodo (como en ``summary``).
+
+        ``rates`` es {hotel_id: tarifa por noche}; los hoteles sin tarifa
+        no se incluyen. Cada hotel trae ``room_nights``, ``revenue``
+        (noches vendidas por tarifa) y ``revpar`` (ingreso por habitación
+        disponible por noche).
+        """
+        result = []
+        for row in self.summary(first, last):
+            rate = rates.get(row["hotel_id"])
+            if rate is None:
+                continue
+            occupied = row["occupancy_rate"]
+            result.append({
+                "hotel_id": row["hotel_id"],
+                "room_nights": row["room_nights"],
+                "revenue": row["room_nights"] * rate,
+                "revpar": None if occupied is None else occupied * rate,
+            })
+        return result
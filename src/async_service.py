@@ -0,0 +1,217 @@
+"""Fachada asyncio para el sistema de reservaciones.
+
+Las operaciones de ``Hotel``, ``Customer`` y ``Reservation`` hacen E/S
+bloqueante, así que aquí se ejecutan en un solo hilo de trabajo
+(``ServiceRunner``) para no bloquear el event loop:
+
+* Las lecturas iguales que llegan al mismo tiempo (mismo método y mismos
+  argumentos) comparten una sola ejecución.
+* Las escrituras se hacen en memoria (ver ``transaction.begin_batch``) y
+  se escriben a disco juntas en un solo flush. Cada llamada regresa hasta
+  que su cambio ya está en disco.
+
+Uso::
+
+    async with ServiceRunner() as runner:
+        hotels = AsyncHotelService(runner)
+        await hotels.create_hotel("H1", "Hotel", "Cuernavaca", 10)
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from customer import Customer
+from hotel import Hotel
+from reservation import Reservation
+from transaction import begin_batch, end_batch, flush_batch
+
+
+class ServiceRunner:
+    """Hilo único donde corren las operaciones y los flushes."""
+
+    def __init__(self):
+        """Prepara el hilo; los lotes empiezan con ``start``."""
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="reservations"
+        )
+        self._reads = {}
+        self._flush = None
+        self._written = 0  # escrituras hechas (solo en el hilo)
+        self._flushed = 0  # escrituras ya en disco
+        self._started = False
+
+    async def _call(self, fn, *args, **kwargs):
+        """Ejecuta ``fn`` en el hilo de trabajo."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def start(self):
+        """Activa la escritura por lotes."""
+        if not self._started:
+            await self._call(begin_batch)
+            self._started = True
+
+    async def close(self):
+        """Escribe lo pendiente, termina los lotes y cierra el hilo."""
+        if self._started:
+            await self._call(end_batch)
+            self._started = False
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        """Inicia el runner al entrar al bloque."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        """Cierra el runner al salir del bloque."""
+        await self.close()
+
+    async def read(self, fn, *args, **kwargs):
+        """Lectura; se comparte con otras idénticas que estén en curso."""
+        key = (fn, args, tuple(sorted(kwargs.items())))
+        future = self._reads.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._call(fn, *args, **kwargs))
+            self._reads[key] = future
+            future.add_done_callback(lambda _: self._reads.pop(key, None))
+        return await asyncio.shield(future)
+
+    def _tracked(self, fn, *args, **kwargs):
+        """Ejecuta una escritura y regresa su número de secuencia."""
+        result = fn(*args, **kwargs)
+        self._written += 1
+        return result, self._written
+
+    def _flush_job(self):
+        """Escribe el lote actual (corre en el hilo de trabajo)."""
+        upto = self._written
+        flush_batch()
+        self._flushed = upto
+
+    async def write(self, fn, *args, **kwargs):
+        """Escritura; regresa cuando su cambio ya está en disco."""
+        await self.start()
+        result, sequence = await self._call(
+            self._tracked, fn, *args, **kwargs
+        )
+        while self._flushed < sequence:
+            if self._flush is None or self._flush.done():
+                # Las escrituras que ya están en la cola del hilo quedan
+                # antes de este flush y se escriben juntas.
+                self._flush = asyncio.ensure_future(
+                    self._call(self._flush_job)
+                )
+            await asyncio.shield(self._flush)
+        return result
+
+
+# Solo guarda el runner; los métodos están en las subclases.
+class _AsyncService:  # pylint: disable=too-few-public-methods
+    """Base de los servicios: guarda el runner compartido."""
+
+    def __init__(self, runner):
+        """Usa ``runner`` para ejecutar las operaciones."""
+        self.runner = runner
+
+
+class AsyncHotelService(_AsyncService):
+    """Operaciones de hoteles que se pueden esperar con ``await``."""
+
+    async def create_hotel(self, hotel_id, name, location, total_rooms):
+        """Ver ``Hotel.create_hotel``."""
+        return await self.runner.write(
+            Hotel.create_hotel, hotel_id, name, location, total_rooms
+        )
+
+    async def delete_hotel(self, hotel_id):
+        """Ver ``Hotel.delete_hotel``."""
+        return await self.runner.write(Hotel.delete_hotel, hotel_id)
+
+    async def display_hotel(self, hotel_id):
+        """Ver ``Hotel.display_hotel``."""
+        return await self.runner.read(Hotel.display_hotel, hotel_id)
+
+    async def modify_hotel(self, hotel_id, **changes):
+        """Ver ``Hotel.modify_hotel``."""
+        return await self.runner.write(Hotel.modify_hotel, hotel_id, **changes)
+
+    async def reserve_room(self, hotel_id, reservation_id, customer_id,
+                           check_in=None, check_out=None):
+        """Ver ``Hotel.reserve_room``."""
+        return await self.runner.write(
+            Hotel.reserve_room, hotel_id, reservation_id, customer_id,
+            check_in, check_out,
+        )
+
+    async def cancel_room_reservation(self, hotel_id, reservation_id):
+        """Ver ``Hotel.cancel_room_reservation``."""
+        return await self.runner.write(
+            Hotel.cancel_room_reservation, hotel_id, reservation_id
+        )
+
+
+class AsyncCustomerService(_AsyncService):
+    """Operaciones de clientes que se pueden esperar con ``await``."""
+
+    async def create_customer(self, customer_id, name, email, phone):
+        """Ver ``Customer.create_customer``."""
+        return await self.runner.write(
+            Customer.create_customer, customer_id, name, email, phone
+        )
+
+    async def delete_customer(self, customer_id):
+        """Ver ``Customer.delete_customer``."""
+        return await self.runner.write(Customer.delete_customer, customer_id)
+
+    async def display_customer(self, customer_id):
+        """Ver ``Customer.display_customer``."""
+        return await self.runner.read(Customer.display_customer, customer_id)
+
+    async def modify_customer(self, customer_id, **changes):
+        """Ver ``Customer.modify_customer``."""
+        return await self.runner.write(
+            Customer.modify_customer, customer_id, **changes
+        )
+
+
+class AsyncReservationService(_AsyncService):
+    """Operaciones de reservaciones que se pueden esperar con ``await``."""
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    async def create_reservation(self, reservation_id, customer_id,
+                                 hotel_id, check_in, check_out,
+                                 idempotency_key=None,
+                                 waitlist_priority=None):
+        """Ver ``Reservation.create_reservation``."""
+        return await self.runner.write(
+            Reservation.create_reservation, reservation_id, customer_id,
+            hotel_id, check_in, check_out, idempotency_key=idempotency_key,
+            waitlist_priority=waitlist_priority,
+        )
+
+    async def cancel_reservation(self, reservation_id, idempotency_key=None):
+        """Ver ``Reservation.cancel_reservation``."""
+        return await self.runner.write(
+            Reservation.cancel_reservation, reservation_id,
+            idempotency_key=idempotency_key,
+        )
+
+    async def display_reservation(self, reservation_id):
+        """Ver ``Reservation.display_reservation``."""
+        return await self.runner.read(
+            Reservation.display_reservation, reservation_id
+        )
+
+    async def find_by_customer(self, customer_id):
+        """Ver ``Reservation.find_by_customer``."""
+        return await self.runner.read(
+            Reservation.find_by_customer, customer_id
+        )
+
+    async def find_by_hotel(self, hotel_id):
+        """Ver ``Reservation.find_by_hotel``."""
+        return await self.runner.read(Reservation.find_by_hotel, hotel_id)
@@ -0,0 +1,150 @@
+"""Cargas y descargas masivas en archivos CSV o JSON-lines.
+
+Los archivos se leen registro por registro (sin cargarlos completos) y
+se pasan a los métodos ``create_hotels``, ``create_customers`` y
+``create_reservations``, que validan todo el lote y lo guardan con una
+sola escritura.
+
+``export_hotels``, ``export_customers`` y ``export_reservations``
+escriben los mismos campos que aceptan las cargas, así un archivo
+exportado se puede volver a cargar. En CSV ``room_types`` va como JSON
+(``[["suite", 4, 2]]``) y una celda vacía en ``room_types``,
+``check_in`` o ``check_out`` cuenta como no dada.
+"""
+
+import csv
+import json
+import os
+
+from customer import CUSTOMERS_FILE, Customer
+from hotel import HOTELS_FILE, Hotel
+from reporting import InvalidDataError, fail, get_logger
+from repository import get_repository
+from reservation import RESERVATIONS_FILE, Reservation
+
+LOGGER = get_logger("bulk")
+
+HOTEL_FIELDS = ("hotel_id", "name", "location", "total_rooms",
+                "room_types")
+CUSTOMER_FIELDS = ("customer_id", "name", "email", "phone")
+RESERVATION_FIELDS = ("reservation_id", "customer_id", "hotel_id",
+                      "check_in", "check_out")
+# Columnas de CSV que pueden ir vacías (None) y las que van como JSON.
+OPTIONAL_FIELDS = ("room_types", "check_in", "check_out")
+JSON_FIELDS = ("room_types",)
+
+
+def _extension(path):
+    """Extensión del archivo; ValueError si no es un formato soportado."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in (".csv", ".jsonl", ".ndjson"):
+        raise ValueError(f"Formato no soportado: {extension}")
+    return extension
+
+
+def _from_csv(record):
+    """Convierte las celdas de un renglón CSV a los valores del registro.
+
+    Si ``room_types`` no es JSON válido se deja el texto: la carga lo
+    rechaza como cualquier otro valor inválido.
+    """
+    for name in OPTIONAL_FIELDS:
+        if record.get(name) == "":
+            record[name] = None
+    for name in JSON_FIELDS:
+        if record.get(name) is not None:
+            try:
+                record[name] = json.loads(record[name])
+            except json.JSONDecodeError:
+                pass
+    return record
+
+
+def read_records(path):
+    """Genera los registros de un archivo .csv o .jsonl/.ndjson.
+
+    Las líneas de JSON-lines que no son un objeto se reportan y se
+    saltan.
+    """
+    extension = _extension(path)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if extension == ".csv":
+            for record in csv.DictReader(f):
+                yield _from_csv(record)
+            return
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                LOGGER.warning("Línea %s inválida en %s: %s",
+                               number, path, e)
+                continue
+            if not isinstance(record, dict):
+                fail(LOGGER, InvalidDataError(
+                    "La línea %s de %s no es un objeto JSON.", number, path
+                ))
+                continue
+            yield record
+
+
+def write_records(path, records, fields):
+    """Escribe los campos ``fields`` de cada registro; regresa cuántos.
+
+    El formato sale de la extensión, como en ``read_records``. Se
+    escribe a un temporal que reemplaza al archivo al final.
+    """
+    extension = _extension(path)
+    tmp_path = path + ".tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = None
+        if extension == ".csv":
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+        for data in records:
+            record = {name: data.get(name) for name in fields}
+            if writer is None:
+                f.write(json.dumps(record) + "\n")
+            else:
+                for name in JSON_FIELDS:
+                    if record.get(name) is not None:
+                        record[name] = json.dumps(record[name])
+                writer.writerow(record)
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def import_hotels(path):
+    """Carga los hoteles de un archivo."""
+    return Hotel.create_hotels(read_records(path))
+
+
+def import_customers(path):
+    """Carga los clientes de un archivo."""
+    return Customer.create_customers(read_records(path))
+
+
+def import_reservations(path):
+    """Carga las reservaciones de un archivo."""
+    return Reservation.create_reservations(read_records(path))
+
+
+def export_hotels(path):
+    """Escribe los hoteles a un archivo; regresa cuántos."""
+    hotels = get_repository(HOTELS_FILE, "hoteles").all()
+    return write_records(path, hotels.values(), HOTEL_FIELDS)
+
+
+def export_customers(path):
+    """Escribe los clientes a un archivo; regresa cuántos."""
+    customers = get_repository(CUSTOMERS_FILE, "clientes").all()
+    return write_records(path, customers.values(), CUSTOMER_FIELDS)
+
+
+def export_reservations(path):
+    """Escribe las reservaciones a un archivo; regresa cuántas."""
+    reservations = get_repository(RESERVATIONS_FILE, "reservaciones").all()
+    return write_records(path, reservations.values(), RESERVATION_FIELDS)
@@ -0,0 +1,246 @@
+"""Línea de comandos ligera para consultas y cambios sueltos.
+
+Pensada para procesos cortos (cron, scripts): solo se importa el módulo
+de la entidad que pide el comando y las consultas por ID usan el índice
+de posiciones (``stream``) para leer un solo registro sin cargar el
+archivo completo::
+
+    cd datos && PYTHONPATH=../src python -m cli hotel show H1
+    python src/cli.py --dir datos reservation list --hotel H1
+    python src/cli.py reservation create R1 C1 H1 2026-03-01 2026-03-03
+    python src/cli.py reservation cancel R1
+    python src/cli.py --storage sqlite reservation list --customer C1
+    python src/cli.py --storage sharded --option buckets=8 hotel show H1
+    python src/cli.py --entity reservations.json=mmap reservation show R1
+
+``--storage``, ``--option`` y ``--entity`` pasan a
+``repository.configure``; los valores de ``--option`` se leen como JSON
+si se puede (``buckets=8`` es un entero) y si no como texto.
+
+Los registros se imprimen como JSON en stdout. Las fallas se reportan
+por ``logging`` (stderr) y el proceso termina con código 1.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Nada más se importa aquí: cada comando importa lo que necesita.
+# pylint: disable=import-outside-toplevel
+
+
+def _print(value):
+    """Escribe un valor como JSON."""
+    print(json.dumps(value, ensure_ascii=False, indent=2))
+
+
+def _not_found(entity, key):
+    """Reporta un registro inexistente; regresa el código de salida."""
+    from reporting import NotFoundError, fail, get_logger
+    return fail(get_logger("cli"), NotFoundError(
+        "%s con ID %s no encontrado.", entity, key
+    ), 1)
+
+
+def _show(path, label, entity, key):
+    """Imprime un registro leyendo solo ese registro del archivo."""
+    from repository import get_repository
+    record = get_repository(path, label).get(key)
+    if record is None:
+        return _not_found(entity, key)
+    _print(record)
+    return 0
+
+
+def hotel_show(args):
+    """``hotel show ID``."""
+    from hotel import HOTELS_FILE
+    return _show(HOTELS_FILE, "hoteles", "Hotel", args.id)
+
+
+def hotel_available(args):
+    """``hotel available ID [CHECK_IN CHECK_OUT]``."""
+    from hotel import HOTELS_FILE, Hotel
+    from repository import get_repository
+    record = get_repository(HOTELS_FILE, "hoteles").get(args.id)
+    if record is None:
+        return _not_found("Hotel", args.id)
+    hotel = Hotel.from_dict(record)
+    if args.check_in is None:
+        _print(hotel.available_rooms())
+        return 0
+    try:
+        _print(hotel.available_rooms(args.check_in, args.check_out))
+    except (TypeError, ValueError) as e:
+        from reporting import InvalidDataError, fail, get_logger
+        return fail(get_logger("cli"), InvalidDataError(
+            "Fechas inválidas: %s", e
+        ), 1)
+    return 0
+
+
+def customer_show(args):
+    """``customer show ID``."""
+    from customer import CUSTOMERS_FILE
+    return _show(CUSTOMERS_FILE, "clientes", "Cliente", args.id)
+
+
+def reservation_show(args):
+    """``reservation show ID``."""
+    from reservation import RESERVATIONS_FILE
+    return _show(RESERVATIONS_FILE, "reservaciones", "Reservación",
+                 args.id)
+
+
+def reservation_list(args):
+    """``reservation list --hotel ID`` o ``--customer ID``.
+
+    Por hotel se leen solo el hotel y sus reservaciones (con el índice);
+    por cliente se usa ``find`` del repositorio, que en SQLite, mmap y
+    cubetas consulta su índice sin cargar todos los registros.
+    """
+    from repository import get_repository
+    from reservation import RESERVATIONS_FILE
+    reservations = get_repository(RESERVATIONS_FILE, "reservaciones")
+    if args.hotel is not None:
+        from hotel import HOTELS_FILE
+        hotel = get_repository(HOTELS_FILE, "hoteles").get(args.hotel)
+        if hotel is None:
+            return _not_found("Hotel", args.hotel)
+        keys = hotel["reservations"]
+    else:
+        keys = reservations.find("customer_id", args.customer)
+    records = [reservations.get(key) for key in keys]
+    _print([record for record in records if record is not None])
+    return 0
+
+
+def reservation_create(args):
+    """``reservation create ID CUSTOMER HOTEL CHECK_IN CHECK_OUT``."""
+    from reservation import Reservation
+    reservation = Reservation.create_reservation(
+        args.id, args.customer, args.hotel, args.check_in, args.check_out,
+        idempotency_key=args.idempotency_key,
+    )
+    if reservation is None:
+        return 1
+    _print(reservation.to_dict())
+    return 0
+
+
+def reservation_cancel(args):
+    """``reservation cancel ID``."""
+    from reservation import Reservation
+    cancelled = Reservation.cancel_reservation(
+        args.id, idempotency_key=args.idempotency_key
+    )
+    return 0 if cancelled else 1
+
+
+def build_parser():
+    """Arma el parser con los subcomandos."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", help="directorio de los archivos de datos")
+    parser.add_argument("--storage", default="json",
+                        help="almacenamiento (json, wal, binary, sqlite, "
+                             "mmap, sharded)")
+    parser.add_argument("--option", action="append", default=[],
+                        metavar="NOMBRE=VALOR",
+                        help="opción del almacenamiento; se puede repetir")
+    parser.add_argument("--entity", action="append", default=[],
+                        dest="entities",
+                        metavar="ARCHIVO=ALMACENAMIENTO",
+                        help="almacenamiento de un solo archivo; se puede "
+                             "repetir")
+    entities = parser.add_subparsers(dest="entity", required=True)
+
+    hotel = entities.add_parser("hotel").add_subparsers(
+        dest="command", required=True
+    )
+    command = hotel.add_parser("show")
+    command.add_argument("id")
+    command.set_defaults(handler=hotel_show)
+    command = hotel.add_parser("available")
+    command.add_argument("id")
+    command.add_argument("check_in", nargs="?")
+    command.add_argument("check_out", nargs="?")
+    command.set_defaults(handler=hotel_available)
+
+    customer = entities.add_parser("customer").add_subparsers(
+        dest="command", required=True
+    )
+    command = customer.add_parser("show")
+    command.add_argument("id")
+    command.set_defaults(handler=customer_show)
+
+    reservation = entities.add_parser("reservation").add_subparsers(
+        dest="command", required=True
+    )
+    command = reservation.add_parser("show")
+    command.add_argument("id")
+    command.set_defaults(handler=reservation_show)
+    command = reservation.add_parser("list")
+    group = command.add_mutually_exclusive_group(required=True)
+    group.add_argument("--hotel")
+    group.add_argument("--customer")
+    command.set_defaults(handler=reservation_list)
+    command = reservation.add_parser("create")
+    for name in ("id", "customer", "hotel", "check_in", "check_out"):
+        command.add_argument(name)
+    command.add_argument("--idempotency-key")
+    command.set_defaults(handler=reservation_create)
+    command = reservation.add_parser("cancel")
+    command.add_argument("id")
+    command.add_argument("--idempotency-key")
+    command.set_defaults(handler=reservation_cancel)
+    return parser
+
+
+def _pairs(parser, values):
+    """Convierte ``NOMBRE=VALOR`` en un diccionario."""
+    pairs = {}
+    for value in values:
+        name, sep, text = value.partition("=")
+        if not sep or not name:
+            parser.error(f"Se esperaba NOMBRE=VALOR: {value}")
+        pairs[name] = text
+    return pairs
+
+
+def _option_value(text):
+    """Valor de ``--option``: JSON si se puede, si no el texto."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def _configure(parser, args):
+    """Configura el almacenamiento si se pidió uno distinto al default."""
+    options = {
+        name: _option_value(text)
+        for name, text in _pairs(parser, args.option).items()
+    }
+    entities = _pairs(parser, args.entities)
+    if args.storage == "json" and not options and not entities:
+        return
+    import repository
+    try:
+        repository.configure(args.storage, entities, **options)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def main(argv=None):
+    """Corre un comando; regresa el código de salida."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.dir:
+        os.chdir(args.dir)
+    _configure(parser, args)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""Tablas en columnas para tener muchos registros en memoria.
+
+En lugar de un objeto (o diccionario) por registro, cada campo es un
+``array`` de enteros: los textos se internan en un ``StringPool`` y las
+fechas se guardan como número de día. Un millón de reservaciones ocupa
+así unos cuantos arreglos planos más los IDs únicos.
+
+``to_dict``/``from_dict`` de cada clase siguen siendo la forma de
+intercambio: ``record(row)`` regresa el objeto de siempre.
+
+Una fecha en None (reservación sin fechas) se guarda como
+``MISSING_DATE`` y un texto en None (p. ej. un cliente sin teléfono)
+como ``MISSING_STRING``; quien recorra las columnas debe saltarlos.
+"""
+
+import itertools
+import operator
+from array import array
+from datetime import date
+
+import stream
+from customer import Customer
+from hotel import Hotel
+from occupancy import to_ordinal
+from reservation import Reservation
+
+# Número de día de una fecha en None; ningún día válido es negativo.
+MISSING_DATE = -1
+# Número de un texto en None; el pool numera desde cero.
+MISSING_STRING = -1
+# Registros que ``extend`` codifica juntos, columna por columna.
+EXTEND_CHUNK = 65536
+
+
+class StringPool:
+    """Asigna un número a cada texto distinto."""
+
+    def __init__(self):
+        """Pool vacío."""
+        self.strings = []
+        self._ids = {}
+
+    def intern(self, value):
+        """Número del texto, agregándolo si es nuevo.
+
+        None no se agrega: su número es ``MISSING_STRING``.
+        """
+        if value is None:
+            return MISSING_STRING
+        value = str(value)
+        number = self._ids.get(value)
+        if number is None:
+            number = len(self.strings)
+            self.strings.append(value)
+            self._ids[value] = number
+        return number
+
+    def intern_all(self, values):
+        """Números de varios textos, como ``intern`` de cada uno."""
+        values = [None if value is None else str(value) for value in values]
+        ids = self._ids
+        new = [
+            value for value in dict.fromkeys(values)
+            if value is not None and value not in ids
+        ]
+        ids.update(zip(new, range(len(self.strings),
+                                  len(self.strings) + len(new))))
+        self.strings.extend(new)
+        return [
+            MISSING_STRING if value is None else ids[value]
+            for value in values
+        ]
+
+    def find(self, value):
+        """Número del texto, o None si no está en el pool."""
+        if value is None:
+            return MISSING_STRING
+        return self._ids.get(str(value))
+
+    def __len__(self):
+        """Cantidad de textos distintos."""
+        return len(self.strings)
+
+
+class Table:
+    """Tabla en columnas; las subclases definen FIELDS y RECORD.
+
+    ``FIELDS`` es una lista de (campo, tipo) con tipo ``"str"`` (texto
+    internado), ``"int"`` o ``"date"`` ('YYYY-MM-DD' como número de día).
+    El primer campo es la llave del registro.
+    """
+
+    FIELDS = ()
+    RECORD = None
+
+    def __init__(self, pool=None):
+        """Tabla vacía; ``pool`` permite compartir IDs entre tablas."""
+        self.pool = pool if pool is not None else StringPool()
+        self.columns = {name: array("q") for name, _ in self.FIELDS}
+        self._rows = {}
+        self._ordinals = {}
+        # (columna, función que codifica el valor) en el orden de FIELDS.
+        encoders = {"str": self.pool.intern, "date": self._ordinal,
+                    "int": int}
+        self._encoders = [
+            (name, encoders[kind]) for name, kind in self.FIELDS
+        ]
+
+    @classmethod
+    def from_records(cls, records, pool=None):
+        """Arma la tabla a partir de diccionarios con el formato to_dict."""
+        table = cls(pool)
+        table.extend(records)
+        return table
+
+    @classmethod
+    def from_file(cls, path, pool=None):
+        """Arma la tabla leyendo el archivo JSON registro por registro."""
+        return cls.from_records(
+            (value for _, value in stream.iter_records(path)), pool
+        )
+
+    def _ordinal(self, value):
+        """Número de día de una fecha; las fechas se repiten mucho."""
+        if value is None:
+            return MISSING_DATE
+        ordinal = self._ordinals.get(value)
+        if ordinal is None:
+            ordinal = to_ordinal(value)
+            if isinstance(value, str):
+                self._ordinals[value] = ordinal
+        return ordinal
+
+    def _decode(self, kind, value):
+        """Convierte el entero guardado al valor original."""
+        if kind == "str":
+            if value == MISSING_STRING:
+                return None
+            return self.pool.strings[value]
+        if kind == "date":
+            if value == MISSING_DATE:
+                return None
+            return date.fromordinal(value).isoformat()
+        return value
+
+    def append(self, data):
+        """Agrega (o reemplaza) un registro. Fechas inválidas: ValueError."""
+        self._store([encode(data[name]) for name, encode in self._encoders])
+
+    def _store(self, encoded):
+        """Agrega (o reemplaza) un registro ya codificado."""
+        columns = self.columns
+        row = self._rows.get(encoded[0])
+        if row is None:
+            self._rows[encoded[0]] = len(self._rows)
+            for (name, _), value in zip(self._encoders, encoded):
+                columns[name].append(value)
+        else:
+            for (name, _), value in zip(self._encoders, encoded):
+                columns[name][row] = value
+
+    def extend(self, records):
+        """Agrega varios registros.
+
+        Van en bloques de EXTEND_CHUNK, columna por columna: cada texto o
+        fecha distinta del bloque se codifica una vez y cada columna
+        crece de una sola vez. Un bloque con un registro inválido se
+        agrega de uno en uno, así el error sale igual que con ``append``.
+        """
+        records = iter(records)
+        while True:
+            chunk = list(itertools.islice(records, EXTEND_CHUNK))
+            if not chunk:
+                return
+            try:
+                encoded = self._encode_columns(chunk)
+            except (KeyError, TypeError, ValueError):
+                for data in chunk:
+                    self.append(data)
+                continue
+            self._add_columns(encoded)
+
+    def _encode_columns(self, chunk):
+        """Columnas codificadas de un bloque de registros."""
+        encoded = []
+        for name, kind in self.FIELDS:
+            values = list(map(operator.itemgetter(name), chunk))
+            if kind == "str":
+                encoded.append(self.pool.intern_all(values))
+            elif kind == "int":
+                encoded.append(list(map(int, values)))
+            else:
+                codes = {value: self._ordinal(value)
+                         for value in dict.fromkeys(values)}
+                encoded.append(list(map(codes.__getitem__, values)))
+        return encoded
+
+    def _add_columns(self, encoded):
+        """Agrega los renglones codificados de ``_encode_columns``."""
+        keys = encoded[0]
+        unique = set(keys)
+        if len(unique) < len(keys) or not unique.isdisjoint(self._rows):
+            # Hay llaves repetidas: cada una reemplaza a la anterior.
+            for row in zip(*encoded):
+                self._store(row)
+            return
+        self._rows.update(zip(keys, range(len(self), len(self) + len(keys))))
+        for (name, _), values in zip(self.FIELDS, encoded):
+            self.columns[name].extend(values)
+
+    def __len__(self):
+        """Cantidad de registros."""
+        return len(self.columns[self.FIELDS[0][0]])
+
+    def row_of(self, key):
+        """Renglón del registro con esa llave, o None."""
+        number = self.pool.find(key)
+        return None if number is None else self._rows.get(number)
+
+    def to_dict(self, row):
+        """Diccionario (formato to_dict) del renglón."""
+        return {
+            name: self._decode(kind, self.columns[name][row])
+            for name, kind in self.FIELDS
+        }
+
+    def record(self, row):
+        """Objeto del renglón (Hotel, Customer o Reservation)."""
+        return self.RECORD.from_dict(self.to_dict(row))
+
+    def get(self, key):
+        """Objeto con esa llave, o None."""
+        row = self.row_of(key)
+        return None if row is None else self.record(row)
+
+    def __iter__(self):
+        """Recorre los objetos de la tabla."""
+        return (self.record(row) for row in range(len(self)))
+
+
+class ReservationTable(Table):
+    """Reservaciones en columnas."""
+
+    FIELDS = (
+        ("reservation_id", "str"),
+        ("customer_id", "str"),
+        ("hotel_id", "str"),
+        ("check_in", "date"),
+        ("check_out", "date"),
+    )
+    RECORD = Reservation
+
+
+class CustomerTable(Table):
+    """Clientes en columnas."""
+
+    FIELDS = (
+        ("customer_id", "str"),
+        ("name", "str"),
+        ("email", "str"),
+        ("phone", "str"),
+    )
+    RECORD = Customer
+
+
+class HotelTable(Table):
+    """Hoteles en columnas.
+
+    Solo guarda los datos propios del hotel; sus reservaciones se
+    consultan en una ``ReservationTable`` que comparta el mismo pool.
+    """
+
+    FIELDS = (
+        ("hotel_id", "str"),
+        ("name", "str"),
+        ("location", "str"),
+        ("total_rooms", "int"),
+    )
+    RECORD = Hotel
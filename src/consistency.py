@@ -0,0 +1,340 @@
+"""Revisión y reparación de la consistencia entre hoteles y reservaciones.
+
+Cada reservación vive en dos lugares: su registro en reservations.json y
+el mapa ``reservations`` (más ``stays`` si tiene fechas) de su hotel.
+Aquí se buscan las diferencias:
+
+* ``orphans``: reservaciones cuyo hotel no existe.
+* ``unbooked``: reservaciones que su hotel no tiene en el mapa.
+* ``dangling``: IDs en el mapa de un hotel sin registro de reservación
+  (o cuyo registro es de otro hotel); ocupan una habitación fantasma.
+* ``stay_mismatch``: fechas distintas en el hotel y en el registro.
+
+La revisión recorre los archivos JSON registro por registro (``stream``;
+con cubetas, una cubeta tras otra) y en memoria guarda los IDs de los
+hoteles y, a lo más, unos ``max_booked`` IDs de reservación de sus
+mapas: si los hoteles tienen más, se revisan por partes (los hoteles se
+reparten por el crc32 de su ID) con una pasada por los dos archivos en
+cada parte. Los demás almacenamientos (wal, binary, sqlite, mmap) no se
+pueden recorrer así: cada pasada carga todos sus registros con ``all()``
+y ``max_booked`` solo limita los mapas de los hoteles. Con ``repair``
+cada diferencia se vuelve a comprobar con el candado del
+hotel y se corrige en una transacción.
+
+Para correr cada cierto tiempo (p. ej. desde cron)::
+
+    python src/consistency.py --repair
+    python src/consistency.py --repair --every 300
+
+Se guarda la firma de los archivos revisados en ``consistency.state``; si
+no cambiaron desde la última revisión limpia, no se vuelven a recorrer.
+"""
+
+import argparse
+import json
+import os
+import time
+import zlib
+
+import repository
+import stream
+from hotel import HOTELS_FILE, Hotel
+from reporting import get_logger
+from reservation import RESERVATIONS_FILE
+from transaction import Transaction, hotel_lock
+
+LOGGER = get_logger("consistency")
+STATE_FILE = "consistency.state"
+KINDS = ("orphans", "unbooked", "dangling", "stay_mismatch")
+# IDs de reservación de los hoteles que se tienen en memoria a la vez.
+MAX_BOOKED = 1000000
+
+
+class Report:
+    """Diferencias encontradas y cuántas se repararon."""
+
+    def __init__(self):
+        """Reporte vacío."""
+        self.orphans = []
+        self.unbooked = []
+        self.dangling = []
+        self.stay_mismatch = []
+        self.repaired = 0
+        self.skipped = False
+
+    def total(self):
+        """Cantidad de diferencias encontradas."""
+        return sum(len(getattr(self, kind)) for kind in KINDS)
+
+    def to_dict(self):
+        """Reporte como diccionario (para JSON)."""
+        data = {kind: getattr(self, kind) for kind in KINDS}
+        data["repaired"] = self.repaired
+        data["skipped"] = self.skipped
+        return data
+
+
+def _hotels():
+    """Repositorio de hoteles."""
+    return repository.get_repository(HOTELS_FILE, "hoteles")
+
+
+def _reservations():
+    """Repositorio de reservaciones."""
+    return repository.get_repository(RESERVATIONS_FILE, "reservaciones")
+
+
+def _records(repo):
+    """Recorre los registros; del archivo JSON si se puede, sin cargarlo.
+
+    Con cubetas se recorre cada una por separado. Con otro
+    almacenamiento (o cambios sin escribir) se cargan todos con
+    ``all()``.
+    """
+    shards = getattr(repo, "shards", None)
+    if shards is not None:
+        for shard in shards():
+            yield from _records(shard)
+        return
+    store = getattr(repo, "store", None)
+    if (
+        # pylint: disable-next=unidiomatic-typecheck
+        type(store) is repository.JsonStore
+        and repo.pending() is None
+    ):
+        if os.path.exists(repo.path):
+            yield from stream.iter_records(repo.path)
+        return
+    yield from list(repo.all().items())
+
+
+def _signature(repo):
+    """Firma del archivo del repositorio, o None si no se puede saber.
+
+    El almacenamiento mmap escribe en su lugar y no tiene firma: con él
+    siempre se revisa.
+    """
+    store = getattr(repo, "store", None)
+    if store is None:
+        return None
+    # Ida y vuelta por JSON para compararla con la guardada (tuplas).
+    return json.loads(json.dumps(store.signature()))
+
+
+def _signatures():
+    """Firmas de los dos archivos, para saber si cambiaron."""
+    return [_signature(_hotels()), _signature(_reservations())]
+
+
+def _part(hotel_id, parts):
+    """Parte de la revisión a la que pertenece un hotel."""
+    return zlib.crc32(str(hotel_id).encode("utf-8")) % parts
+
+
+def _booked(parts, part):
+    """{reservation_id: (hotel_id, stay)} de los hoteles de una parte."""
+    booked = {}
+    for hotel_id, data in _records(_hotels()):
+        if parts == 1 or _part(hotel_id, parts) == part:
+            stays = data.get("stays", {})
+            for reservation_id in data.get("reservations", {}):
+                booked[reservation_id] = (hotel_id,
+                                          stays.get(reservation_id))
+    return booked
+
+
+def _compare(report, hotels, booked, parts, part):
+    """Compara las reservaciones de los hoteles de una parte."""
+    for reservation_id, data in _records(_reservations()):
+        hotel_id = data["hotel_id"]
+        if parts > 1 and _part(hotel_id, parts) != part:
+            continue
+        entry = booked.get(reservation_id)
+        if entry is not None and entry[0] == hotel_id:
+            del booked[reservation_id]
+            stay = entry[1]
+            if stay is not None and stay != [data["check_in"],
+                                             data["check_out"]]:
+                report.stay_mismatch.append([hotel_id, reservation_id])
+        elif hotel_id not in hotels:
+            report.orphans.append(reservation_id)
+        else:
+            report.unbooked.append(reservation_id)
+    report.dangling.extend(
+        [hotel_id, reservation_id]
+        for reservation_id, (hotel_id, _) in booked.items()
+    )
+
+
+def check(max_booked=MAX_BOOKED):
+    """Recorre los dos archivos y regresa un ``Report``.
+
+    Con más de ``max_booked`` reservaciones en los mapas de los hoteles
+    la revisión se hace por partes de ese tamaño, más o menos.
+    """
+    report = Report()
+    # Paso 1: IDs de hoteles y, si caben, sus reservaciones.
+    hotels = set()
+    total = 0
+    for hotel_id, data in _records(_hotels()):
+        hotels.add(hotel_id)
+        total += len(data.get("reservations", {}))
+    parts = max(1, -(-total // max_booked))
+    # Paso 2: por cada parte, reservaciones contra los mapas.
+    for part in range(parts):
+        _compare(report, hotels, _booked(parts, part), parts, part)
+    for kind in KINDS:
+        getattr(report, kind).sort()
+    return report
+
+
+def _repair_orphan(reservation_id):
+    """Borra una reservación cuyo hotel no existe."""
+    reservations = _reservations()
+    data = reservations.get(reservation_id)
+    if data is None:
+        return False
+    with Transaction(hotel_lock(data["hotel_id"])) as transaction:
+        if transaction.contains(_hotels(), data["hotel_id"]):
+            return False
+        transaction.delete(reservations, reservation_id)
+    return True
+
+
+def _rebook(transaction, data):
+    """Vuelve a ocupar la habitación de la reservación en su hotel."""
+    return Hotel.reserve_room(
+        data["hotel_id"], data["reservation_id"], data["customer_id"],
+        data["check_in"], data["check_out"], transaction=transaction,
+    )
+
+
+def _repair_unbooked(reservation_id):
+    """Registra en su hotel una reservación que el hotel no tenía.
+
+    Si el hotel ya no tiene lugar, la diferencia se deja para revisarla
+    a mano.
+    """
+    data = _reservations().get(reservation_id)
+    if data is None:
+        return False
+    with Transaction(hotel_lock(data["hotel_id"])) as transaction:
+        hotel = transaction.get(_hotels(), data["hotel_id"])
+        if hotel is None or reservation_id in hotel["reservations"]:
+            return False
+        if not _rebook(transaction, data):
+            transaction.rollback()
+            return False
+    return True
+
+
+def _repair_dangling(hotel_id, reservation_id):
+    """Libera la habitación de un ID sin registro de reservación."""
+    with Transaction(hotel_lock(hotel_id)) as transaction:
+        data = _reservations().get(reservation_id)
+        if data is not None and data["hotel_id"] == hotel_id:
+            return False
+        return Hotel.cancel_room_reservation(hotel_id, reservation_id,
+                                             transaction=transaction)
+
+
+def _repair_stay(hotel_id, reservation_id):
+    """Usa las fechas del registro de reservación en el hotel."""
+    with Transaction(hotel_lock(hotel_id)) as transaction:
+        data = _reservations().get(reservation_id)
+        if data is None or data["hotel_id"] != hotel_id:
+            return False
+        if not Hotel.cancel_room_reservation(hotel_id, reservation_id,
+                                             transaction=transaction,
+                                             promote=False):
+            return False
+        if not _rebook(transaction, data):
+            transaction.rollback()
+            return False
+    return True
+
+
+def repair(report):
+    """Corrige las diferencias del reporte; regresa cuántas se arreglaron.
+
+    Cada una se vuelve a comprobar antes de tocarla: si otro proceso ya
+    la corrigió (o cambió), se deja como está.
+    """
+    repaired = 0
+    for reservation_id in report.orphans:
+        repaired += _repair_orphan(reservation_id)
+    for reservation_id in report.unbooked:
+        repaired += _repair_unbooked(reservation_id)
+    for hotel_id, reservation_id in report.dangling:
+        repaired += _repair_dangling(hotel_id, reservation_id)
+    for hotel_id, reservation_id in report.stay_mismatch:
+        repaired += _repair_stay(hotel_id, reservation_id)
+    report.repaired = repaired
+    return repaired
+
+
+def _load_state(state_file):
+    """Firmas guardadas de la última revisión limpia, o None."""
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(state_file, signatures):
+    """Guarda las firmas de una revisión limpia."""
+    tmp_path = state_file + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(signatures, f)
+    os.replace(tmp_path, state_file)
+
+
+def run(fix=False, state_file=STATE_FILE):
+    """Revisa (y opcionalmente repara) si los archivos cambiaron.
+
+    Regresa el ``Report``; ``skipped`` indica que no hubo cambios desde
+    la última revisión limpia.
+    """
+    signatures = _signatures()
+    if (
+        state_file
+        and None not in signatures
+        and _load_state(state_file) == signatures
+    ):
+        report = Report()
+        report.skipped = True
+        return report
+    report = check()
+    if fix and report.total():
+        repair(report)
+        LOGGER.warning("%d de %d diferencias reparadas.", report.repaired,
+                       report.total())
+    elif report.total():
+        LOGGER.warning("%d diferencias encontradas.", report.total())
+    clean = not report.total() or report.repaired == report.total()
+    if state_file and clean:
+        _save_state(state_file, _signatures())
+    return report
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repair", action="store_true",
+                        help="corrige las diferencias encontradas")
+    parser.add_argument("--every", type=float,
+                        help="repite la revisión cada tantos segundos")
+    parser.add_argument("--state", default=STATE_FILE,
+                        help="archivo con las firmas de la última revisión")
+    args = parser.parse_args(argv)
+    while True:
+        report = run(args.repair, args.state)
+        print(json.dumps(report.to_dict()))
+        if args.every is None:
+            return report
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
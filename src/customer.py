@@ -1,35 +1,52 @@
 """Manejo de clientes para el sistema de reservaciones."""
 
-import json
-import os
+import copy
+
+import metrics
+from reporting import (
+    AlreadyExistsError, InvalidDataError, NotFoundError, StorageError,
+    fail, get_logger, reports_storage_errors, succeed,
+)
+from repository import get_repository
+from transaction import BULK_LOCK_GROUP, Transaction, customer_lock
+
+LOGGER = get_logger("customer")
 
 CUSTOMERS_FILE = "customers.json"
 
 
+def _repository():
+    """Repositorio en memoria del archivo de clientes."""
+    return get_repository(CUSTOMERS_FILE, "clientes")
+
+
+def _not_found(customer_id):
+    """Error de cliente inexistente."""
+    return NotFoundError("Cliente con ID %s no encontrado.", customer_id)
+
+
+def _duplicate(customer_id):
+    """Error de cliente repetido."""
+    return AlreadyExistsError("El cliente con ID %s ya existe.", customer_id)
+
+
+@metrics.timed("load_customers")
 def load_customers():
-    """Lee los clientes guardados en el archivo."""
-    if not os.path.exists(CUSTOMERS_FILE):
-        return {}
-    try:
-        with open(CUSTOMERS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Error al cargar el archivo de clientes: {e}")
-        return {}
+    """Regresa una copia de los clientes guardados."""
+    return copy.deepcopy(_repository().all())
 
 
+@metrics.timed("save_customers")
 def save_customers(customers):
-    """Escribe los clientes en el archivo."""
-    try:
-        with open(CUSTOMERS_FILE, "w", encoding="utf-8") as f:
-            json.dump(customers, f, indent=4)
-    except IOError as e:
-        print(f"Error al guardar el archivo de clientes: {e}")
+    """Reemplaza todos los clientes guardados (StorageError si falla)."""
+    _repository().replace(copy.deepcopy(customers))
 
 
 class Customer:
     """Un cliente del sistema de reservaciones."""
 
+    __slots__ = ("customer_id", "name", "email", "phone")
+
     def __init__(self, customer_id, name, email, phone):
         """Datos básicos del cliente."""
         self.customer_id = str(customer_id)
@@ -57,62 +74,131 @@ class Customer:
         )
 
     @staticmethod
+    @metrics.timed("Customer.create_customer")
+    @reports_storage_errors(LOGGER)
     def create_customer(customer_id, name, email, phone):
         """Agrega un cliente nuevo al sistema."""
-        customers = load_customers()
+        customers = _repository()
         customer_id = str(customer_id)
-        if customer_id in customers:
-            print(f"El cliente con ID {customer_id} ya existe.")
-            return None
         customer = Customer(customer_id, name, email, phone)
-        customers[customer_id] = customer.to_dict()
-        save_customers(customers)
-        print(f"Cliente '{name}' creado correctamente.")
+        with Transaction(customer_lock(customer_id)) as transaction:
+            if transaction.contains(customers, customer_id):
+                return fail(LOGGER, _duplicate(customer_id))
+            transaction.put(customers, customer_id, customer.to_dict())
+        succeed(LOGGER, "Cliente '%s' creado correctamente.", name)
         return customer
 
     @staticmethod
+    @metrics.timed("Customer.create_customers")
+    def create_customers(records):
+        """Agrega muchos clientes con pocas escrituras.
+
+        ``records`` es un iterable de diccionarios con customer_id, name,
+        email y phone. Cada grupo de hasta BULK_LOCK_GROUP clientes se
+        revisa y se guarda en una transacción con sus candados. Regresa,
+        en el mismo orden, el Customer creado o None.
+        """
+        customers = _repository()
+        results = []
+        seen = set()
+        for record in records:
+            customer = None
+            try:
+                customer_id = str(record["customer_id"])
+                if customer_id in seen:
+                    fail(LOGGER, _duplicate(customer_id))
+                else:
+                    customer = Customer.from_dict(record)
+                    seen.add(customer_id)
+            except KeyError as e:
+                fail(LOGGER, InvalidDataError(
+                    "Registro de cliente inválido, falta %s.", e
+                ))
+            results.append(customer)
+        valid = [(position, customer)
+                 for position, customer in enumerate(results)
+                 if customer is not None]
+        for start in range(0, len(valid), BULK_LOCK_GROUP):
+            group = valid[start:start + BULK_LOCK_GROUP]
+            try:
+                with Transaction(*(
+                    customer_lock(customer.customer_id)
+                    for _, customer in group
+                )) as transaction:
+                    for position, customer in group:
+                        if transaction.contains(customers,
+                                                customer.customer_id):
+                            results[position] = fail(
+                                LOGGER, _duplicate(customer.customer_id)
+                            )
+                        else:
+                            transaction.put(customers, customer.customer_id,
+                                            customer.to_dict())
+            except StorageError as e:
+                fail(LOGGER, e)
+                for position, _ in group:
+                    results[position] = None
+        created = sum(1 for customer in results if customer is not None)
+        LOGGER.info("%d de %d clientes creados.", created, len(results))
+        return results
+
+    @staticmethod
+    @metrics.timed("Customer.delete_customer")
+    @reports_storage_errors(LOGGER, False)
     def delete_customer(customer_id):
         """Borra un cliente del sistema."""
-        customers = load_customers()
+        customers = _repository()
         customer_id = str(customer_id)
-        if customer_id not in customers:
-            print(f"Cliente con ID {customer_id} no encontrado.")
-            return False
-        del customers[customer_id]
-        save_customers(customers)
-        print(f"Cliente {customer_id} eliminado correctamente.")
+        with Transaction(customer_lock(customer_id)) as transaction:
+            if not transaction.contains(customers, customer_id):
+                return fail(LOGGER, _not_found(customer_id), False)
+            transaction.delete(customers, customer_id)
+        succeed(LOGGER, "Cliente %s eliminado correctamente.", customer_id)
         return True
 
     @staticmethod
+    @metrics.timed("Customer.display_customer")
     def display_customer(customer_id):
-        """Imprime los datos del cliente en consola."""
-        customers = load_customers()
+        """Regresa el cliente y reporta sus datos (nivel INFO)."""
         customer_id = str(customer_id)
-        if customer_id not in customers:
-            print(f"Cliente con ID {customer_id} no encontrado.")
-            return None
-        customer = Customer.from_dict(customers[customer_id])
-        print("--- Información del Cliente ---")
-        print(f"ID     : {customer.customer_id}")
-        print(f"Nombre : {customer.name}")
-        print(f"Correo : {customer.email}")
-        print(f"Teléfono: {customer.phone}")
+        data = _repository().get(customer_id)
+        if data is None:
+            return fail(LOGGER, _not_found(customer_id))
+        customer = Customer.from_dict(data)
+        succeed(
+            LOGGER,
+            "--- Información del Cliente ---\n"
+            "ID     : %s\n"
+            "Nombre : %s\n"
+            "Correo : %s\n"
+            "Teléfono: %s",
+            customer.customer_id, customer.name, customer.email,
+            customer.phone,
+        )
         return customer
 
     @staticmethod
+    @metrics.timed("Customer.modify_customer")
+    @reports_storage_errors(LOGGER, False)
     def modify_customer(customer_id, name=None, email=None, phone=None):
-        """Actualiza los campos del cliente que se quieran cambiar."""
-        customers = load_customers()
+        """Actualiza los campos del cliente que se quieran cambiar.
+
+        Se hace con el candado del cliente: dos cambios simultáneos de
+        distintos campos se conservan los dos.
+        """
+        customers = _repository()
         customer_id = str(customer_id)
-        if customer_id not in customers:
-            print(f"Cliente con ID {customer_id} no encontrado.")
-            return False
-        if name:
-            customers[customer_id]["name"] = name
-        if email:
-            customers[customer_id]["email"] = email
-        if phone:
-            customers[customer_id]["phone"] = phone
-        save_customers(customers)
-        print(f"Cliente {customer_id} modificado correctamente.")
+        with Transaction(customer_lock(customer_id)) as transaction:
+            data = transaction.get(customers, customer_id)
+            if data is None:
+                return fail(LOGGER, _not_found(customer_id), False)
+            data = dict(data)
+            if name:
+                data["name"] = name
+            if email:
+                data["email"] = email
+            if phone:
+                data["phone"] = phone
+            transaction.put(customers, customer_id, data)
+        succeed(LOGGER, "Cliente %s modificado correctamente.", customer_id)
         return True
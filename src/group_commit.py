@@ -0,0 +1,140 @@
+"""Group commit: muchas escrituras, un solo flush a disco.
+
+Pensado para ráfagas de reservaciones desde varios hilos. Cada llamada
+se encola; un hilo dedicado la ejecuta contra el estado en memoria (así
+se valida contra las reservaciones anteriores del mismo lote) y, cuando
+el lote llega a ``max_batch`` operaciones o pasan ``max_delay``
+segundos desde la primera, escribe todo con ``transaction.flush_batch``.
+Cada llamada recibe su propio resultado hasta que el lote está en disco.
+
+Uso::
+
+    committer = GroupCommitter()
+    reservation = committer.call(
+        Reservation.create_reservation, "R1", "C1", "H1",
+        "2025-01-01", "2025-01-03",
+    )
+    committer.close()
+
+Mientras el committer está abierto todas las escrituras del proceso son
+diferidas, así que deben pasar por él.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from transaction import begin_batch, discard_batch, end_batch, flush_batch
+
+
+class GroupCommitter:
+    """Hilo que ejecuta escrituras por lotes y las confirma juntas."""
+
+    def __init__(self, max_delay=0.005, max_batch=256):
+        """Arranca el hilo de escritura.
+
+        ``max_delay`` es el tiempo máximo (segundos) que una operación
+        espera a que se junten más; ``max_batch`` el tamaño máximo del
+        lote.
+        """
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="group-commit", daemon=True
+        )
+        self._thread.start()
+        self._ready.wait()
+
+    def submit(self, fn, *args, **kwargs):
+        """Encola una escritura; regresa un Future con su resultado."""
+        future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """Ejecuta una escritura y espera a que esté en disco."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def close(self):
+        """Confirma lo pendiente y detiene el hilo."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        """Permite usar el committer con ``with``."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Cierra el committer al salir del bloque."""
+        self.close()
+
+    @staticmethod
+    def _execute(item):
+        """Ejecuta una operación en memoria; guarda resultado o error."""
+        future, fn, args, kwargs = item
+        try:
+            return future, fn(*args, **kwargs), None
+        # El error es de quien pidió la operación: se le entrega a él.
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            return future, None, e
+
+    def _collect(self, first):
+        """Junta operaciones hasta llenar el lote o vencer el plazo.
+
+        Regresa el lote y si se pidió cerrar el committer.
+        """
+        batch = [self._execute(first)]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(self._execute(item))
+        return batch, False
+
+    def _commit(self, batch):
+        """Escribe el lote y entrega los resultados a cada llamada.
+
+        Si la escritura falla, cada llamada del lote recibe el error, sus
+        cambios se descartan y el hilo sigue con el siguiente lote.
+        """
+        try:
+            flush_batch()
+        # Cualquier falla es de las llamadas del lote, no del hilo.
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            discard_batch()
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        for future, result, error in batch:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _run(self):
+        """Ciclo del hilo de escritura."""
+        begin_batch()
+        self._ready.set()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch, stop = self._collect(item)
+                self._commit(batch)
+                if stop:
+                    break
+        finally:
+            end_batch()
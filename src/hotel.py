@@ -1,44 +1,96 @@
 """Manejo de hoteles para el sistema de reservaciones."""
 
-import json
-import os
+import copy
+import importlib
+import logging
+
+import metrics
+import occupancy
+import rooms
+import waitlist
+from reporting import (
+    AlreadyExistsError, InvalidDataError, NoAvailabilityError,
+    NotFoundError, StorageError, fail, get_logger, reports_storage_errors,
+    succeed,
+)
+from repository import get_repository
+from transaction import BULK_LOCK_GROUP, Transaction, hotel_lock
+
+LOGGER = get_logger("hotel")
 
 HOTELS_FILE = "hotels.json"
 
 
+def _repository():
+    """Repositorio en memoria del archivo de hoteles."""
+    return get_repository(HOTELS_FILE, "hoteles")
+
+
+def _reservation():
+    """Módulo ``reservation``, importado al usarlo.
+
+    ``reservation`` importa este módulo; se importa por nombre, sin
+    crear un ciclo entre los dos.
+    """
+    return importlib.import_module("reservation")
+
+
+def _not_found(hotel_id):
+    """Error de hotel inexistente."""
+    return NotFoundError("Hotel con ID %s no encontrado.", hotel_id)
+
+
+def _duplicate(hotel_id):
+    """Error de hotel repetido."""
+    return AlreadyExistsError("El hotel con ID %s ya existe.", hotel_id)
+
+
+@metrics.timed("load_hotels")
 def load_hotels():
-    """Lee los hoteles guardados en el archivo."""
-    if not os.path.exists(HOTELS_FILE):
-        return {}
-    try:
-        with open(HOTELS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Error al cargar el archivo de hoteles: {e}")
-        return {}
+    """Regresa una copia de los hoteles guardados."""
+    return copy.deepcopy(_repository().all())
 
 
+@metrics.timed("save_hotels")
 def save_hotels(hotels):
-    """Escribe los hoteles en el archivo."""
-    try:
-        with open(HOTELS_FILE, "w", encoding="utf-8") as f:
-            json.dump(hotels, f, indent=4)
-    except IOError as e:
-        print(f"Error al guardar el archivo de hoteles: {e}")
+    """Reemplaza todos los hoteles guardados (StorageError si falla)."""
+    _repository().replace(copy.deepcopy(hotels))
 
 
-class Hotel:
+# Los atributos son los campos del registro guardado (ver ``to_dict``).
+class Hotel:  # pylint: disable=too-many-instance-attributes
     """Un hotel con sus habitaciones y reservaciones."""
 
-    def __init__(self, hotel_id, name, location, total_rooms):
-        """Datos básicos del hotel. Requiere al menos una habitación."""
+    __slots__ = (
+        "hotel_id", "name", "location", "total_rooms", "reservations",
+        "stays", "room_types", "rooms", "waitlist_token",
+    )
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, hotel_id, name, location, total_rooms,
+                 room_types=None):
+        """Datos básicos del hotel. Requiere al menos una habitación.
+
+        ``room_types`` son corridas ``[tipo, capacidad, cantidad]`` que
+        suman ``total_rooms`` (ver ``rooms``); sin ellas todas las
+        habitaciones son estándar.
+        """
         if not isinstance(total_rooms, int) or total_rooms <= 0:
             raise ValueError("total_rooms must be a positive integer.")
+        if room_types is None:
+            room_types = rooms.default_types(total_rooms)
+        else:
+            room_types = [list(run) for run in room_types]
+            rooms.validate_types(room_types, total_rooms)
         self.hotel_id = str(hotel_id)
         self.name = name
         self.location = location
         self.total_rooms = total_rooms
         self.reservations = {}
+        self.stays = {}
+        self.room_types = room_types
+        self.rooms = {}
+        self.waitlist_token = None
 
     def to_dict(self):
         """Regresa los datos del hotel como diccionario."""
@@ -48,11 +100,26 @@ class Hotel:
             "location": self.location,
             "total_rooms": self.total_rooms,
             "reservations": self.reservations,
+            "stays": self.stays,
+            "room_types": self.room_types,
+            "rooms": self.rooms,
+            "waitlist_token": self.waitlist_token,
         }
 
     @staticmethod
     def from_dict(data):
         """Arma un Hotel a partir de un diccionario."""
+        hotel = Hotel._wrap(data)
+        hotel.reservations = dict(hotel.reservations)
+        return hotel
+
+    @staticmethod
+    def _wrap(data):
+        """Hotel que comparte los diccionarios del registro.
+
+        Así se reusan sus índices de ocupación y de habitaciones; para
+        cambiarlo se usa ``_for_update``.
+        """
         hotel = Hotel(
             data["hotel_id"],
             data["name"],
@@ -60,120 +127,435 @@ class Hotel:
             data["total_rooms"],
         )
         hotel.reservations = data.get("reservations", {})
+        hotel.stays = data.get("stays", {})
+        hotel.room_types = data.get("room_types", hotel.room_types)
+        hotel.rooms = data.get("rooms", {})
+        hotel.waitlist_token = data.get("waitlist_token")
+        return hotel
+
+    @staticmethod
+    def _for_update(transaction, hotel_id):
+        """Hotel que se puede cambiar en su lugar, o None si no existe.
+
+        La primera vez en la transacción se copian sus diccionarios; las
+        siguientes se cambia el registro que la transacción ya tiene, así
+        muchas reservaciones en un hotel no lo copian cada vez.
+        """
+        hotels = _repository()
+        data = transaction.get(hotels, hotel_id)
+        if data is None:
+            return None
+        hotel = Hotel._wrap(data)
+        if not transaction.staged(hotels, hotel_id):
+            hotel.reservations = dict(hotel.reservations)
+            hotel.stays = occupancy.copy_stays(hotel_id, hotel.stays)
+            rooms.copy_rooms(hotel)
         return hotel
 
-    def available_rooms(self):
-        """Cuántas habitaciones quedan libres."""
-        return self.total_rooms - len(self.reservations)
+    def room_of(self, reservation_id):
+        """Número de habitación de la reservación, o None."""
+        rooms.allocator_for(self)
+        return self.rooms.get(str(reservation_id))
+
+    def available_rooms(self, check_in=None, check_out=None):
+        """Cuántas habitaciones quedan libres.
+
+        Sin fechas cuenta todas las reservaciones. Con fechas cuenta las
+        habitaciones libres todas las noches del rango; las reservaciones
+        sin fechas ocupan todas las noches.
+        """
+        if check_in is None:
+            return self.total_rooms - len(self.reservations)
+        undated = len(self.reservations) - len(self.stays)
+        index = occupancy.index_for(self.hotel_id, self.stays)
+        return self.total_rooms - undated - index.peak(check_in, check_out)
 
     @staticmethod
-    def create_hotel(hotel_id, name, location, total_rooms):
+    @metrics.timed("Hotel.create_hotel")
+    @reports_storage_errors(LOGGER)
+    def create_hotel(hotel_id, name, location, total_rooms,
+                     room_types=None):
         """Agrega un hotel nuevo al sistema."""
-        hotels = load_hotels()
+        hotels = _repository()
         hotel_id = str(hotel_id)
-        if hotel_id in hotels:
-            print(f"El hotel con ID {hotel_id} ya existe.")
-            return None
-        hotel = Hotel(hotel_id, name, location, total_rooms)
-        hotels[hotel_id] = hotel.to_dict()
-        save_hotels(hotels)
-        print(f"Hotel '{name}' creado correctamente.")
+        hotel = Hotel(hotel_id, name, location, total_rooms, room_types)
+        with Transaction(hotel_lock(hotel_id)) as transaction:
+            if transaction.contains(hotels, hotel_id):
+                return fail(LOGGER, _duplicate(hotel_id))
+            transaction.put(hotels, hotel_id, hotel.to_dict())
+        succeed(LOGGER, "Hotel '%s' creado correctamente.", name)
         return hotel
 
     @staticmethod
+    @metrics.timed("Hotel.create_hotels")
+    def create_hotels(records):
+        """Agrega muchos hoteles con pocas escrituras.
+
+        ``records`` es un iterable de diccionarios con hotel_id, name,
+        location y total_rooms (que puede venir como texto, p. ej. de un
+        CSV), y opcionalmente room_types. Cada grupo de hasta
+        BULK_LOCK_GROUP hoteles se revisa y se guarda en una transacción
+        con sus candados. Regresa, en el mismo orden, el Hotel creado o
+        None.
+        """
+        hotels = _repository()
+        results = []
+        seen = set()
+        for record in records:
+            hotel = None
+            try:
+                hotel_id = str(record["hotel_id"])
+                total_rooms = record["total_rooms"]
+                if isinstance(total_rooms, str):
+                    total_rooms = int(total_rooms)
+                if hotel_id in seen:
+                    fail(LOGGER, _duplicate(hotel_id))
+                else:
+                    hotel = Hotel(
+                        hotel_id, record["name"], record["location"],
+                        total_rooms, record.get("room_types"),
+                    )
+                    seen.add(hotel_id)
+            except (KeyError, ValueError) as e:
+                fail(LOGGER, InvalidDataError(
+                    "Registro de hotel inválido: %s", e
+                ))
+            results.append(hotel)
+        valid = [(position, hotel) for position, hotel in enumerate(results)
+                 if hotel is not None]
+        for start in range(0, len(valid), BULK_LOCK_GROUP):
+            group = valid[start:start + BULK_LOCK_GROUP]
+            try:
+                with Transaction(*(
+                    hotel_lock(hotel.hotel_id) for _, hotel in group
+                )) as transaction:
+                    for position, hotel in group:
+                        if transaction.contains(hotels, hotel.hotel_id):
+                            results[position] = fail(
+                                LOGGER, _duplicate(hotel.hotel_id)
+                            )
+                        else:
+                            transaction.put(hotels, hotel.hotel_id,
+                                            hotel.to_dict())
+            except StorageError as e:
+                fail(LOGGER, e)
+                for position, _ in group:
+                    results[position] = None
+        created = sum(1 for hotel in results if hotel is not None)
+        LOGGER.info("%d de %d hoteles creados.", created, len(results))
+        return results
+
+    @staticmethod
+    @metrics.timed("Hotel.delete_hotel")
+    @reports_storage_errors(LOGGER, False)
     def delete_hotel(hotel_id):
-        """Borra un hotel del sistema."""
-        hotels = load_hotels()
+        """Borra un hotel del sistema junto con sus reservaciones.
+
+        También se borra su lista de espera. Los archivos cambian en una
+        sola transacción, así no quedan reservaciones que apunten a un
+        hotel que ya no existe.
+        """
+        hotels = _repository()
+        reservations = get_repository(_reservation().RESERVATIONS_FILE,
+                                      "reservaciones")
         hotel_id = str(hotel_id)
-        if hotel_id not in hotels:
-            print(f"Hotel con ID {hotel_id} no encontrado.")
-            return False
-        del hotels[hotel_id]
-        save_hotels(hotels)
-        print(f"Hotel {hotel_id} eliminado correctamente.")
+        with Transaction(hotel_lock(hotel_id)) as transaction:
+            data = transaction.get(hotels, hotel_id)
+            if data is None:
+                return fail(LOGGER, _not_found(hotel_id), False)
+            for reservation_id in sorted({
+                *data["reservations"],
+                *reservations.find("hotel_id", hotel_id),
+            }):
+                record = reservations.get(reservation_id)
+                if record is not None and record["hotel_id"] == hotel_id:
+                    transaction.delete(reservations, reservation_id)
+            waitlist.discard_hotel(transaction, hotel_id)
+            transaction.delete(hotels, hotel_id)
+        succeed(LOGGER, "Hotel %s eliminado correctamente.", hotel_id)
         return True
 
     @staticmethod
+    @metrics.timed("Hotel.display_hotel")
     def display_hotel(hotel_id):
-        """Imprime los datos del hotel en consola."""
-        hotels = load_hotels()
+        """Regresa el hotel y reporta sus datos (nivel INFO)."""
         hotel_id = str(hotel_id)
-        if hotel_id not in hotels:
-            print(f"Hotel con ID {hotel_id} no encontrado.")
-            return None
-        hotel = Hotel.from_dict(hotels[hotel_id])
-        print("--- Información del Hotel ---")
-        print(f"ID        : {hotel.hotel_id}")
-        print(f"Nombre    : {hotel.name}")
-        print(f"Ubicación : {hotel.location}")
-        print(
-            f"Habitaciones: {hotel.total_rooms} total, "
-            f"{hotel.available_rooms()} disponibles"
+        data = _repository().get(hotel_id)
+        if data is None:
+            return fail(LOGGER, _not_found(hotel_id))
+        hotel = Hotel.from_dict(data)
+        # Contar las habitaciones libres solo vale si el mensaje se usa.
+        free = (
+            hotel.available_rooms() if LOGGER.isEnabledFor(logging.INFO)
+            else None
+        )
+        succeed(
+            LOGGER,
+            "--- Información del Hotel ---\n"
+            "ID        : %s\n"
+            "Nombre    : %s\n"
+            "Ubicación : %s\n"
+            "Habitaciones: %s total, %s disponibles",
+            hotel.hotel_id, hotel.name, hotel.location, hotel.total_rooms,
+            free,
         )
         return hotel
 
     @staticmethod
+    @metrics.timed("Hotel.modify_hotel")
+    @reports_storage_errors(LOGGER, False)
     def modify_hotel(hotel_id, name=None, location=None, total_rooms=None):
-        """Actualiza los campos del hotel que se quieran cambiar."""
-        hotels = load_hotels()
+        """Actualiza los campos del hotel que se quieran cambiar.
+
+        La lectura y la escritura se hacen con el candado del hotel, así
+        no se pierde una reservación hecha en medio por otro proceso. Al
+        reducir ``total_rooms`` las reservaciones de las habitaciones que
+        se quitan pasan a otras del mismo tipo; si no caben, no cambia. Al
+        crecer se atiende la lista de espera.
+        """
+        hotels = _repository()
         hotel_id = str(hotel_id)
-        if hotel_id not in hotels:
-            print(f"Hotel con ID {hotel_id} no encontrado.")
-            return False
-        if name:
-            hotels[hotel_id]["name"] = name
-        if location:
-            hotels[hotel_id]["location"] = location
-        if total_rooms is not None:
-            if not isinstance(total_rooms, int) or total_rooms <= 0:
-                print("Valor de habitaciones inválido.")
-                return False
-            hotels[hotel_id]["total_rooms"] = total_rooms
-        save_hotels(hotels)
-        print(f"Hotel {hotel_id} modificado correctamente.")
+        with Transaction(hotel_lock(hotel_id)) as transaction:
+            data = transaction.get(hotels, hotel_id)
+            if data is None:
+                return fail(LOGGER, _not_found(hotel_id), False)
+            if total_rooms is not None and (
+                not isinstance(total_rooms, int) or total_rooms <= 0
+            ):
+                return fail(LOGGER, InvalidDataError(
+                    "Valor de habitaciones inválido: %s", total_rooms
+                ), False)
+            hotel = Hotel._for_update(transaction, hotel_id)
+            if name:
+                hotel.name = name
+            if location:
+                hotel.location = location
+            if (
+                total_rooms is not None
+                and total_rooms != hotel.total_rooms
+                and not rooms.resize(hotel, total_rooms)
+            ):
+                return fail(LOGGER, NoAvailabilityError(
+                    "El hotel %s no puede quedar con %s habitaciones: sus "
+                    "reservaciones no caben.", hotel_id, total_rooms
+                ), False)
+            if total_rooms is not None:
+                Hotel._promote(transaction, hotel)
+            transaction.put(hotels, hotel_id, hotel.to_dict())
+        succeed(LOGGER, "Hotel %s modificado correctamente.", hotel_id)
         return True
 
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
     @staticmethod
-    def reserve_room(hotel_id, reservation_id, customer_id):
-        """Ocupa una habitación del hotel con la reservación dada."""
-        hotels = load_hotels()
+    @metrics.timed("Hotel.reserve_room")
+    @reports_storage_errors(LOGGER, False)
+    def reserve_room(hotel_id, reservation_id, customer_id,
+                     check_in=None, check_out=None, transaction=None,
+                     room_type=None, guests=None):
+        """Ocupa una habitación del hotel con la reservación dada.
+
+        Con fechas solo se acepta si hay una misma habitación libre todas
+        las noches del rango; sin fechas la habitación queda ocupada
+        siempre. ``room_type`` y ``guests`` limitan las habitaciones a
+        ese tipo y a las de esa capacidad o más; la habitación asignada
+        se consulta con ``room_of``. Con ``transaction`` el cambio se
+        agrega a esa transacción; sin ella se abre una propia con el
+        candado del hotel.
+        """
         hotel_id = str(hotel_id)
-        if hotel_id not in hotels:
-            print(f"Hotel con ID {hotel_id} no encontrado.")
-            return False
-        hotel = Hotel.from_dict(hotels[hotel_id])
-        if hotel.available_rooms() <= 0:
-            print(f"No hay habitaciones disponibles en el hotel {hotel_id}.")
-            return False
+        if transaction is None:
+            with Transaction(hotel_lock(hotel_id)) as own:
+                return Hotel.reserve_room(
+                    hotel_id, reservation_id, customer_id,
+                    check_in, check_out, own, room_type, guests,
+                )
+        hotel = Hotel._for_update(transaction, hotel_id)
         reservation_id = str(reservation_id)
-        if reservation_id in hotel.reservations:
-            print(f"La reservación {reservation_id} ya existe.")
-            return False
+        error = Hotel._booking_error(hotel, hotel_id, reservation_id,
+                                     (check_in, check_out))
+        if error is None and rooms.assign(
+            hotel, reservation_id, (check_in, check_out), room_type, guests
+        ) is None:
+            error = NoAvailabilityError(
+                "No hay una habitación libre todas las noches en el hotel "
+                "%s.", hotel_id
+            )
+        if error is not None:
+            return fail(LOGGER, error, False)
         hotel.reservations[reservation_id] = str(customer_id)
-        hotels[hotel_id] = hotel.to_dict()
-        save_hotels(hotels)
-        print(f"Habitación reservada. ID de reservación: {reservation_id}")
+        if check_in is not None:
+            occupancy.book(hotel_id, hotel.stays, reservation_id, check_in,
+                           check_out)
+        transaction.put(_repository(), hotel_id, hotel.to_dict())
+        succeed(LOGGER, "Habitación reservada. ID de reservación: %s",
+                reservation_id)
         return True
 
     @staticmethod
-    def cancel_room_reservation(hotel_id, reservation_id):
-        """Libera la habitación asociada a la reservación."""
-        hotels = load_hotels()
+    def _booking_error(hotel, hotel_id, reservation_id, stay):
+        """Error que impide reservar ``stay`` en el hotel, o None."""
+        if hotel is None:
+            return _not_found(hotel_id)
+        try:
+            free = hotel.available_rooms(*stay)
+        except (TypeError, ValueError) as e:
+            return InvalidDataError("Fechas inválidas: %s", e)
+        if free <= 0:
+            return NoAvailabilityError(
+                "No hay habitaciones disponibles en el hotel %s.", hotel_id
+            )
+        if reservation_id in hotel.reservations:
+            return AlreadyExistsError(
+                "La reservación %s ya existe.", reservation_id
+            )
+        return None
+
+    @staticmethod
+    @metrics.timed("Hotel.cancel_room_reservation")
+    @reports_storage_errors(LOGGER, False)
+    def cancel_room_reservation(hotel_id, reservation_id, transaction=None,
+                                promote=True):
+        """Libera la habitación asociada a la reservación.
+
+        Igual que ``reserve_room``, puede formar parte de una transacción.
+        La habitación liberada se ofrece a la lista de espera, salvo con
+        ``promote=False``.
+        """
         hotel_id = str(hotel_id)
-        if hotel_id not in hotels:
-            print(f"Hotel con ID {hotel_id} no encontrado.")
-            return False
+        if transaction is None:
+            with Transaction(hotel_lock(hotel_id)) as own:
+                return Hotel.cancel_room_reservation(
+                    hotel_id, reservation_id, own, promote
+                )
+        hotels = _repository()
+        data = transaction.get(hotels, hotel_id)
+        if data is None:
+            return fail(LOGGER, _not_found(hotel_id), False)
         reservation_id = str(reservation_id)
-        if reservation_id not in hotels[hotel_id]["reservations"]:
-            print(
-                f"Reservación {reservation_id} no encontrada "
-                f"en el hotel {hotel_id}."
-            )
-            return False
-        del hotels[hotel_id]["reservations"][reservation_id]
-        save_hotels(hotels)
-        print(
-            f"Reservación {reservation_id} cancelada "
-            f"en el hotel {hotel_id}."
-        )
+        if reservation_id not in data["reservations"]:
+            return fail(LOGGER, NotFoundError(
+                "Reservación %s no encontrada en el hotel %s.",
+                reservation_id, hotel_id,
+            ), False)
+        hotel = Hotel._for_update(transaction, hotel_id)
+        stay = hotel.stays.get(reservation_id, (None, None))
+        rooms.unassign(hotel, reservation_id)
+        del hotel.reservations[reservation_id]
+        occupancy.release(hotel_id, hotel.stays, reservation_id)
+        if promote:
+            Hotel._promote(transaction, hotel, *stay)
+        transaction.put(hotels, hotel_id, hotel.to_dict())
+        succeed(LOGGER, "Reservación %s cancelada en el hotel %s.",
+                reservation_id, hotel_id)
+        return True
+
+    @staticmethod
+    @metrics.timed("Hotel.join_waitlist")
+    @reports_storage_errors(LOGGER, False)
+    def join_waitlist(hotel_id, reservation_id, customer_id, check_in=None,
+                      check_out=None, priority=0, transaction=None):
+        """Agrega la petición a la lista de espera del hotel.
+
+        Cuando se libere lugar en esas fechas se crea la reservación sola;
+        las de mayor ``priority`` van primero y, entre iguales, en orden de
+        llegada. Puede formar parte de una transacción.
+        """
+        hotel_id = str(hotel_id)
+        if transaction is None:
+            with Transaction(hotel_lock(hotel_id)) as own:
+                return Hotel.join_waitlist(
+                    hotel_id, reservation_id, customer_id, check_in,
+                    check_out, priority, own,
+                )
+        hotel = Hotel._for_update(transaction, hotel_id)
+        if hotel is None:
+            return fail(LOGGER, _not_found(hotel_id), False)
+        reservation_id = str(reservation_id)
+        if (
+            reservation_id in hotel.reservations
+            or waitlist.contains(transaction, reservation_id)
+        ):
+            return fail(LOGGER, AlreadyExistsError(
+                "La reservación %s ya existe.", reservation_id
+            ), False)
+        try:
+            waitlist.enqueue(transaction, hotel, reservation_id,
+                             str(customer_id), check_in, check_out, priority)
+        except (TypeError, ValueError) as e:
+            return fail(LOGGER, InvalidDataError(
+                "Fechas inválidas: %s", e
+            ), False)
+        transaction.put(_repository(), hotel_id, hotel.to_dict())
+        succeed(LOGGER, "Reservación %s en lista de espera del hotel %s.",
+                reservation_id, hotel_id)
         return True
+
+    @staticmethod
+    @metrics.timed("Hotel.leave_waitlist")
+    @reports_storage_errors(LOGGER, False)
+    def leave_waitlist(hotel_id, reservation_id):
+        """Quita una petición de la lista de espera del hotel."""
+        hotels = _repository()
+        hotel_id = str(hotel_id)
+        reservation_id = str(reservation_id)
+        with Transaction(hotel_lock(hotel_id)) as transaction:
+            hotel = Hotel._for_update(transaction, hotel_id)
+            if hotel is None:
+                return fail(LOGGER, _not_found(hotel_id), False)
+            if not waitlist.withdraw(transaction, hotel, reservation_id):
+                return fail(LOGGER, NotFoundError(
+                    "La reservación %s no está en la lista de espera del "
+                    "hotel %s.", reservation_id, hotel_id,
+                ), False)
+            transaction.put(hotels, hotel_id, hotel.to_dict())
+        succeed(LOGGER, "Reservación %s fuera de la lista de espera.",
+                reservation_id)
+        return True
+
+    @staticmethod
+    def _promote(transaction, hotel, check_in=None, check_out=None):
+        """Reserva las peticiones en espera que caben en lo liberado.
+
+        Cambia ``hotel`` en memoria y agrega a la transacción los
+        registros de las reservaciones creadas.
+        """
+        reservation = _reservation()
+        reservations = get_repository(reservation.RESERVATIONS_FILE,
+                                      "reservaciones")
+
+        def admit(reservation_id, entry):
+            """Reserva una petición; False si todavía no cabe."""
+            customer_id = entry["customer_id"]
+            first, last = entry["check_in"], entry["check_out"]
+            record = reservation.Reservation(
+                reservation_id, customer_id, hotel.hotel_id, first, last
+            ).to_dict()
+            if transaction.contains(reservations, reservation_id):
+                LOGGER.warning(
+                    "La reservación %s ya existe; se quita de la lista de "
+                    "espera.", reservation_id,
+                )
+                return True
+            try:
+                reservations.validate(reservation_id, record)
+            except ValueError as e:
+                LOGGER.warning(
+                    "La reservación %s no es válida (%s); se quita de la "
+                    "lista de espera.", reservation_id, e,
+                )
+                return True
+            if (
+                hotel.available_rooms(first, last) <= 0
+                or rooms.assign(hotel, reservation_id, (first, last)) is None
+            ):
+                return False
+            hotel.reservations[reservation_id] = customer_id
+            if first is not None:
+                occupancy.book(hotel.hotel_id, hotel.stays, reservation_id,
+                               first, last)
+            transaction.put(reservations, reservation_id, record)
+            LOGGER.info("Reservación %s confirmada desde la lista de espera.",
+                        reservation_id)
+            return True
+
+        waitlist.drain(transaction, hotel, admit, check_in, check_out)
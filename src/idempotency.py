@@ -0,0 +1,100 @@
+"""Claves de idempotencia para crear y cancelar reservaciones.
+
+Un cliente que reintenta (p. ej. detrás de un balanceador) manda la misma
+``idempotency_key`` en cada intento::
+
+    Reservation.create_reservation("R1", "C1", "H1", "2025-01-01",
+                                   "2025-01-03", idempotency_key="abc")
+
+El primer intento que tiene éxito guarda la clave, la petición y su
+resultado en ``idempotency.json`` dentro de la misma transacción que la
+reservación, así que ambos quedan en disco o ninguno. Un reintento con la
+misma clave y la misma petición regresa el resultado original sin tocar
+el hotel ni escribir archivos; con otra petición es un
+``IdempotencyConflictError``. Las fallas no se guardan: reintentarlas
+vuelve a ejecutar la operación.
+
+Las claves caducan a los ``ttl`` segundos y se guardan a lo más
+``max_entries``; al llegar al límite se borran las caducadas y, si no
+basta, las más viejas (en la misma transacción que la clave nueva).
+"""
+
+import copy
+import time
+
+import metrics
+from reporting import IdempotencyConflictError, fail, get_logger
+from repository import get_repository
+
+LOGGER = get_logger("idempotency")
+
+IDEMPOTENCY_FILE = "idempotency.json"
+_LIMITS = {"ttl": 24 * 60 * 60, "max_entries": 10000}
+
+
+def _repository():
+    """Repositorio en memoria del archivo de claves."""
+    return get_repository(IDEMPOTENCY_FILE, "claves de idempotencia")
+
+
+def load_keys():
+    """Regresa una copia de las claves guardadas."""
+    return copy.deepcopy(_repository().all())
+
+
+def set_limits(ttl=None, max_entries=None):
+    """Cambia la vida (segundos) y el número máximo de claves guardadas."""
+    if ttl is not None:
+        _LIMITS["ttl"] = ttl
+    if max_entries is not None:
+        _LIMITS["max_entries"] = max_entries
+
+
+def _live(entry, now):
+    """Indica si la entrada sigue vigente."""
+    return entry is not None and entry["created"] + _LIMITS["ttl"] > now
+
+
+def lookup(key, request, transaction=None):
+    """Regresa ``(encontrada, resultado)`` de una clave ya usada.
+
+    ``(False, None)`` si la clave no existe o caducó. Si la clave se usó
+    con otra petición registra un IdempotencyConflictError y regresa
+    ``(True, None)``.
+    """
+    repository = _repository()
+    if transaction is None:
+        entry = repository.get(key)
+    else:
+        entry = transaction.get(repository, key)
+    if not _live(entry, time.time()):
+        return False, None
+    if entry["request"] != request:
+        return True, fail(LOGGER, IdempotencyConflictError(
+            "La clave de idempotencia %s ya se usó con otra petición.", key
+        ))
+    metrics.increment("idempotent_replays_total",
+                      operation=request["operation"])
+    LOGGER.info("Reintento con clave %s: se regresa el resultado original.",
+                key)
+    return True, entry["result"]
+
+
+def record(transaction, key, request, result):
+    """Agrega la clave y su resultado a la transacción."""
+    repository = _repository()
+    now = time.time()
+    stored = repository.all()
+    if len(stored) >= _LIMITS["max_entries"] and key not in stored:
+        # Todas caducan igual, así que las caducadas son las más viejas.
+        # Se borra una décima parte de más para no repetir esto con cada
+        # clave nueva.
+        oldest = sorted(stored, key=lambda name: stored[name]["created"])
+        stale = sum(1 for name in oldest if not _live(stored[name], now))
+        excess = len(stored) + 1 - _LIMITS["max_entries"]
+        count = max(stale, excess + _LIMITS["max_entries"] // 10)
+        for name in oldest[:count]:
+            transaction.delete(repository, name)
+    transaction.put(repository, key, {
+        "request": request, "result": result, "created": now,
+    })
@@ -0,0 +1,177 @@
+"""Candados entre procesos basados en archivos (fcntl.flock).
+
+``FileLock`` es un candado con nombre (p. ej. ``hotel:H1``), exclusivo
+o compartido. ``FileGuard`` protege un archivo de datos completo: los
+lectores lo toman compartido y los escritores exclusivo; dentro del
+proceso es reentrante.
+
+Cada vez que un candado no se obtiene a la primera se cuenta como
+contención; los números quedan en ``metrics``:
+
+* ``lock_acquisitions_total{kind=..., mode=...}``
+* ``lock_contended_total{kind=..., mode=...}``
+* ``lock_wait_seconds{kind=...}`` (solo las esperas)
+
+``kind`` es la parte del nombre antes de ``:`` (``hotel``, ``file``...).
+
+Los archivos de ``FileLock`` se borran al soltarlos si nadie más los
+tiene, así ``.locks/`` no crece con cada hotel o cliente que se toca.
+Quien esperaba sobre un archivo ya borrado lo nota al obtenerlo y vuelve
+a intentar con el archivo nuevo.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import os
+import threading
+import time
+
+import metrics
+
+LOCK_DIR = ".locks"
+
+
+def lock_path(name):
+    """Ruta del archivo de candado para un nombre cualquiera."""
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(LOCK_DIR, digest + ".lock")
+
+
+def _open_lock_file(path):
+    """Abre (o crea) el archivo de candado."""
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+def _flock(fd, name, shared, blocking=True):
+    """Toma el flock; si hay que esperar, lo registra como contención.
+
+    Con ``blocking=False`` no espera: regresa False si está ocupado.
+    """
+    kind = name.split(":", 1)[0]
+    mode = "shared" if shared else "exclusive"
+    operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    metrics.increment("lock_acquisitions_total", kind=kind, mode=mode)
+    try:
+        fcntl.flock(fd, operation | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        pass
+    metrics.increment("lock_contended_total", kind=kind, mode=mode)
+    if not blocking:
+        return False
+    start = time.perf_counter()
+    fcntl.flock(fd, operation)
+    metrics.observe("lock_wait_seconds", time.perf_counter() - start,
+                    kind=kind)
+    return True
+
+
+class FileLock:
+    """Candado sobre un archivo, usable con ``with``."""
+
+    def __init__(self, name, shared=False):
+        """El candado se identifica por ``name`` (p. ej. 'hotel:H1').
+
+        Con ``shared=True`` varios lectores pueden tenerlo a la vez.
+        """
+        self.name = name
+        self.shared = shared
+        self.path = lock_path(name)
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        """Espera hasta obtener el candado.
+
+        Con ``blocking=False`` regresa False en lugar de esperar.
+        """
+        while True:
+            fd = _open_lock_file(self.path)
+            if not _flock(fd, self.name, self.shared, blocking):
+                os.close(fd)
+                return False
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(fd).st_ino:
+                self._fd = fd
+                return True
+            # Quien lo tenía borró el archivo mientras se esperaba.
+            os.close(fd)
+
+    def release(self):
+        """Suelta el candado; borra el archivo si nadie más lo tiene."""
+        if self._fd is None:
+            return
+        try:
+            # Solo se obtiene exclusivo si no hay otros lectores.
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.unlink(self.path)
+        except OSError:
+            pass
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self):
+        """Obtiene el candado al entrar al bloque."""
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Suelta el candado al salir del bloque."""
+        self.release()
+
+
+class FileGuard:
+    """Candado de lectura/escritura de un archivo de datos.
+
+    Guarda abierto el archivo de candado (uno por proceso; se vuelve a
+    abrir después de un ``fork``) y es reentrante: las llamadas
+    anidadas del mismo hilo no vuelven a tomar el flock.
+    """
+
+    def __init__(self, name):
+        """Candado ``name`` (p. ej. 'file:/ruta/hotels.json')."""
+        self.name = name
+        self.path = lock_path(name)
+        self._lock = threading.RLock()
+        self._fd = None
+        self._pid = None
+        self._depth = 0
+        self._exclusive = False
+
+    def _descriptor(self):
+        """Archivo de candado propio de este proceso."""
+        if self._pid != os.getpid():
+            # El descriptor heredado comparte el flock con el padre.
+            self._fd = _open_lock_file(self.path)
+            self._pid = os.getpid()
+        return self._fd
+
+    @contextlib.contextmanager
+    def hold(self, exclusive):
+        """Tiene el archivo compartido (lectura) o exclusivo (escritura)."""
+        with self._lock:
+            fd = self._descriptor()
+            if self._depth == 0 or (exclusive and not self._exclusive):
+                _flock(fd, self.name, not exclusive)
+                self._exclusive = exclusive or self._exclusive
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    self._exclusive = False
+
+    def close(self):
+        """Cierra el archivo de candado."""
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+            self._pid = None
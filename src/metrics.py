@@ -0,0 +1,182 @@
+"""Contadores e histogramas de tiempo para las operaciones del sistema.
+
+Se registran:
+
+* ``operation_seconds{operation=...}``: cada método público de Hotel,
+  Customer y Reservation, y las funciones load_*/save_*.
+* ``store_seconds{file=..., action=...}``: lecturas y escrituras del
+  almacenamiento (load, save, append, lookup, query, write).
+* ``store_bytes_read_total`` y ``store_bytes_written_total`` por archivo.
+* ``cache_hits_total`` y ``cache_misses_total`` del repositorio en
+  memoria.
+
+Los datos se consultan con ``snapshot()`` o se escriben en formato de
+texto de Prometheus con ``write_prometheus(path)``.
+"""
+
+import contextlib
+import functools
+import os
+import threading
+import time
+
+PREFIX = "reservations_"
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+_LOCK = threading.Lock()
+_COUNTERS = {}
+_HISTOGRAMS = {}
+_ACTIVE = threading.local()
+_STATE = {"enabled": True}
+
+
+def _key(name, labels):
+    """Llave interna de una métrica con etiquetas."""
+    return name, tuple(sorted(labels.items()))
+
+
+def set_enabled(enabled):
+    """Activa o desactiva la recolección de métricas."""
+    _STATE["enabled"] = enabled
+
+
+def reset():
+    """Borra todas las métricas."""
+    with _LOCK:
+        _COUNTERS.clear()
+        _HISTOGRAMS.clear()
+
+
+def increment(name, amount=1, **labels):
+    """Suma ``amount`` a un contador."""
+    if not _STATE["enabled"]:
+        return
+    key = _key(name, labels)
+    with _LOCK:
+        _COUNTERS[key] = _COUNTERS.get(key, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    """Registra una duración en un histograma."""
+    if not _STATE["enabled"]:
+        return
+    key = _key(name, labels)
+    with _LOCK:
+        histogram = _HISTOGRAMS.get(key)
+        if histogram is None:
+            histogram = {"buckets": [0] * len(BUCKETS), "sum": 0.0,
+                         "count": 0}
+            _HISTOGRAMS[key] = histogram
+        for position, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][position] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+
+@contextlib.contextmanager
+def timer(name, **labels):
+    """Mide un bloque ``with`` y lo registra en el histograma ``name``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def timed(operation):
+    """Decorador: mide cada llamada en ``operation_seconds``.
+
+    Las llamadas anidadas de la misma operación (p. ej. reserve_room que
+    abre su propia transacción) cuentan una sola vez.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            active = getattr(_ACTIVE, "operations", None)
+            if active is None:
+                active = _ACTIVE.operations = set()
+            if operation in active or not _STATE["enabled"]:
+                return fn(*args, **kwargs)
+            active.add(operation)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                active.discard(operation)
+                observe("operation_seconds", time.perf_counter() - start,
+                        operation=operation)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """Copia de todas las métricas.
+
+    Regresa ``{"counters": {...}, "histograms": {...}}`` con llaves como
+    ``'cache_hits_total{file="hoteles"}'``.
+    """
+    with _LOCK:
+        return {
+            "counters": {
+                _series(name, labels): value
+                for (name, labels), value in _COUNTERS.items()
+            },
+            "histograms": {
+                _series(name, labels): {
+                    "buckets": dict(zip(BUCKETS, h["buckets"])),
+                    "sum": h["sum"],
+                    "count": h["count"],
+                }
+                for (name, labels), h in _HISTOGRAMS.items()
+            },
+        }
+
+
+def _series(name, labels, extra=()):
+    """Nombre de una serie con sus etiquetas, estilo Prometheus."""
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return name
+    inner = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return f"{name}{{{inner}}}"
+
+
+def prometheus_text():
+    """Todas las métricas en formato de texto de Prometheus."""
+    lines = []
+    with _LOCK:
+        counters = sorted(_COUNTERS.items())
+        histograms = sorted(
+            (key, dict(h, buckets=list(h["buckets"])))
+            for key, h in _HISTOGRAMS.items()
+        )
+    typed = set()
+    for (name, labels), value in counters:
+        if name not in typed:
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            typed.add(name)
+        lines.append(f"{_series(PREFIX + name, labels)} {value}")
+    for (name, labels), h in histograms:
+        if name not in typed:
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            typed.add(name)
+        for bound, count in zip(BUCKETS, h["buckets"]):
+            series = _series(f"{PREFIX}{name}_bucket", labels,
+                             [("le", bound)])
+            lines.append(f"{series} {count}")
+        series = _series(f"{PREFIX}{name}_bucket", labels, [("le", "+Inf")])
+        lines.append(f"{series} {h['count']}")
+        lines.append(f"{_series(PREFIX + name + '_sum', labels)} {h['sum']}")
+        lines.append(
+            f"{_series(PREFIX + name + '_count', labels)} {h['count']}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Escribe las métricas en ``path`` (reemplazo atómico)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
@@ -0,0 +1,540 @@
+"""Reservaciones en registros de ancho fijo sobre un archivo con mmap.
+
+Las reservaciones siempre tienen los mismos cinco campos (ver
+``Reservation.to_dict``), así que cada una ocupa un espacio (slot) de
+tamaño fijo en ``reservations.mmap``. El archivo tiene tres partes:
+
+* encabezado: formato, capacidad, conteos, inicio de la lista de slots
+  libres y un número de generación que cambia con cada escritura;
+* tabla hash (direccionamiento abierto) de reservation_id -> slot;
+* los slots; uno cancelado se encadena a la lista de libres y se reusa.
+
+Un campo en None (reservación sin fechas) se guarda como ``NULL`` y se
+lee otra vez como None. ``validate`` revisa que un registro quepa en un
+slot; las transacciones lo llaman al preparar el cambio, antes del
+journal.
+
+Leer o cancelar una reservación toca solo su cubeta y su slot, sin
+reescribir el archivo. Varios procesos comparten las mismas páginas
+del archivo; las escrituras toman ``flock`` exclusivo y las lecturas
+compartido. Cuando se llena se arma un archivo más grande y se
+reemplaza con ``os.replace``; los demás procesos lo notan por el inodo.
+"""
+
+import contextlib
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+import metrics
+
+FIELDS = ("reservation_id", "customer_id", "hotel_id", "check_in",
+          "check_out")
+MAGIC = b"RSVM"
+VERSION = 1
+# magic, versión, ancho de campo, capacidad, registros, slots usados,
+# cubetas borradas, primer slot libre, generación.
+HEADER = struct.Struct("<4sHHIIIIiQ")
+HEADER_SIZE = 64
+BUCKET = struct.Struct("<i")
+EMPTY = 0
+TOMBSTONE = -1
+FREE = 0
+USED = 1
+INITIAL_CAPACITY = 1024
+# Campo en None (p. ej. una reservación sin fechas). No es UTF-8 válido,
+# así que no se confunde con ningún texto, ni siquiera con "".
+NULL = b"\xff"
+# Se rehace la tabla hash al pasar de esta fracción de cubetas ocupadas.
+MAX_LOAD = 0.75
+
+
+def mmap_path(path):
+    """Ruta del archivo de registros que corresponde a un archivo JSON."""
+    return os.path.splitext(path)[0] + ".mmap"
+
+
+def _decode(raw):
+    """Valor de un campo leído del archivo."""
+    return None if raw == NULL else raw.decode("utf-8")
+
+
+def _hash(key):
+    """Hash estable entre procesos (``hash`` cambia en cada proceso)."""
+    return zlib.crc32(key)
+
+
+class _Layout:
+    """Posiciones dentro del archivo para una capacidad dada."""
+
+    def __init__(self, capacity, field_size):
+        """Calcula tamaños a partir de la capacidad y el ancho."""
+        self.capacity = capacity
+        self.buckets = capacity * 2
+        self.record = struct.Struct("<Bi" + f"{field_size}s" * len(FIELDS))
+        self.records_offset = HEADER_SIZE + self.buckets * BUCKET.size
+        self.size = self.records_offset + capacity * self.record.size
+
+    def bucket_offset(self, bucket):
+        """Posición de una cubeta de la tabla hash."""
+        return HEADER_SIZE + bucket * BUCKET.size
+
+    def slot_offset(self, slot):
+        """Posición de un slot de registro."""
+        return self.records_offset + slot * self.record.size
+
+
+class _Mapping:
+    """Archivo abierto: descriptor, mapa en memoria, inodo y posiciones."""
+
+    def __init__(self, fd, buffer, inode, layout):
+        """Guarda lo que regresa ``MmapRepository._open``."""
+        self.fd = fd
+        self.map = buffer
+        self.inode = inode
+        self.layout = layout
+
+    def flock(self, operation):
+        """``fcntl.flock`` sobre el descriptor."""
+        fcntl.flock(self.fd, operation)
+
+    def close(self):
+        """Suelta el mapa y el descriptor (y con ellos el flock)."""
+        self.map.close()
+        os.close(self.fd)
+
+
+class _Indexes:
+    """Índices por campo, válidos para una versión del archivo.
+
+    La versión es (inodo, generación); None si no se sabe.
+    """
+
+    def __init__(self):
+        """Sin índices."""
+        self.version = None
+        self.fields = {}
+
+    def reset(self, version=None):
+        """Olvida los índices; los siguientes son de ``version``."""
+        self.version = version
+        self.fields = {}
+
+    def for_version(self, version):
+        """Índices de ``version``; si eran de otra, se olvidan."""
+        if self.version != version:
+            self.reset(version)
+        return self.fields
+
+
+class MmapRepository:
+    """Repositorio de reservaciones con la interfaz de ``Repository``."""
+
+    def __init__(self, path, label, field_size=32,
+                 capacity=INITIAL_CAPACITY):
+        """``field_size`` es el máximo de bytes de cada campo."""
+        self.path = path
+        self.label = label
+        self.field_size = field_size
+        self.initial_capacity = capacity
+        self._lock = threading.RLock()
+        # None mientras el archivo no está abierto.
+        self._file = None
+        self._indexes = _Indexes()
+
+    @property
+    def file_path(self):
+        """Archivo de registros (ver ``mmap_path``)."""
+        return mmap_path(self.path)
+
+    # --- Archivo ---
+
+    def _encode(self, key, value):
+        """Campos del registro como bytes de ancho fijo."""
+        if set(value) != set(FIELDS) or value["reservation_id"] != key:
+            raise ValueError(f"Registro de {self.label} inválido: {key}")
+        encoded = []
+        for field in FIELDS:
+            if value[field] is None:
+                encoded.append(NULL)
+                continue
+            raw = str(value[field]).encode("utf-8")
+            if len(raw) > self.field_size:
+                raise ValueError(
+                    f"{field} excede {self.field_size} bytes: {key}"
+                )
+            encoded.append(raw)
+        return encoded
+
+    def _build(self, records, capacity):
+        """Escribe un archivo nuevo con ``records`` y lo pone en su lugar."""
+        layout = _Layout(capacity, self.field_size)
+        buf = bytearray(layout.size)
+        for slot, (key, value) in enumerate(records.items()):
+            layout.record.pack_into(buf, layout.slot_offset(slot), USED, -1,
+                                    *self._encode(key, value))
+            bucket = _hash(key.encode("utf-8")) % layout.buckets
+            while BUCKET.unpack_from(buf, layout.bucket_offset(bucket))[0]:
+                bucket = (bucket + 1) % layout.buckets
+            BUCKET.pack_into(buf, layout.bucket_offset(bucket), slot + 1)
+        HEADER.pack_into(buf, 0, MAGIC, VERSION, self.field_size, capacity,
+                         len(records), len(records), 0, -1, 0)
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buf)
+        os.replace(tmp_path, self.file_path)
+        metrics.increment("store_bytes_written_total", len(buf),
+                          file=self.label)
+
+    def _initial_records(self):
+        """Reservaciones del archivo JSON, si existe (migración)."""
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _open(self):
+        """Abre (o crea) el archivo y lo mapea en memoria."""
+        self._close_map()
+        if not os.path.exists(self.file_path):
+            records = self._initial_records()
+            self._build(records, self._capacity_for(len(records)))
+        fd = os.open(self.file_path, os.O_RDWR)
+        try:
+            st = os.fstat(fd)
+            buffer = mmap.mmap(fd, st.st_size)
+        except (OSError, ValueError):
+            os.close(fd)
+            raise
+        magic, version, field_size, capacity = HEADER.unpack_from(
+            buffer
+        )[:4]
+        mapping = _Mapping(fd, buffer, st.st_ino,
+                           _Layout(capacity, field_size))
+        if magic != MAGIC or version != VERSION:
+            mapping.close()
+            raise ValueError(f"Archivo de {self.label} con formato inválido")
+        self.field_size = field_size
+        self._file = mapping
+
+    def _close_map(self):
+        """Suelta el archivo abierto, si hay."""
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+
+    def _stale(self):
+        """Indica si el archivo fue reemplazado o borrado."""
+        try:
+            return os.stat(self.file_path).st_ino != self._file.inode
+        except OSError:
+            return True
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive):
+        """Abre el archivo vigente y lo bloquea (flock) mientras se usa."""
+        with self._lock:
+            while True:
+                if self._file is None or self._stale():
+                    self._open()
+                self._file.flock(
+                    fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                )
+                if not self._stale():
+                    break
+                # Otro proceso lo reemplazó mientras se esperaba el candado.
+                self._file.flock(fcntl.LOCK_UN)
+            try:
+                yield
+            finally:
+                if self._file is not None:
+                    self._file.flock(fcntl.LOCK_UN)
+
+    def _capacity_for(self, count):
+        """Capacidad inicial para ``count`` registros, con espacio extra."""
+        return max(self.initial_capacity, count * 2)
+
+    def _header(self):
+        """Campos variables del encabezado como diccionario."""
+        (_, _, _, _, count, high, tombstones, free_head,
+         generation) = HEADER.unpack_from(self._file.map)
+        return {"count": count, "high": high, "tombstones": tombstones,
+                "free_head": free_head, "generation": generation}
+
+    def _write_header(self, header):
+        """Guarda los campos variables del encabezado."""
+        HEADER.pack_into(
+            self._file.map, 0, MAGIC, VERSION, self.field_size,
+            self._file.layout.capacity, header["count"], header["high"],
+            header["tombstones"], header["free_head"], header["generation"],
+        )
+
+    # --- Registros ---
+
+    def _key_at(self, slot):
+        """reservation_id guardado en un slot."""
+        start = self._file.layout.slot_offset(slot) + 5
+        return self._file.map[start:start + self.field_size].rstrip(b"\0")
+
+    def _read(self, slot):
+        """Registro de un slot como diccionario."""
+        layout = self._file.layout
+        status, _, *values = layout.record.unpack_from(
+            self._file.map, layout.slot_offset(slot)
+        )
+        if status != USED:
+            return None
+        return {
+            field: _decode(raw.rstrip(b"\0"))
+            for field, raw in zip(FIELDS, values)
+        }
+
+    def _locate(self, raw_key):
+        """(cubeta, slot) de la llave; slot es None si no está.
+
+        Si no está, la cubeta es donde se insertaría.
+        """
+        layout, buffer = self._file.layout, self._file.map
+        buckets = layout.buckets
+        bucket = _hash(raw_key) % buckets
+        reuse = None
+        for _ in range(buckets):
+            value = BUCKET.unpack_from(buffer,
+                                       layout.bucket_offset(bucket))[0]
+            if value == EMPTY:
+                return (bucket if reuse is None else reuse), None
+            if value == TOMBSTONE:
+                if reuse is None:
+                    reuse = bucket
+            elif self._key_at(value - 1) == raw_key:
+                return bucket, value - 1
+            bucket = (bucket + 1) % buckets
+        return reuse, None
+
+    def _rehash(self, header):
+        """Rehace la tabla hash sin cubetas borradas."""
+        layout = self._file.layout
+        start = layout.bucket_offset(0)
+        self._file.map[start:layout.records_offset] = bytes(
+            layout.records_offset - start
+        )
+        for slot in range(header["high"]):
+            if self._file.map[layout.slot_offset(slot)] == USED:
+                bucket, _ = self._locate(self._key_at(slot))
+                BUCKET.pack_into(self._file.map, layout.bucket_offset(bucket),
+                                 slot + 1)
+        header["tombstones"] = 0
+
+    def _grow(self):
+        """Pasa todo a un archivo con el doble de capacidad."""
+        records = self._scan()
+        self._build(records, self._file.layout.capacity * 2)
+        self._open()
+        self._file.flock(fcntl.LOCK_EX)
+
+    def _insert(self, key, raw_key, encoded, header):
+        """Guarda un registro nuevo en un slot libre."""
+        layout, buffer = self._file.layout, self._file.map
+        if header["free_head"] >= 0:
+            slot = header["free_head"]
+            header["free_head"] = struct.unpack_from(
+                "<i", buffer, layout.slot_offset(slot) + 1
+            )[0]
+        else:
+            slot = header["high"]
+            header["high"] += 1
+        if header["count"] + header["tombstones"] + 1 > (
+            layout.buckets * MAX_LOAD
+        ):
+            self._rehash(header)
+        bucket, _ = self._locate(raw_key)
+        if bucket is None:
+            raise ValueError(f"Tabla hash llena en {self.label}: {key}")
+        layout.record.pack_into(buffer, layout.slot_offset(slot), USED, -1,
+                                *encoded)
+        value = BUCKET.unpack_from(buffer, layout.bucket_offset(bucket))
+        if value[0] == TOMBSTONE:
+            header["tombstones"] -= 1
+        BUCKET.pack_into(buffer, layout.bucket_offset(bucket), slot + 1)
+        header["count"] += 1
+
+    def _put(self, key, encoded, header):
+        """Guarda o reemplaza un registro (ya codificado) en su lugar."""
+        raw_key = key.encode("utf-8")
+        _, slot = self._locate(raw_key)
+        if slot is not None:
+            layout = self._file.layout
+            layout.record.pack_into(
+                self._file.map, layout.slot_offset(slot), USED, -1, *encoded
+            )
+            return header
+        if header["free_head"] < 0 and (
+            header["high"] >= self._file.layout.capacity
+        ):
+            self._write_header(header)
+            self._grow()
+            header = self._header()
+        self._insert(key, raw_key, encoded, header)
+        return header
+
+    def _remove(self, key, header):
+        """Marca el slot como libre y deja una cubeta borrada."""
+        bucket, slot = self._locate(key.encode("utf-8"))
+        if slot is None:
+            return
+        layout, buffer = self._file.layout, self._file.map
+        BUCKET.pack_into(buffer, layout.bucket_offset(bucket), TOMBSTONE)
+        layout.record.pack_into(
+            buffer, layout.slot_offset(slot), FREE,
+            header["free_head"], *[b""] * len(FIELDS)
+        )
+        header["free_head"] = slot
+        header["count"] -= 1
+        header["tombstones"] += 1
+
+    def _scan(self):
+        """Todos los registros, en orden de slot."""
+        records = {}
+        for slot in range(self._header()["high"]):
+            record = self._read(slot)
+            if record is not None:
+                records[record["reservation_id"]] = record
+        return records
+
+    # --- Interfaz de Repository ---
+
+    def all(self):
+        """Todos los registros como diccionario nuevo."""
+        with self._locked(False):
+            return self._scan()
+
+    def get(self, key):
+        """Regresa el registro con esa llave, o None."""
+        with self._locked(False), metrics.timer(
+            "store_seconds", file=self.label, action="query"
+        ):
+            _, slot = self._locate(str(key).encode("utf-8"))
+            if slot is None:
+                return None
+            metrics.increment("store_bytes_read_total",
+                              self._file.layout.record.size, file=self.label)
+            return self._read(slot)
+
+    def contains(self, key):
+        """Indica si existe un registro con esa llave."""
+        with self._locked(False):
+            return self._locate(str(key).encode("utf-8"))[1] is not None
+
+    def find(self, field, value):
+        """Llaves de los registros cuyo campo ``field`` vale ``value``.
+
+        Los índices se arman con un recorrido y se mantienen con las
+        escrituras propias; si otro proceso escribe, se vuelven a armar.
+        """
+        with self._locked(False):
+            indexes = self._indexes.for_version(
+                (self._file.inode, self._header()["generation"])
+            )
+            index = indexes.get(field)
+            if index is None:
+                index = {}
+                for key, record in self._scan().items():
+                    index.setdefault(record.get(field), {})[key] = None
+                indexes[field] = index
+            return list(index.get(value, ()))
+
+    def _reindex(self, puts, deletes):
+        """Actualiza los índices antes de aplicar cambios propios."""
+        for field, index in self._indexes.fields.items():
+            for key in [*puts, *deletes]:
+                _, slot = self._locate(key.encode("utf-8"))
+                if slot is not None:
+                    keys = index.get(self._read(slot)[field], {})
+                    keys.pop(key, None)
+            for key, value in puts.items():
+                index.setdefault(value.get(field), {})[key] = None
+
+    def put(self, key, value):
+        """Guarda (o reemplaza) un registro."""
+        self.update({key: value})
+
+    def delete(self, key):
+        """Borra un registro existente."""
+        self.update({}, [key])
+
+    def validate(self, key, value):
+        """Lanza ValueError si el registro no cabe en un slot."""
+        self._encode(key, value)
+
+    def update(self, puts, deletes=()):
+        """Guarda y borra varios registros bajo un solo candado.
+
+        Todos los registros se codifican antes de tocar el archivo: si
+        uno no es válido (ValueError) no se escribe ninguno.
+        """
+        encoded = {key: self._encode(key, value)
+                   for key, value in puts.items()}
+        with self._locked(True), metrics.timer(
+            "store_seconds", file=self.label, action="write"
+        ):
+            header = self._header()
+            inode = self._file.inode
+            current = self._indexes.version == (inode, header["generation"])
+            if current:
+                self._reindex(puts, deletes)
+            for key, fields in encoded.items():
+                header = self._put(key, fields, header)
+            for key in deletes:
+                self._remove(key, header)
+            header["generation"] += 1
+            self._write_header(header)
+            # Si el archivo creció, otro proceso pudo escribir en medio.
+            self._indexes.version = (
+                (inode, header["generation"])
+                if current and inode == self._file.inode else None
+            )
+            metrics.increment(
+                "store_bytes_written_total",
+                (len(puts) + len(deletes)) * self._file.layout.record.size,
+                file=self.label,
+            )
+
+    def replace(self, data):
+        """Sustituye todos los registros con un archivo nuevo."""
+        with self._locked(True):
+            self._build(data, self._capacity_for(len(data)))
+        self._indexes.reset()
+
+    def compact(self):
+        """Rehace la tabla hash para quitar las cubetas borradas."""
+        with self._locked(True):
+            header = self._header()
+            self._rehash(header)
+            self._write_header(header)
+
+    def invalidate(self):
+        """Olvida los índices en memoria."""
+        self._indexes.reset()
+
+    def close(self):
+        """Suelta el mapa en memoria."""
+        with self._lock:
+            self._close_map()
+        self.invalidate()
+
+
+def export_json(path, label="reservaciones"):
+    """Escribe las reservaciones del archivo mmap al archivo JSON."""
+    repository = MmapRepository(path, label)
+    try:
+        data = repository.all()
+    finally:
+        repository.close()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
@@ -0,0 +1,111 @@
+"""Ocupación por noche de cada hotel.
+
+Cada hotel guarda en ``stays`` las fechas de sus reservaciones
+(``{reservation_id: [check_in, check_out]}``). A partir de ahí se arma un
+``OccupancyIndex``: cuántas habitaciones están ocupadas cada noche. Saber
+si hay lugar para un rango cuesta O(noches), sin recorrer las
+reservaciones.
+
+Los índices se guardan en memoria por hotel y se asocian al diccionario
+``stays`` del que salieron; si el diccionario es otro el índice se
+vuelve a armar. Los registros guardados no se modifican en su lugar:
+para cambiar uno se saca una copia con ``copy_stays`` (que conserva el
+índice) y ``book``/``release`` cambian esa copia.
+"""
+
+from datetime import date
+
+_CACHE = {}
+
+
+def to_ordinal(value):
+    """Convierte una fecha 'YYYY-MM-DD' (o date) a número de día."""
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(value).toordinal()
+
+
+def nights(check_in, check_out):
+    """Rango de noches ocupadas. Lanza ValueError si no es válido."""
+    first = to_ordinal(check_in)
+    last = to_ordinal(check_out)
+    if last <= first:
+        raise ValueError("check_out must be after check_in.")
+    return range(first, last)
+
+
+class OccupancyIndex:
+    """Habitaciones ocupadas por noche (una cubeta por día)."""
+
+    def __init__(self):
+        """Índice vacío."""
+        self.by_night = {}
+
+    @staticmethod
+    def from_stays(stays):
+        """Arma el índice a partir de los pares (check_in, check_out)."""
+        index = OccupancyIndex()
+        for check_in, check_out in stays:
+            index.add(check_in, check_out)
+        return index
+
+    def add(self, check_in, check_out):
+        """Marca una habitación ocupada cada noche del rango."""
+        for night in nights(check_in, check_out):
+            self.by_night[night] = self.by_night.get(night, 0) + 1
+
+    def remove(self, check_in, check_out):
+        """Libera una habitación cada noche del rango."""
+        for night in nights(check_in, check_out):
+            count = self.by_night[night] - 1
+            if count:
+                self.by_night[night] = count
+            else:
+                del self.by_night[night]
+
+    def peak(self, check_in=None, check_out=None):
+        """Máximo de habitaciones ocupadas en alguna noche del rango.
+
+        Sin fechas regresa el máximo de todas las noches.
+        """
+        if check_in is None:
+            return max(self.by_night.values(), default=0)
+        return max(
+            (self.by_night.get(n, 0) for n in nights(check_in, check_out)),
+            default=0,
+        )
+
+
+def index_for(hotel_id, stays):
+    """Regresa el índice del hotel, armándolo si ``stays`` cambió."""
+    cached = _CACHE.get(hotel_id)
+    if cached is not None and cached[0] is stays:
+        return cached[1]
+    index = OccupancyIndex.from_stays(stays.values())
+    _CACHE[hotel_id] = (stays, index)
+    return index
+
+
+def copy_stays(hotel_id, stays):
+    """Copia de ``stays`` para cambiarla; el índice pasa a la copia."""
+    updated = dict(stays)
+    cached = _CACHE.get(hotel_id)
+    if cached is not None and cached[0] is stays:
+        _CACHE[hotel_id] = (updated, cached[1])
+    return updated
+
+
+def book(hotel_id, stays, reservation_id, check_in, check_out):
+    """Agrega la estancia a ``stays`` (una copia de ``copy_stays``).
+
+    El índice en memoria se actualiza en O(noches).
+    """
+    index_for(hotel_id, stays).add(check_in, check_out)
+    stays[reservation_id] = [check_in, check_out]
+
+
+def release(hotel_id, stays, reservation_id):
+    """Quita de ``stays`` (una copia) la estancia de la reservación."""
+    if reservation_id in stays:
+        index_for(hotel_id, stays).remove(*stays[reservation_id])
+        del stays[reservation_id]
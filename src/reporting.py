@@ -0,0 +1,166 @@
+"""Errores con datos y mensajes por ``logging`` en lugar de ``print``.
+
+Las operaciones de Hotel, Customer y Reservation siguen regresando lo
+mismo (el objeto, True/False o None), pero cada falla queda registrada
+como una excepción de este módulo que se consulta con ``last_error()``
+o se lanza con ``require``::
+
+    hotel = require(Hotel.display_hotel("H1"))   # NotFoundError si no está
+
+Los mensajes se mandan a los loggers ``reservations.*`` con formato
+perezoso: el texto solo se arma si algún handler lo va a usar. Sin
+configuración, las advertencias (fallas) salen por stderr y los mensajes
+de éxito se descartan; ``enable_console()`` recupera la salida de consola
+de siempre y ``SampleFilter`` deja pasar solo una parte de los mensajes.
+"""
+
+import functools
+import logging
+import sys
+import threading
+
+LOGGER_NAME = "reservations"
+
+_LAST = threading.local()
+
+
+class ReservationSystemError(Exception):
+    """Falla de una operación; ``args`` son los datos del mensaje."""
+
+    code = "error"
+
+    def __init__(self, template, *args):
+        """``template`` usa formato ``%`` con ``args``."""
+        super().__init__(*args)
+        self.template = template
+
+    def __str__(self):
+        """Mensaje ya formateado."""
+        return self.template % self.args
+
+
+class NotFoundError(ReservationSystemError):
+    """El registro pedido no existe."""
+
+    code = "not_found"
+
+
+class AlreadyExistsError(ReservationSystemError):
+    """Ya hay un registro con ese ID."""
+
+    code = "already_exists"
+
+
+class NoAvailabilityError(ReservationSystemError):
+    """El hotel no tiene habitaciones libres."""
+
+    code = "no_availability"
+
+
+class WaitlistedError(NoAvailabilityError):
+    """Sin lugar; la petición quedó en la lista de espera del hotel."""
+
+    code = "waitlisted"
+
+
+class InvalidDataError(ReservationSystemError):
+    """Datos incompletos o inválidos (fechas, habitaciones, registros)."""
+
+    code = "invalid_data"
+
+
+class IdempotencyConflictError(ReservationSystemError):
+    """La clave de idempotencia ya se usó con otra petición."""
+
+    code = "idempotency_conflict"
+
+
+class StorageError(ReservationSystemError):
+    """No se pudo escribir un archivo de datos; el cambio no se confirmó."""
+
+    code = "storage_error"
+
+
+def get_logger(name):
+    """Logger ``reservations.<name>``."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def fail(logger, error, result=None):
+    """Registra ``error`` como la última falla y regresa ``result``."""
+    _LAST.error = error
+    logger.warning(error.template, *error.args)
+    return result
+
+
+def succeed(logger, template, *args):
+    """Registra un mensaje de éxito y limpia la última falla."""
+    _LAST.error = None
+    logger.info(template, *args)
+
+
+def last_error():
+    """Excepción de la última operación fallida del hilo, o None."""
+    return getattr(_LAST, "error", None)
+
+
+def reports_storage_errors(logger, result=None):
+    """Decorador: un StorageError de la operación se registra como falla.
+
+    La operación regresa ``result``, como con cualquier otra falla.
+    """
+    def decorator(fn):
+        """Envuelve la operación."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            """Ejecuta la operación y reporta si no se pudo escribir."""
+            try:
+                return fn(*args, **kwargs)
+            except StorageError as e:
+                return fail(logger, e, result)
+        return wrapper
+    return decorator
+
+
+def require(result):
+    """Regresa ``result``; si es None o False lanza la última falla."""
+    if result is None or result is False:
+        raise last_error() or ReservationSystemError("Operación fallida.")
+    return result
+
+
+# ``logging`` solo le pide ``filter``.
+class SampleFilter(logging.Filter):  # pylint: disable=too-few-public-methods
+    """Deja pasar uno de cada ``every`` mensajes."""
+
+    def __init__(self, every):
+        """Muestra de 1 en ``every``."""
+        super().__init__()
+        self.every = every
+        self._seen = 0
+
+    def filter(self, record):
+        """Indica si el mensaje se emite."""
+        self._seen += 1
+        return (self._seen - 1) % self.every == 0
+
+
+def enable_console(level=logging.INFO, stream=None):
+    """Imprime los mensajes en consola (stdout) como antes.
+
+    Regresa el handler para poder quitarlo con ``disable_console``.
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
+
+
+def disable_console(handler):
+    """Quita un handler agregado con ``enable_console``."""
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.removeHandler(handler)
+    if not logger.handlers:
+        logger.setLevel(logging.NOTSET)
@@ -0,0 +1,719 @@
+"""Capa de repositorio: mantiene los datos en memoria y escribe a disco.
+
+Cada archivo de datos (hoteles, clientes, reservaciones) tiene un solo
+repositorio por proceso. Las lecturas se sirven desde memoria y cada
+cambio se escribe de inmediato al archivo. Si otro proceso modifica el
+archivo, el cambio se detecta con su firma (inodo, tamaño y mtime) y se
+vuelve a cargar.
+
+Los valores que regresa el repositorio son compartidos: quien quiera
+cambiar un registro debe armar uno nuevo y guardarlo con ``put``.
+
+Si el archivo no se puede escribir, las escrituras (``update``,
+``flush``, ``replace``) lanzan ``StorageError`` y la memoria se descarta.
+
+``find`` consulta índices secundarios (campo -> llaves) que se arman la
+primera vez que se piden y luego se mantienen con cada cambio.
+
+Con ``set_deferred(True)`` los cambios se aplican solo en memoria y se
+acumulan hasta que se llame ``flush``; ``transaction.flush_batch`` los
+escribe todos juntos (ver ``async_service``). Solo los almacenamientos
+de ``DEFERRED_STORAGES`` la tienen.
+
+Mientras no se haya cargado el archivo completo, ``get`` y ``contains``
+usan el índice de posiciones de ``stream`` para leer solo el registro
+pedido; la carga completa ocurre con la primera escritura o ``all``.
+
+El almacenamiento se elige con ``configure``: ``"json"`` reescribe el
+archivo completo en cada cambio, ``"wal"`` agrega cada cambio como una
+línea a un log que se compacta al pasar cierto tamaño, ``"binary"``
+guarda un snapshot binario compacto (``BinaryStore``), ``"sqlite"``
+guarda cada archivo como una tabla indexada (ver ``sqlite_store``) y
+``"mmap"`` guarda reservaciones en registros de ancho fijo (ver
+``mmap_store``) y ``"sharded"`` reparte el archivo en cubetas por llave
+(ver ``shard_store``). Cada archivo puede usar uno distinto
+(``entities``).
+"""
+
+import importlib
+import json
+import os
+import struct
+
+import metrics
+import stream
+from locks import FileGuard
+from reporting import StorageError, get_logger
+
+LOGGER = get_logger("repository")
+_REPOSITORIES = {}
+_CONFIG = {"storage": "json", "options": {}, "entities": {},
+           "deferred": False}
+# Almacenamientos con escritura diferida (``pending``/``flush``).
+DEFERRED_STORAGES = ("json", "wal", "binary", "sharded")
+
+
+class JsonStore:
+    """Guarda el diccionario completo en un archivo JSON."""
+
+    def __init__(self, path, label):
+        """Ruta del archivo y nombre de la entidad para los mensajes."""
+        self.path = path
+        self.label = label
+        self._index = None
+
+    def signature(self):
+        """Firma del archivo en disco, o None si no existe."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def load(self):
+        """Lee el archivo completo."""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with metrics.timer("store_seconds", file=self.label,
+                               action="load"):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                    metrics.increment("store_bytes_read_total", f.tell(),
+                                      file=self.label)
+                    return data
+        except (json.JSONDecodeError, IOError) as e:
+            LOGGER.error("Error al cargar el archivo de %s: %s", self.label, e)
+            return {}
+
+    def save(self, data):
+        """Escribe el archivo completo. Regresa False si falla.
+
+        Se escribe a un temporal y se reemplaza con ``os.replace`` para
+        que ningún lector vea el archivo a medio escribir.
+        """
+        tmp_path = self.path + ".tmp"
+        try:
+            with metrics.timer("store_seconds", file=self.label,
+                               action="save"):
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=4)
+                    written = f.tell()
+                os.replace(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            LOGGER.error("Error al guardar el archivo de %s: %s",
+                         self.label, e)
+            return False
+        metrics.increment("store_bytes_written_total", written,
+                          file=self.label)
+        return True
+
+    def can_lookup(self):
+        """Indica si se puede leer un registro suelto con el índice."""
+        return True
+
+    def lookup(self, key):
+        """Lee solo el registro ``key`` usando el índice de posiciones."""
+        for _ in range(3):
+            signature = stream.file_signature(self.path)
+            if signature is None:
+                return None
+            try:
+                if self._index is None or self._index[0] != signature:
+                    self._index = stream.load_index(self.path)
+                entry = self._index[1].get(key)
+                if entry is None:
+                    return None
+                with metrics.timer("store_seconds", file=self.label,
+                                   action="lookup"):
+                    value = stream.read_at(self.path, *entry,
+                                           self._index[0])
+            except (ValueError, IOError) as e:
+                LOGGER.error("Error al cargar el archivo de %s: %s",
+                             self.label, e)
+                return None
+            if value is not None:
+                metrics.increment("store_bytes_read_total", entry[1],
+                                  file=self.label)
+                return value
+            # El archivo cambió mientras se leía; se intenta de nuevo.
+            self._index = None
+        return stream.find_record(self.path, key)
+
+    # pylint: disable-next=unused-argument
+    def record_changes(self, data, puts, deletes):
+        """Persiste un grupo de cambios ya aplicados a ``data``."""
+        return self.save(data)
+
+    def compact(self, data):  # pylint: disable=unused-argument
+        """No hay nada que compactar en un archivo completo."""
+        return True
+
+
+class WalStore(JsonStore):
+    """Snapshot JSON más un log de cambios en formato JSON-lines.
+
+    Cada cambio se agrega al final de ``<archivo>.log``. Cuando el log
+    pasa de ``compact_bytes`` se escribe un snapshot nuevo y se vacía el
+    log. Al cargar se lee el snapshot y se aplican los cambios del log.
+    """
+
+    def __init__(self, path, label, compact_bytes=1024 * 1024):
+        """Igual que JsonStore, más el tamaño máximo del log."""
+        super().__init__(path, label)
+        self.log_path = path + ".log"
+        self.compact_bytes = compact_bytes
+        # Bytes buenos del log si la última carga encontró una línea rota.
+        self._torn = None
+
+    def can_lookup(self):
+        """El índice solo sirve si no hay cambios pendientes en el log."""
+        return not os.path.exists(self.log_path)
+
+    def signature(self):
+        """Firma del snapshot y del log juntos."""
+        try:
+            st = os.stat(self.log_path)
+            log = (st.st_ino, st.st_size, st.st_mtime_ns)
+        except OSError:
+            log = None
+        return (super().signature(), log)
+
+    def load(self):
+        """Lee el snapshot y le aplica los cambios del log.
+
+        Se detiene en la primera línea incompleta (de una escritura
+        interrumpida) y recuerda dónde terminan las buenas para que
+        ``record_changes`` corte ahí el log antes de agregar.
+        """
+        data = super().load()
+        self._torn = None
+        if not os.path.exists(self.log_path):
+            return data
+        try:
+            with open(self.log_path, "rb") as f:
+                read = 0
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("línea sin terminar")
+                        entry = json.loads(line)
+                    except ValueError:
+                        self._torn = read
+                        break
+                    read += len(line)
+                    if entry["op"] == "put":
+                        data[entry["key"]] = entry["value"]
+                    else:
+                        data.pop(entry["key"], None)
+            metrics.increment("store_bytes_read_total", read,
+                              file=self.label)
+        except IOError as e:
+            LOGGER.error("Error al cargar el log de %s: %s", self.label, e)
+        return data
+
+    def record_changes(self, data, puts, deletes):
+        """Agrega los cambios al log en una sola escritura.
+
+        Si el log ya creció demasiado se compacta.
+        """
+        lines = [
+            json.dumps({"op": "put", "key": key, "value": value})
+            for key, value in puts.items()
+        ]
+        lines.extend(
+            json.dumps({"op": "delete", "key": key}) for key in deletes
+        )
+        text = "".join(line + "\n" for line in lines)
+        try:
+            if self._torn is not None:
+                # Lo que siga a la línea rota nunca se volvería a leer.
+                os.truncate(self.log_path, self._torn)
+                self._torn = None
+            with metrics.timer("store_seconds", file=self.label,
+                               action="append"):
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(text)
+                    size = f.tell()
+        except IOError as e:
+            LOGGER.error("Error al guardar el log de %s: %s", self.label, e)
+            return False
+        metrics.increment("store_bytes_written_total",
+                          len(text.encode("utf-8")), file=self.label)
+        if size >= self.compact_bytes:
+            return self.compact(data)
+        return True
+
+    def save(self, data):
+        """Un reemplazo completo equivale a compactar."""
+        return self.compact(data)
+
+    def compact(self, data):
+        """Escribe un snapshot nuevo y vacía el log."""
+        if not super().save(data):
+            return False
+        try:
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+            self._torn = None
+        except OSError as e:
+            LOGGER.error("Error al compactar el archivo de %s: %s",
+                         self.label, e)
+            return False
+        return True
+
+
+def _shared(value, pool):
+    """Copia de ``value`` donde cada texto repetido es un solo objeto.
+
+    Pickle guarda una sola vez cada objeto; así los campos y valores que
+    se repiten (llaves, IDs, fechas) se escriben y se leen una vez.
+    """
+    if isinstance(value, str):
+        return pool.setdefault(value, value)
+    if isinstance(value, dict):
+        return {
+            _shared(key, pool): _shared(item, pool)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_shared(item, pool) for item in value]
+    return value
+
+
+def binary_path(path):
+    """Ruta del snapshot binario que corresponde a un archivo JSON."""
+    return os.path.splitext(path)[0] + ".bin"
+
+
+class BinaryStore(JsonStore):
+    """Snapshot binario: encabezado con versión más pickle protocolo 5.
+
+    Ocupa menos que el JSON con sangría y se carga varias veces más
+    rápido. Se guarda junto al JSON (``hotels.json`` -> ``hotels.bin``);
+    si todavía no existe se lee el JSON una vez. El archivo es de la
+    aplicación, con la misma confianza que el código: pickle no es un
+    formato para datos de terceros.
+    """
+
+    MAGIC = b"RSNP"
+    VERSION = 1
+    HEADER = struct.Struct("<4sH")
+
+    def __init__(self, path, label):
+        """Igual que JsonStore; el snapshot va en ``binary_path(path)``."""
+        super().__init__(path, label)
+        self.binary_path = binary_path(path)
+
+    def signature(self):
+        """Firma del snapshot, o del JSON mientras no haya snapshot."""
+        try:
+            st = os.stat(self.binary_path)
+        except OSError:
+            return ("json", super().signature())
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def can_lookup(self):
+        """No hay índice de posiciones para el formato binario."""
+        return False
+
+    def load(self):
+        """Lee el snapshot (o el JSON, si aún no hay snapshot)."""
+        if not os.path.exists(self.binary_path):
+            return super().load()
+        import pickle  # pylint: disable=import-outside-toplevel
+        try:
+            with metrics.timer("store_seconds", file=self.label,
+                               action="load"):
+                with open(self.binary_path, "rb") as f:
+                    raw = f.read()
+                magic, version = self.HEADER.unpack_from(raw)
+                if magic != self.MAGIC or version != self.VERSION:
+                    raise ValueError(f"formato {magic!r} v{version}")
+                data = pickle.loads(memoryview(raw)[self.HEADER.size:])
+        except (ValueError, struct.error, pickle.UnpicklingError,
+                EOFError, IOError) as e:
+            LOGGER.error("Error al cargar el archivo de %s: %s",
+                         self.label, e)
+            return {}
+        metrics.increment("store_bytes_read_total", len(raw),
+                          file=self.label)
+        return data
+
+    def save(self, data):
+        """Escribe el snapshot completo (temporal y ``os.replace``)."""
+        import pickle  # pylint: disable=import-outside-toplevel
+        tmp_path = self.binary_path + ".tmp"
+        try:
+            with metrics.timer("store_seconds", file=self.label,
+                               action="save"):
+                with open(tmp_path, "wb") as f:
+                    f.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+                    pickle.dump(_shared(data, {}), f, protocol=5)
+                    written = f.tell()
+                os.replace(tmp_path, self.binary_path)
+        except (IOError, OSError, pickle.PicklingError) as e:
+            LOGGER.error("Error al guardar el archivo de %s: %s",
+                         self.label, e)
+            return False
+        metrics.increment("store_bytes_written_total", written,
+                          file=self.label)
+        return True
+
+
+def json_to_binary(path, label="datos"):
+    """Convierte el archivo JSON ``path`` a su snapshot binario."""
+    return BinaryStore(path, label).save(JsonStore(path, label).load())
+
+
+def binary_to_json(path, label="datos"):
+    """Exporta el snapshot binario de ``path`` al archivo JSON."""
+    return JsonStore(path, label).save(BinaryStore(path, label).load())
+
+
+def _index_add(index, value, key):
+    """Agrega ``key`` a las llaves del valor ``value``."""
+    index.setdefault(value, {})[key] = None
+
+
+def _index_discard(index, value, key):
+    """Quita ``key`` de las llaves del valor ``value``."""
+    keys = index.get(value)
+    if keys is not None:
+        keys.pop(key, None)
+        if not keys:
+            del index[value]
+
+
+class Repository:
+    """Copia en memoria de un archivo de datos con escritura inmediata."""
+
+    def __init__(self, store):
+        """Usa ``store`` para leer y escribir el archivo."""
+        self.store = store
+        self._data = None
+        self._signature = None
+        self._indexes = {}
+        self._pending = None
+        self._guard = FileGuard(f"file:{store.path}")
+
+    @property
+    def path(self):
+        """Archivo de datos (el del almacenamiento)."""
+        return self.store.path
+
+    @property
+    def label(self):
+        """Nombre de los datos para los mensajes."""
+        return self.store.label
+
+    def _current(self):
+        """Regresa los datos en memoria, recargando si el archivo cambió.
+
+        Los cambios pendientes se vuelven a aplicar sobre lo recargado.
+        """
+        signature = self.store.signature()
+        if self._data is None or signature != self._signature:
+            metrics.increment("cache_misses_total", file=self.label)
+            self._data = self.store.load()
+            self._signature = signature
+            self._indexes = {}
+            if self._pending is not None:
+                self._data.update(self._pending[0])
+                for key in self._pending[1]:
+                    self._data.pop(key, None)
+        else:
+            metrics.increment("cache_hits_total", file=self.label)
+        return self._data
+
+    def _persist(self, written):
+        """Recuerda la nueva firma.
+
+        Si la escritura falló olvida la memoria (la siguiente lectura va
+        a disco) y lanza StorageError.
+        """
+        if written:
+            self._signature = self.store.signature()
+            return
+        self._data = None
+        error = StorageError("No se pudo guardar el archivo de %s.",
+                             self.label)
+        raise error
+
+    def all(self):
+        """Todos los registros. El diccionario no se debe modificar."""
+        with self._guard.hold(False):
+            return self._current()
+
+    def get(self, key):
+        """Regresa el registro con esa llave, o None."""
+        with self._guard.hold(False):
+            if self._data is None and self.store.can_lookup():
+                return self.store.lookup(key)
+            return self._current().get(key)
+
+    def contains(self, key):
+        """Indica si existe un registro con esa llave."""
+        return self.get(key) is not None
+
+    def validate(self, key, value):
+        """Acepta cualquier registro (ver ``MmapRepository.validate``)."""
+
+    def put(self, key, value):
+        """Guarda (o reemplaza) un registro."""
+        self.update({key: value})
+
+    def delete(self, key):
+        """Borra un registro existente."""
+        self.update({}, [key])
+
+    def find(self, field, value):
+        """Llaves de los registros cuyo campo ``field`` vale ``value``."""
+        with self._guard.hold(False):
+            data = self._current()
+            index = self._indexes.get(field)
+            if index is None:
+                index = {}
+                for key, record in data.items():
+                    _index_add(index, record.get(field), key)
+                self._indexes[field] = index
+            return list(index.get(value, ()))
+
+    def _reindex(self, data, puts, deletes):
+        """Actualiza los índices secundarios antes de aplicar cambios."""
+        for field, index in self._indexes.items():
+            for key in [*puts, *deletes]:
+                old = data.get(key)
+                if old is not None:
+                    _index_discard(index, old.get(field), key)
+            for key, value in puts.items():
+                _index_add(index, value.get(field), key)
+
+    def _apply(self, data, puts, deletes):
+        """Aplica cambios a ``data`` y a los índices."""
+        self._reindex(data, puts, deletes)
+        data.update(puts)
+        for key in deletes:
+            data.pop(key, None)
+
+    def update(self, puts, deletes=()):
+        """Guarda y borra varios registros con una sola escritura.
+
+        Se hace con el archivo bloqueado en exclusivo, después de
+        recargarlo si otro proceso lo cambió: no se pierden sus cambios.
+        """
+        with self._guard.hold(True):
+            data = self._current()
+            if _CONFIG["deferred"]:
+                self._defer(data, puts, deletes)
+                return
+            self._apply(data, puts, deletes)
+            self._persist(self.store.record_changes(data, puts, deletes))
+
+    def _defer(self, data, puts, deletes):
+        """Aplica los cambios solo en memoria y los junta en pendientes.
+
+        De cada llave se recuerda el valor que tenía antes del primer
+        cambio, para poder deshacer el lote.
+        """
+        if self._pending is None:
+            self._pending = ({}, {}, {})
+        pending_puts, pending_deletes, originals = self._pending
+        for key in [*puts, *deletes]:
+            if key not in originals:
+                originals[key] = data.get(key)
+        self._apply(data, puts, deletes)
+        for key in deletes:
+            pending_puts.pop(key, None)
+            pending_deletes[key] = None
+        for key, value in puts.items():
+            pending_deletes.pop(key, None)
+            pending_puts[key] = value
+
+    def pending(self):
+        """Cambios sin escribir: (puts, deletes, originales), o None.
+
+        ``originales`` tiene el valor de cada llave antes del lote.
+        """
+        if self._pending is None:
+            return None
+        puts, deletes, originals = self._pending
+        return puts, list(deletes), originals
+
+    def flush(self):
+        """Escribe de una vez los cambios pendientes.
+
+        Si otro proceso escribió el archivo mientras tanto, los cambios
+        pendientes se aplican sobre su versión.
+        """
+        if self._pending is None:
+            return
+        with self._guard.hold(True):
+            puts, deletes, _ = self.pending()
+            self._pending = None
+            # Sin pendientes, _current recarga si el archivo cambió; si no,
+            # regresa la memoria, donde aplicar de nuevo no cambia nada.
+            data = self._current()
+            self._apply(data, puts, deletes)
+            self._persist(self.store.record_changes(data, puts, deletes))
+
+    def replace(self, data):
+        """Sustituye todos los registros."""
+        with self._guard.hold(True):
+            self._data = data
+            self._indexes = {}
+            self._persist(self.store.save(data))
+
+    def compact(self):
+        """Pide al almacenamiento que compacte sus cambios pendientes."""
+        with self._guard.hold(True):
+            self._persist(self.store.compact(self._current()))
+
+    def invalidate(self):
+        """Olvida la copia en memoria; la siguiente lectura va a disco."""
+        self._data = None
+        self._signature = None
+        self._pending = None
+
+    def close(self):
+        """Suelta la copia en memoria y el archivo de candado."""
+        self.invalidate()
+        self._guard.close()
+
+
+# sqlite3, mmap y pickle se importan solo si se usan: los procesos cortos
+# (``cli``) no pagan por almacenamientos que no ocupan.
+def _sqlite_repository(path, label, **options):
+    """Repositorio SQLite (ver ``sqlite_store``)."""
+    # pylint: disable-next=import-outside-toplevel
+    from sqlite_store import SqliteRepository
+    return SqliteRepository(path, label, **options)
+
+
+def _mmap_repository(path, label, **options):
+    """Repositorio de registros de ancho fijo (ver ``mmap_store``)."""
+    # pylint: disable-next=import-outside-toplevel
+    from mmap_store import MmapRepository
+    return MmapRepository(path, label, **options)
+
+
+def _sharded_repository(path, label, **options):
+    """Repositorio repartido en cubetas (ver ``shard_store``).
+
+    ``shard_store`` usa las clases de este módulo, así que se importa
+    por nombre, sin crear un ciclo entre los dos.
+    """
+    shard_store = importlib.import_module("shard_store")
+    return shard_store.ShardedRepository(path, label, **options)
+
+
+_STORAGES = {
+    "json": lambda path, label, **options: Repository(
+        JsonStore(path, label, **options)
+    ),
+    "wal": lambda path, label, **options: Repository(
+        WalStore(path, label, **options)
+    ),
+    "binary": lambda path, label, **options: Repository(
+        BinaryStore(path, label, **options)
+    ),
+    "sqlite": _sqlite_repository,
+    "mmap": _mmap_repository,
+    "sharded": _sharded_repository,
+}
+
+
+def get_repository(path, label):
+    """Regresa el repositorio del archivo, creándolo la primera vez."""
+    key = os.path.abspath(path)
+    repository = _REPOSITORIES.get(key)
+    if repository is None:
+        storage, options = _storage_for(key)
+        repository = _STORAGES[storage](key, label, **options)
+        _REPOSITORIES[key] = repository
+    return repository
+
+
+def _entity_storage(setting):
+    """(storage, options) de un valor de ``entities``."""
+    if isinstance(setting, str):
+        return setting, {}
+    storage, options = setting
+    return storage, dict(options)
+
+
+def _storage_for(path):
+    """Almacenamiento y opciones que le tocan al archivo ``path``."""
+    setting = _CONFIG["entities"].get(os.path.basename(path))
+    if setting is None:
+        return _CONFIG["storage"], _CONFIG["options"]
+    return _entity_storage(setting)
+
+
+def reset_repositories():
+    """Cierra y descarta todos los repositorios abiertos en el proceso."""
+    for repository in _REPOSITORIES.values():
+        repository.close()
+    _REPOSITORIES.clear()
+
+
+def current_configuration():
+    """Almacenamiento y opciones activos, como (storage, options).
+
+    Si hay almacenamientos por archivo van en ``options["entities"]``,
+    así ``configure(storage, **options)`` repite la configuración.
+    """
+    options = dict(_CONFIG["options"])
+    if _CONFIG["entities"]:
+        options["entities"] = dict(_CONFIG["entities"])
+    return _CONFIG["storage"], options
+
+
+def set_deferred(deferred):
+    """Activa o desactiva la escritura diferida en todo el proceso.
+
+    Lanza ValueError si algún almacenamiento configurado no está en
+    DEFERRED_STORAGES: sus escrituras irían directo a disco.
+    """
+    if deferred:
+        for name in [_CONFIG["storage"]] + [
+            _entity_storage(setting)[0]
+            for setting in _CONFIG["entities"].values()
+        ]:
+            if name not in DEFERRED_STORAGES:
+                raise ValueError(
+                    f"El almacenamiento {name} no tiene escritura diferida"
+                )
+    _CONFIG["deferred"] = deferred
+
+
+def pending_repositories():
+    """Repositorios abiertos que tienen cambios sin escribir."""
+    return [
+        repository for repository in _REPOSITORIES.values()
+        if getattr(repository, "pending", lambda: None)() is not None
+    ]
+
+
+def configure(storage="json", entities=None, **options):
+    """Elige el almacenamiento para los repositorios que se abran después.
+
+    ``entities`` asigna otro almacenamiento a archivos sueltos, por
+    nombre: ``{"reservations.json": "mmap"}`` o, con opciones,
+    ``{"reservations.json": ("mmap", {"field_size": 48})}``.
+
+    Antes de cambiar se compactan los repositorios abiertos, así el
+    snapshot queda completo para cualquier modo.
+    """
+    entities = dict(entities or {})
+    for name in [storage] + [
+        _entity_storage(setting)[0] for setting in entities.values()
+    ]:
+        if name not in _STORAGES:
+            raise ValueError(f"Almacenamiento desconocido: {name}")
+    for repository in _REPOSITORIES.values():
+        repository.compact()
+    reset_repositories()
+    _CONFIG["storage"] = storage
+    _CONFIG["options"] = options
+    _CONFIG["entities"] = entities
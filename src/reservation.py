@@ -1,36 +1,88 @@
 """Manejo de reservaciones del sistema."""
 
-import json
-import os
-from hotel import Hotel
+import copy
+
+import idempotency
+import metrics
+from reporting import (
+    AlreadyExistsError, InvalidDataError, NoAvailabilityError, NotFoundError,
+    StorageError, WaitlistedError, fail, get_logger, last_error,
+    reports_storage_errors, succeed,
+)
+from repository import get_repository
+from transaction import BULK_LOCK_GROUP, Transaction, hotel_lock
+
+LOGGER = get_logger("reservation")
 
 RESERVATIONS_FILE = "reservations.json"
 
 
+def _repository():
+    """Repositorio en memoria del archivo de reservaciones."""
+    return get_repository(RESERVATIONS_FILE, "reservaciones")
+
+
+def _hotel():
+    """Clase Hotel, importada al usarla.
+
+    Así ``import reservation`` no carga ``hotel`` (ni ``occupancy``) en
+    los procesos que solo leen reservaciones.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from hotel import Hotel
+    return Hotel
+
+
+def _not_found(reservation_id):
+    """Error de reservación inexistente."""
+    return NotFoundError("Reservación %s no encontrada.", reservation_id)
+
+
+def _duplicate(reservation_id):
+    """Error de reservación repetida."""
+    return AlreadyExistsError("La reservación %s ya existe.", reservation_id)
+
+
+def _parse_records(records):
+    """Reservation de cada registro, o None si es inválido o repetido."""
+    parsed = []
+    seen = set()
+    for record in records:
+        try:
+            reservation = Reservation.from_dict(record)
+        except KeyError as e:
+            reservation = fail(LOGGER, InvalidDataError(
+                "Registro de reservación incompleto, falta %s.", e
+            ))
+        if reservation is not None:
+            if reservation.reservation_id in seen:
+                reservation = fail(
+                    LOGGER, _duplicate(reservation.reservation_id)
+                )
+            else:
+                seen.add(reservation.reservation_id)
+        parsed.append(reservation)
+    return parsed
+
+
+@metrics.timed("load_reservations")
 def load_reservations():
-    """Lee las reservaciones guardadas en el archivo."""
-    if not os.path.exists(RESERVATIONS_FILE):
-        return {}
-    try:
-        with open(RESERVATIONS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Error al cargar el archivo de reservaciones: {e}")
-        return {}
+    """Regresa una copia de las reservaciones guardadas."""
+    return copy.deepcopy(_repository().all())
 
 
+@metrics.timed("save_reservations")
 def save_reservations(reservations):
-    """Escribe las reservaciones en el archivo."""
-    try:
-        with open(RESERVATIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(reservations, f, indent=4)
-    except IOError as e:
-        print(f"Error al guardar el archivo de reservaciones: {e}")
+    """Reemplaza las reservaciones guardadas (StorageError si falla)."""
+    _repository().replace(copy.deepcopy(reservations))
 
 
 class Reservation:
     """Une a un cliente con un hotel en fechas específicas."""
 
+    __slots__ = ("reservation_id", "customer_id", "hotel_id", "check_in",
+                 "check_out")
+
     # pylint: disable=too-many-arguments,too-many-positional-arguments
     def __init__(
         self,
@@ -69,57 +121,234 @@ class Reservation:
         )
 
     @staticmethod
+    @metrics.timed("Reservation.create_reservation")
+    @reports_storage_errors(LOGGER)
     def create_reservation(reservation_id, customer_id, hotel_id,
-                           check_in, check_out):
-        """Registra una reservación nueva y ocupa la habitación en el hotel."""
-        reservations = load_reservations()
-        reservation_id = str(reservation_id)
-        if reservation_id in reservations:
-            print(f"La reservación {reservation_id} ya existe.")
-            return None
-        success = Hotel.reserve_room(hotel_id, reservation_id, customer_id)
-        if not success:
-            print(
-                "No se pudo crear la reservación: "
-                "habitación no disponible o hotel no encontrado."
-            )
-            return None
+                           check_in, check_out, idempotency_key=None,
+                           waitlist_priority=None):
+        """Registra una reservación nueva y ocupa la habitación en el hotel.
+
+        Ambos archivos cambian juntos en una sola transacción, con el
+        candado del hotel tomado durante la validación. Con
+        ``idempotency_key`` un reintento regresa la reservación del primer
+        intento sin volver a escribir (ver ``idempotency``). Con
+        ``waitlist_priority``, si el hotel no tiene lugar la petición queda
+        en su lista de espera (``Hotel.join_waitlist``) y la última falla
+        es un WaitlistedError.
+        """
         reservation = Reservation(
             reservation_id, customer_id, hotel_id, check_in, check_out
         )
-        reservations[reservation_id] = reservation.to_dict()
-        save_reservations(reservations)
-        print(f"Reservación {reservation_id} creada correctamente.")
+        request = None
+        if idempotency_key is not None:
+            request = {"operation": "create",
+                       "reservation": reservation.to_dict()}
+            found, result = idempotency.lookup(idempotency_key, request)
+            if found:
+                return Reservation._replayed(result)
+        with Transaction(hotel_lock(reservation.hotel_id)) as transaction:
+            if request is not None:
+                # Otro intento pudo confirmarse mientras se esperaba el
+                # candado.
+                found, result = idempotency.lookup(idempotency_key, request,
+                                                   transaction)
+                if found:
+                    return Reservation._replayed(result)
+            created = Reservation._stage_create(transaction, reservation)
+            if created is not None and request is not None:
+                idempotency.record(transaction, idempotency_key, request,
+                                   created.to_dict())
+            waitlisted = (
+                created is None
+                and waitlist_priority is not None
+                and isinstance(last_error(), NoAvailabilityError)
+                and _hotel().join_waitlist(
+                    reservation.hotel_id, reservation.reservation_id,
+                    reservation.customer_id, reservation.check_in,
+                    reservation.check_out, waitlist_priority, transaction,
+                )
+            )
+        if waitlisted:
+            return fail(LOGGER, WaitlistedError(
+                "Reservación %s en lista de espera del hotel %s.",
+                reservation.reservation_id, reservation.hotel_id,
+            ))
+        if created is not None:
+            succeed(LOGGER, "Reservación %s creada correctamente.",
+                    created.reservation_id)
+        return created
+
+    @staticmethod
+    def _replayed(result):
+        """Reservation guardada por un intento anterior, o None."""
+        if result is None:
+            return None
+        succeed(LOGGER, "Reservación %s ya estaba creada.",
+                result["reservation_id"])
+        return Reservation.from_dict(result)
+
+    @staticmethod
+    @metrics.timed("Reservation.create_reservations")
+    def create_reservations(records):
+        """Crea muchas reservaciones con pocas escrituras.
+
+        ``records`` es un iterable de diccionarios con los campos de
+        ``to_dict``. Se agrupan por hotel y cada grupo de hasta
+        BULK_LOCK_GROUP hoteles se confirma en una sola transacción.
+        Regresa, en el mismo orden, la Reservation creada o None.
+        """
+        pending = _parse_records(records)
+        by_hotel = {}
+        for position, reservation in enumerate(pending):
+            if reservation is not None:
+                by_hotel.setdefault(reservation.hotel_id, []).append(position)
+        results = [None] * len(pending)
+        hotel_ids = sorted(by_hotel)
+        for start in range(0, len(hotel_ids), BULK_LOCK_GROUP):
+            group = hotel_ids[start:start + BULK_LOCK_GROUP]
+            try:
+                with Transaction(*map(hotel_lock, group)) as transaction:
+                    for hotel_id in group:
+                        for position in by_hotel[hotel_id]:
+                            results[position] = Reservation._stage_create(
+                                transaction, pending[position]
+                            )
+            except StorageError as e:
+                fail(LOGGER, e)
+                for hotel_id in group:
+                    for position in by_hotel[hotel_id]:
+                        results[position] = None
+        created = sum(1 for result in results if result is not None)
+        LOGGER.info("%d de %d reservaciones creadas.", created, len(results))
+        return results
+
+    @staticmethod
+    def _stage_create(transaction, reservation):
+        """Valida la reservación y agrega sus cambios a la transacción."""
+        reservations = _repository()
+        reservation_id = reservation.reservation_id
+        if transaction.contains(reservations, reservation_id):
+            return fail(LOGGER, _duplicate(reservation_id))
+        try:
+            # Antes de tocar el hotel: un registro que el almacenamiento no
+            # acepta no debe dejar la habitación ocupada.
+            reservations.validate(reservation_id, reservation.to_dict())
+        except ValueError as e:
+            return fail(LOGGER, InvalidDataError(
+                "Reservación %s inválida: %s", reservation_id, e
+            ))
+        success = _hotel().reserve_room(
+            reservation.hotel_id, reservation_id, reservation.customer_id,
+            reservation.check_in, reservation.check_out,
+            transaction=transaction,
+        )
+        if not success:
+            # reserve_room ya reportó la causa (last_error).
+            LOGGER.info("No se pudo crear la reservación %s.", reservation_id)
+            return None
+        transaction.put(reservations, reservation_id, reservation.to_dict())
         return reservation
 
     @staticmethod
-    def cancel_reservation(reservation_id):
-        """Cancela la reservación y libera la habitación."""
-        reservations = load_reservations()
+    @metrics.timed("Reservation.cancel_reservation")
+    @reports_storage_errors(LOGGER, False)
+    def cancel_reservation(reservation_id, idempotency_key=None):
+        """Cancela la reservación y libera la habitación.
+
+        Con ``idempotency_key`` un reintento de una cancelación que ya se
+        hizo regresa True sin volver a escribir.
+        """
+        reservations = _repository()
         reservation_id = str(reservation_id)
-        if reservation_id not in reservations:
-            print(f"Reservación {reservation_id} no encontrada.")
+        request = None
+        if idempotency_key is not None:
+            request = {"operation": "cancel",
+                       "reservation_id": reservation_id}
+            found, result = idempotency.lookup(idempotency_key, request)
+            if found:
+                return Reservation._replayed_cancel(result)
+        data = reservations.get(reservation_id)
+        if data is None:
+            return fail(LOGGER, _not_found(reservation_id), False)
+        res = Reservation.from_dict(data)
+        with Transaction(hotel_lock(res.hotel_id)) as transaction:
+            if request is not None:
+                found, result = idempotency.lookup(idempotency_key, request,
+                                                   transaction)
+                if found:
+                    return Reservation._replayed_cancel(result)
+            if not reservations.contains(reservation_id):
+                return fail(LOGGER, _not_found(reservation_id), False)
+            if not _hotel().cancel_room_reservation(
+                res.hotel_id, reservation_id, transaction=transaction
+            ):
+                # El hotel no la tenía (o ya no existe): la reservación
+                # está huérfana y se borra igual; ver ``consistency``.
+                LOGGER.warning(
+                    "Reservación %s sin habitación en el hotel %s; "
+                    "se borra de todos modos.", reservation_id, res.hotel_id,
+                )
+            transaction.delete(reservations, reservation_id)
+            if request is not None:
+                idempotency.record(transaction, idempotency_key, request,
+                                   True)
+        succeed(LOGGER, "Reservación %s cancelada correctamente.",
+                reservation_id)
+        return True
+
+    @staticmethod
+    def _replayed_cancel(result):
+        """True si un intento anterior ya canceló la reservación."""
+        if not result:
             return False
-        res = Reservation.from_dict(reservations[reservation_id])
-        Hotel.cancel_room_reservation(res.hotel_id, reservation_id)
-        del reservations[reservation_id]
-        save_reservations(reservations)
-        print(f"Reservación {reservation_id} cancelada correctamente.")
+        succeed(LOGGER, "La reservación ya estaba cancelada.")
         return True
 
     @staticmethod
+    def _find(field, value):
+        """Reservaciones cuyo campo ``field`` vale ``value``."""
+        reservations = _repository()
+        return [
+            Reservation.from_dict(reservations.get(key))
+            for key in reservations.find(field, str(value))
+        ]
+
+    @staticmethod
+    @metrics.timed("Reservation.find_by_customer")
+    def find_by_customer(customer_id):
+        """Todas las reservaciones de un cliente."""
+        return Reservation._find("customer_id", customer_id)
+
+    @staticmethod
+    @metrics.timed("Reservation.find_by_hotel")
+    def find_by_hotel(hotel_id):
+        """Todas las reservaciones de un hotel."""
+        return Reservation._find("hotel_id", hotel_id)
+
+    @staticmethod
+    @metrics.timed("Reservation.find_by_check_in")
+    def find_by_check_in(check_in):
+        """Todas las reservaciones que llegan en esa fecha."""
+        return Reservation._find("check_in", check_in)
+
+    @staticmethod
+    @metrics.timed("Reservation.display_reservation")
     def display_reservation(reservation_id):
-        """Imprime los datos de la reservación en consola."""
-        reservations = load_reservations()
+        """Regresa la reservación y reporta sus datos (nivel INFO)."""
         reservation_id = str(reservation_id)
-        if reservation_id not in reservations:
-            print(f"Reservación {reservation_id} no encontrada.")
-            return None
-        res = Reservation.from_dict(reservations[reservation_id])
-        print("--- Información de la Reservación ---")
-        print(f"ID           : {res.reservation_id}")
-        print(f"ID Cliente   : {res.customer_id}")
-        print(f"ID Hotel     : {res.hotel_id}")
-        print(f"Entrada      : {res.check_in}")
-        print(f"Salida       : {res.check_out}")
+        data = _repository().get(reservation_id)
+        if data is None:
+            return fail(LOGGER, _not_found(reservation_id))
+        res = Reservation.from_dict(data)
+        succeed(
+            LOGGER,
+            "--- Información de la Reservación ---\n"
+            "ID           : %s\n"
+            "ID Cliente   : %s\n"
+            "ID Hotel     : %s\n"
+            "Entrada      : %s\n"
+            "Salida       : %s",
+            res.reservation_id, res.customer_id, res.hotel_id, res.check_in,
+            res.check_out,
+        )
         return res
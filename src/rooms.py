@@ -0,0 +1,256 @@
+"""Habitaciones de cada hotel y la habitación de cada reservación.
+
+Cada hotel guarda en ``room_types`` sus habitaciones como corridas
+``[tipo, capacidad, cantidad]``; se numeran de 1 a ``total_rooms`` en ese
+orden. En ``rooms`` guarda la habitación de cada reservación
+(``{reservation_id: número}``).
+
+Para asignar se arma un ``RoomAllocator``: por cada corrida, una máscara
+de bits por noche con las habitaciones ocupadas (bit i = i-ésima
+habitación de la corrida) y otra con las que ocupan reservaciones sin
+fechas. Una habitación libre todo el rango es el bit más bajo en cero
+del OR de las máscaras de esas noches: O(noches) operaciones sobre
+enteros de ``cantidad / 64`` palabras, sin recorrer habitaciones ni
+reservaciones, aun con miles de habitaciones.
+
+Igual que en ``occupancy``, el asignador se guarda en memoria por hotel
+asociado a los diccionarios de los que salió; ``assign`` y ``unassign``
+cambian una copia de ``rooms`` sacada con ``copy_rooms``.
+"""
+
+from occupancy import nights
+
+DEFAULT_TYPE = "standard"
+DEFAULT_CAPACITY = 2
+
+_CACHE = {}
+
+
+def default_types(total_rooms):
+    """Corridas de un hotel sin tipos: todas estándar."""
+    return [[DEFAULT_TYPE, DEFAULT_CAPACITY, total_rooms]]
+
+
+def validate_types(room_types, total_rooms):
+    """Revisa las corridas; lanza ValueError si no son válidas."""
+    for run in room_types:
+        if (
+            len(run) != 3
+            or not isinstance(run[0], str)
+            or not all(isinstance(n, int) and n > 0 for n in run[1:])
+        ):
+            raise ValueError(f"Invalid room type: {run!r}.")
+    if sum(run[2] for run in room_types) != total_rooms:
+        raise ValueError("room_types must add up to total_rooms.")
+
+
+def _lowest_free(mask):
+    """Posición del bit más bajo en cero."""
+    return (~mask & (mask + 1)).bit_length() - 1
+
+
+class RoomAllocator:
+    """Habitaciones ocupadas por noche, como máscaras de bits por corrida."""
+
+    def __init__(self, room_types):
+        """Asignador sin reservaciones."""
+        self.runs = []
+        start = 1
+        for room_type, capacity, count in room_types:
+            self.runs.append((room_type, capacity, start, count))
+            start += count
+        self.total = start - 1
+        self.by_night = [{} for _ in self.runs]
+        self.held = [0] * len(self.runs)
+
+    def _locate(self, room):
+        """(corrida, bit) de un número de habitación."""
+        for position, (_, _, start, count) in enumerate(self.runs):
+            if start <= room < start + count:
+                return position, 1 << (room - start)
+        raise ValueError(f"Unknown room: {room}.")
+
+    def room_type(self, room):
+        """Tipo de la habitación."""
+        return self.runs[self._locate(room)[0]][0]
+
+    def _busy(self, position, check_in, check_out):
+        """Máscara de las habitaciones de la corrida ocupadas en el rango."""
+        by_night = self.by_night[position]
+        if check_in is None:
+            # Sin fechas se necesita una habitación libre todas las noches.
+            mask = 0
+            for night_mask in by_night.values():
+                mask |= night_mask
+        else:
+            mask = 0
+            for night in nights(check_in, check_out):
+                mask |= by_night.get(night, 0)
+        return mask | self.held[position]
+
+    def find(self, check_in=None, check_out=None, room_type=None,
+             guests=None):
+        """Habitación libre todo el rango, o None.
+
+        Con ``room_type`` solo de ese tipo; con ``guests`` solo las que
+        tienen esa capacidad o más. Lanza ValueError si las fechas no son
+        válidas.
+        """
+        for position, (kind, capacity, start, count) in enumerate(self.runs):
+            if room_type is not None and kind != room_type:
+                continue
+            if guests is not None and capacity < guests:
+                continue
+            bit = _lowest_free(self._busy(position, check_in, check_out))
+            if bit < count:
+                return start + bit
+        return None
+
+    def place(self, room, check_in=None, check_out=None):
+        """Marca la habitación ocupada en el rango (sin fechas: siempre)."""
+        position, bit = self._locate(room)
+        if check_in is None:
+            self.held[position] |= bit
+            return
+        by_night = self.by_night[position]
+        for night in nights(check_in, check_out):
+            by_night[night] = by_night.get(night, 0) | bit
+
+    def free(self, room, check_in=None, check_out=None):
+        """Libera la habitación en el rango."""
+        position, bit = self._locate(room)
+        if check_in is None:
+            self.held[position] &= ~bit
+            return
+        by_night = self.by_night[position]
+        for night in nights(check_in, check_out):
+            mask = by_night.get(night, 0) & ~bit
+            if mask:
+                by_night[night] = mask
+            else:
+                by_night.pop(night, None)
+
+
+def _build(hotel):
+    """Arma el asignador del hotel y asigna las reservaciones sin cuarto.
+
+    Las reservaciones de antes de que hubiera habitaciones se acomodan
+    por fecha de llegada (las que no tienen fechas primero), lo que usa
+    tantas habitaciones como la noche más llena. Regresa el asignador y
+    el diccionario de habitaciones completo.
+    """
+    allocator = RoomAllocator(hotel.room_types)
+    rooms = {}
+    pending = []
+    for reservation_id in hotel.reservations:
+        stay = hotel.stays.get(reservation_id, (None, None))
+        room = hotel.rooms.get(reservation_id)
+        if room is None or not 1 <= room <= allocator.total:
+            pending.append((stay[0] or "", reservation_id, stay))
+            continue
+        allocator.place(room, *stay)
+        rooms[reservation_id] = room
+    for _, reservation_id, stay in sorted(pending):
+        room = allocator.find(*stay)
+        if room is not None:
+            allocator.place(room, *stay)
+            rooms[reservation_id] = room
+    if rooms == hotel.rooms:
+        rooms = hotel.rooms
+    return allocator, rooms
+
+
+def allocator_for(hotel):
+    """Regresa el asignador del hotel, armándolo si sus datos cambiaron.
+
+    Si hubo que asignar habitaciones, ``hotel.rooms`` queda con un
+    diccionario nuevo que las incluye.
+    """
+    cached = _CACHE.get(hotel.hotel_id)
+    if (
+        cached is not None
+        and cached[0] is hotel.rooms
+        and cached[1] is hotel.room_types
+    ):
+        return cached[2]
+    allocator, hotel.rooms = _build(hotel)
+    _CACHE[hotel.hotel_id] = (hotel.rooms, hotel.room_types, allocator)
+    return allocator
+
+
+def copy_rooms(hotel):
+    """Cambia ``hotel.rooms`` por una copia; el asignador pasa a ella."""
+    cached = _CACHE.get(hotel.hotel_id)
+    rooms = dict(hotel.rooms)
+    if cached is not None and cached[0] is hotel.rooms:
+        _CACHE[hotel.hotel_id] = (rooms, cached[1], cached[2])
+    hotel.rooms = rooms
+
+
+def assign(hotel, reservation_id, stay=(None, None), room_type=None,
+           guests=None):
+    """Asigna una habitación libre a la reservación; regresa su número.
+
+    ``stay`` es el par (check_in, check_out); sin fechas la habitación
+    se ocupa siempre. None si no hay. Cambia ``hotel.rooms`` en su lugar
+    (ver ``copy_rooms``).
+    """
+    allocator = allocator_for(hotel)
+    room = allocator.find(*stay, room_type, guests)
+    if room is None:
+        return None
+    allocator.place(room, *stay)
+    hotel.rooms[reservation_id] = room
+    return room
+
+
+def unassign(hotel, reservation_id):
+    """Libera la habitación de la reservación (si tenía)."""
+    allocator = allocator_for(hotel)
+    if reservation_id not in hotel.rooms:
+        return
+    stay = hotel.stays.get(reservation_id, (None, None))
+    allocator.free(hotel.rooms[reservation_id], *stay)
+    del hotel.rooms[reservation_id]
+
+
+def resize(hotel, total_rooms):
+    """Cambia el número de habitaciones; regresa False si no se puede.
+
+    Al crecer, las habitaciones nuevas son del tipo de la última corrida.
+    Al reducir se quitan las de número más alto y sus reservaciones se
+    mueven a otra habitación del mismo tipo; si alguna no cabe, el hotel
+    no cambia.
+    """
+    allocator = allocator_for(hotel)
+    room_types = []
+    left = total_rooms
+    for room_type, capacity, count in hotel.room_types:
+        if left <= 0:
+            break
+        room_types.append([room_type, capacity, min(count, left)])
+        left -= count
+    if left > 0:
+        room_types[-1][2] += left
+    resized = RoomAllocator(room_types)
+    rooms = {}
+    moved = []
+    for reservation_id, room in hotel.rooms.items():
+        stay = hotel.stays.get(reservation_id, (None, None))
+        if room <= total_rooms:
+            resized.place(room, *stay)
+            rooms[reservation_id] = room
+        else:
+            moved.append((allocator.room_type(room), stay[0] or "",
+                          reservation_id, stay))
+    for room_type, _, reservation_id, stay in sorted(moved):
+        room = resized.find(*stay, room_type=room_type)
+        if room is None:
+            return False
+        resized.place(room, *stay)
+        rooms[reservation_id] = room
+    hotel.room_types = room_types
+    hotel.rooms = rooms
+    hotel.total_rooms = total_rooms
+    _CACHE[hotel.hotel_id] = (rooms, room_types, resized)
+    return True
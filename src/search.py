@@ -0,0 +1,141 @@
+"""Búsqueda de hoteles con habitaciones libres.
+
+Filtra por ubicación (con el índice secundario ``location``), por
+habitaciones libres mínimas y, opcionalmente, por rango de fechas (con el
+índice de ocupación de cada hotel). Cuando hay muchos hoteles candidatos
+el trabajo se reparte entre procesos de un ``ProcessPoolExecutor``: cada
+proceso carga el archivo de hoteles una sola vez (y lo recarga solo si
+cambia), revisa su parte y regresa resultados que aquí se mezclan.
+
+Uso::
+
+    with HotelSearch(workers=4) as search:
+        results = search.search("Cuernavaca", 2, "2025-01-01", "2025-01-03")
+"""
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import repository
+from hotel import HOTELS_FILE, Hotel
+
+PARALLEL_THRESHOLD = 20000
+
+
+def _hotels():
+    """Repositorio de hoteles del proceso actual."""
+    return repository.get_repository(HOTELS_FILE, "hoteles")
+
+
+def _candidates(location):
+    """Llaves de los hoteles a revisar, en un orden estable."""
+    hotels = _hotels()
+    if location is None:
+        return list(hotels.all())
+    return hotels.find("location", location)
+
+
+def _scan(keys, min_free, check_in, check_out):
+    """Hoteles de ``keys`` con al menos ``min_free`` habitaciones libres.
+
+    Regresa una lista de (-libres, hotel_id) ordenada, lista para mezclar.
+    """
+    hotels = _hotels()
+    found = []
+    for key in keys:
+        data = hotels.get(key)
+        if data is None:
+            continue
+        hotel = Hotel.from_dict(data)
+        if check_in is None:
+            free = hotel.available_rooms()
+        else:
+            free = hotel.available_rooms(check_in, check_out)
+        if free >= min_free:
+            found.append((-free, key))
+    found.sort()
+    return found
+
+
+def _init_worker(cwd, storage, options):
+    """Prepara un proceso de búsqueda con la misma configuración.
+
+    Los repositorios heredados del proceso padre se descartan sin
+    escribir nada; cada proceso carga los suyos.
+    """
+    os.chdir(cwd)
+    repository.reset_repositories()
+    repository.configure(storage, **options)
+
+
+def _scan_shard(location, shard, shards, criteria):
+    """Revisa la parte ``shard`` de ``shards`` de los candidatos."""
+    keys = _candidates(location)[shard::shards]
+    return _scan(keys, *criteria)
+
+
+class HotelSearch:
+    """Buscador de hoteles, en serie o con un pool de procesos."""
+
+    def __init__(self, workers=None, parallel_threshold=PARALLEL_THRESHOLD):
+        """``workers`` procesos (None: uno por CPU; 1: sin procesos)."""
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self._pool = None
+
+    def _executor(self):
+        """Pool de procesos; se crea la primera vez que se necesita."""
+        if self._pool is None:
+            config = repository.current_configuration()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(os.getcwd(), *config),
+            )
+        return self._pool
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def search(self, location=None, min_free=1, check_in=None,
+               check_out=None, limit=None):
+        """Hoteles con lugar, de más a menos habitaciones libres.
+
+        Regresa una lista de (hotel_id, habitaciones_libres). Fechas
+        inválidas lanzan ValueError.
+        """
+        criteria = (min_free, check_in, check_out)
+        keys = _candidates(location)
+        if self.workers <= 1 or len(keys) < self.parallel_threshold:
+            parts = [_scan(keys, *criteria)]
+        else:
+            pool = self._executor()
+            futures = [
+                pool.submit(_scan_shard, location, shard, self.workers,
+                            criteria)
+                for shard in range(self.workers)
+            ]
+            parts = [future.result() for future in futures]
+        results = [(key, -free) for free, key in heapq.merge(*parts)]
+        return results if limit is None else results[:limit]
+
+    def close(self):
+        """Detiene el pool de procesos."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        """Permite usar el buscador con ``with``."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Cierra el pool al salir del bloque."""
+        self.close()
+
+
+def search_hotels(location=None, min_free=1, check_in=None, check_out=None,
+                  limit=None):
+    """Búsqueda en el proceso actual (sin pool)."""
+    return HotelSearch(workers=1).search(
+        location, min_free, check_in, check_out, limit
+    )
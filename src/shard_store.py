@@ -0,0 +1,217 @@
+"""Archivo de datos repartido en cubetas (shards) por llave.
+
+En lugar de un solo ``hotels.json``, los registros se reparten en
+``hotels.shards/`` en varios archivos JSON (cubetas) según el crc32 de
+su llave, más un ``manifest.json`` con el formato y el número de
+cubetas. Cada cubeta es un ``Repository`` normal (memoria, candado de
+archivo, índice de posiciones, escritura diferida), así que reservar en
+un hotel reescribe solo su cubeta y bloquea solo esa cubeta: las
+escrituras en hoteles de cubetas distintas no se estorban.
+
+Se activa por archivo::
+
+    repository.configure(entities={"hotels.json": "sharded"})
+    repository.configure(entities={"hotels.json": ("sharded",
+                                                   {"buckets": 256})})
+
+Una reservación también escribe ``reservations.json``: para que las de
+hoteles distintos no se esperen entre sí ese archivo también se debe
+repartir. ``configure("sharded")`` reparte todos los archivos::
+
+    repository.configure("sharded", buckets=256)
+
+Con tantas cubetas como hoteles cada hotel queda en su propio archivo.
+El número de cubetas se fija al crear el directorio (el manifiesto
+manda); la primera vez se reparten los registros del archivo JSON, si
+existe. ``export_json`` hace el camino inverso.
+"""
+
+import json
+import os
+import zlib
+
+from locks import FileLock
+from repository import JsonStore, Repository
+
+MANIFEST = "manifest.json"
+FORMAT = "shards"
+VERSION = 1
+DEFAULT_BUCKETS = 64
+
+
+def shard_dir(path):
+    """Directorio de cubetas que corresponde a un archivo JSON."""
+    return os.path.splitext(path)[0] + ".shards"
+
+
+def bucket_of(key, buckets):
+    """Cubeta de una llave (estable entre procesos)."""
+    return zlib.crc32(str(key).encode("utf-8")) % buckets
+
+
+def _read_manifest(directory):
+    """Número de cubetas del manifiesto, o None si no existe."""
+    try:
+        with open(os.path.join(directory, MANIFEST), "r",
+                  encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+        raise ValueError(f"Manifiesto inválido en {directory}")
+    return manifest["buckets"]
+
+
+def _write_manifest(directory, buckets):
+    """Escribe el manifiesto (temporal y ``os.replace``)."""
+    path = os.path.join(directory, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"format": FORMAT, "version": VERSION,
+                   "buckets": buckets}, f)
+    os.replace(path + ".tmp", path)
+
+
+class ShardedRepository:
+    """Repositorio cuyos registros viven en varias cubetas.
+
+    Tiene la misma interfaz que ``Repository``; cada operación va a la
+    cubeta de la llave y ``update`` escribe solo las cubetas tocadas.
+    """
+
+    def __init__(self, path, label, buckets=DEFAULT_BUCKETS):
+        """``path`` es el archivo JSON que se reparte (p. ej. hotels.json)."""
+        self.path = path
+        self.label = label
+        self.directory = shard_dir(path)
+        with FileLock(f"shards:{path}"):
+            self.buckets = _read_manifest(self.directory)
+            if self.buckets is None:
+                self.buckets = buckets
+                self._create()
+        self._shards = [
+            Repository(JsonStore(self.bucket_path(i), label))
+            for i in range(self.buckets)
+        ]
+
+    def bucket_path(self, bucket):
+        """Archivo de una cubeta."""
+        return os.path.join(self.directory, f"{bucket:04d}.json")
+
+    def _split(self, data):
+        """Reparte un diccionario de registros por cubeta."""
+        parts = [{} for _ in range(self.buckets)]
+        for key, value in data.items():
+            parts[bucket_of(key, self.buckets)][key] = value
+        return parts
+
+    def _create(self):
+        """Crea las cubetas, con los registros del archivo JSON si hay."""
+        os.makedirs(self.directory, exist_ok=True)
+        parts = self._split(JsonStore(self.path, self.label).load())
+        for bucket, part in enumerate(parts):
+            if part and not JsonStore(self.bucket_path(bucket),
+                                      self.label).save(part):
+                raise IOError(f"No se pudo crear la cubeta {bucket}")
+        # El manifiesto va al final: sin él, las cubetas no cuentan.
+        _write_manifest(self.directory, self.buckets)
+
+    def _shard(self, key):
+        """Repositorio de la cubeta de ``key``."""
+        return self._shards[bucket_of(key, self.buckets)]
+
+    def shards(self):
+        """Repositorios de las cubetas, en orden."""
+        return list(self._shards)
+
+    def all(self):
+        """Todos los registros (diccionario nuevo con todas las cubetas)."""
+        data = {}
+        for shard in self._shards:
+            data.update(shard.all())
+        return data
+
+    def get(self, key):
+        """Regresa el registro con esa llave, o None."""
+        return self._shard(key).get(key)
+
+    def contains(self, key):
+        """Indica si existe un registro con esa llave."""
+        return self._shard(key).contains(key)
+
+    def validate(self, key, value):
+        """Acepta cualquier registro (ver ``MmapRepository.validate``)."""
+
+    def put(self, key, value):
+        """Guarda (o reemplaza) un registro."""
+        self._shard(key).put(key, value)
+
+    def delete(self, key):
+        """Borra un registro existente."""
+        self._shard(key).delete(key)
+
+    def find(self, field, value):
+        """Llaves de los registros cuyo campo ``field`` vale ``value``."""
+        keys = []
+        for shard in self._shards:
+            keys.extend(shard.find(field, value))
+        return keys
+
+    def update(self, puts, deletes=()):
+        """Guarda y borra registros; una escritura por cubeta tocada."""
+        grouped = {}
+        for key, value in puts.items():
+            grouped.setdefault(bucket_of(key, self.buckets),
+                               ({}, []))[0][key] = value
+        for key in deletes:
+            grouped.setdefault(bucket_of(key, self.buckets),
+                               ({}, []))[1].append(key)
+        for bucket, (bucket_puts, bucket_deletes) in grouped.items():
+            self._shards[bucket].update(bucket_puts, bucket_deletes)
+
+    def pending(self):
+        """Cambios sin escribir de todas las cubetas, o None si no hay."""
+        puts, deletes, originals = {}, [], {}
+        found = False
+        for shard in self._shards:
+            changes = shard.pending()
+            if changes is not None:
+                found = True
+                puts.update(changes[0])
+                deletes.extend(changes[1])
+                originals.update(changes[2])
+        return (puts, deletes, originals) if found else None
+
+    def flush(self):
+        """Escribe los cambios pendientes de cada cubeta."""
+        for shard in self._shards:
+            shard.flush()
+
+    def replace(self, data):
+        """Sustituye todos los registros."""
+        for shard, part in zip(self._shards, self._split(data)):
+            shard.replace(part)
+
+    def compact(self):
+        """Nada que compactar: cada cubeta es un archivo completo."""
+        for shard in self._shards:
+            shard.compact()
+
+    def invalidate(self):
+        """Olvida la memoria de todas las cubetas."""
+        for shard in self._shards:
+            shard.invalidate()
+
+    def close(self):
+        """Cierra todas las cubetas."""
+        for shard in self._shards:
+            shard.close()
+
+
+def export_json(path, label="datos"):
+    """Escribe los registros de las cubetas al archivo JSON ``path``."""
+    repository = ShardedRepository(path, label)
+    try:
+        data = repository.all()
+    finally:
+        repository.close()
+    return JsonStore(path, label).save(data)
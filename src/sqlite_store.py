@@ -0,0 +1,354 @@
+"""Almacenamiento en SQLite con búsquedas por índice.
+
+Cada archivo de datos se vuelve una tabla de la misma base de datos
+(``hotels.json`` -> tabla ``hotels``). Las columnas ``hotel_id`` y
+``customer_id`` se extraen del registro y tienen índice. El mapa
+``reservations`` de cada hotel se guarda aparte, en la tabla
+``hotel_reservations``; al guardar un hotel solo se insertan y borran
+las reservaciones que cambiaron.
+
+Los registros leídos o escritos se guardan en memoria y se regresan los
+mismos objetos mientras la tabla no cambie (como en ``Repository``), así
+siguen sirviendo los índices de ocupación y habitaciones asociados a
+ellos. Cada escritura sube la versión de su tabla en ``store_versions``;
+si otra conexión la cambió, la memoria se descarta.
+
+Un error de SQLite al escribir se lanza como ``StorageError``.
+
+La migración desde los archivos JSON se hace con::
+
+    python src/sqlite_store.py base.db hotels.json customers.json ...
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+import metrics
+from reporting import StorageError, get_logger
+
+LOGGER = get_logger("sqlite_store")
+DEFAULT_DATABASE = "reservation_system.db"
+NESTED_FIELD = "reservations"
+
+
+def table_name(path):
+    """Nombre de tabla a partir del nombre del archivo JSON."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r"[^a-z0-9_]", "_", stem.lower())
+
+
+class _Cache:
+    """Registros leídos de la tabla y la versión que conoce la memoria."""
+
+    def __init__(self):
+        """Memoria vacía."""
+        self.records = {}
+        self.complete = False
+        self.version = None
+
+    def forget(self):
+        """Olvida los registros en memoria."""
+        self.records = {}
+        self.complete = False
+        self.version = None
+
+    def sync(self, version):
+        """Descarta la memoria si la versión de la tabla cambió."""
+        if version != self.version:
+            self.forget()
+            self.version = version
+
+
+class SqliteRepository:
+    """Repositorio con la misma interfaz que ``Repository`` sobre SQLite."""
+
+    def __init__(self, path, label, database=DEFAULT_DATABASE):
+        """Abre (o crea) la tabla que corresponde al archivo ``path``."""
+        self.path = path
+        self.label = label
+        self.table = table_name(path)
+        self.database = os.path.abspath(database)
+        self._lock = threading.Lock()
+        self._cache = _Cache()
+        self._conn = sqlite3.connect(self.database, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    hotel_id TEXT,
+                    customer_id TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS {self.table}_hotel
+                    ON {self.table} (hotel_id);
+                CREATE INDEX IF NOT EXISTS {self.table}_customer
+                    ON {self.table} (customer_id);
+                CREATE TABLE IF NOT EXISTS hotel_reservations (
+                    hotel_id TEXT NOT NULL,
+                    reservation_id TEXT NOT NULL,
+                    customer_id TEXT,
+                    PRIMARY KEY (hotel_id, reservation_id)
+                );
+                CREATE INDEX IF NOT EXISTS hotel_reservations_customer
+                    ON hotel_reservations (customer_id);
+                CREATE TABLE IF NOT EXISTS store_versions (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                );
+                """
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO store_versions VALUES (?, 0)",
+                (self.table,),
+            )
+
+    def _nested(self):
+        """Indica si la tabla guarda aparte el mapa de reservaciones."""
+        return self.table == "hotels"
+
+    # --- Registros en memoria ---
+
+    def _sync(self):
+        """Descarta la memoria si la tabla cambió desde otra conexión."""
+        self._cache.sync(self._conn.execute(
+            "SELECT version FROM store_versions WHERE name = ?",
+            (self.table,),
+        ).fetchone()[0])
+
+    def _nested_rows(self, key):
+        """Mapa de reservaciones guardado de un hotel."""
+        return dict(self._conn.execute(
+            "SELECT reservation_id, customer_id FROM hotel_reservations "
+            "WHERE hotel_id = ?",
+            (key,),
+        ).fetchall())
+
+    def _decode(self, key, data, nested=None):
+        """Arma el registro a partir de la fila y sus reservaciones."""
+        record = json.loads(data)
+        if self._nested():
+            record[NESTED_FIELD] = (
+                self._nested_rows(key) if nested is None else nested
+            )
+        self._cache.records[key] = record
+        return record
+
+    # --- Escritura ---
+
+    def _begin_write(self):
+        """Sube la versión de la tabla al empezar una transacción.
+
+        Si la versión anterior no es la que conoce la memoria, otra
+        conexión escribió en medio y la memoria se descarta.
+        """
+        self._conn.execute(
+            "UPDATE store_versions SET version = version + 1 "
+            "WHERE name = ?",
+            (self.table,),
+        )
+        version = self._conn.execute(
+            "SELECT version FROM store_versions WHERE name = ?",
+            (self.table,),
+        ).fetchone()[0]
+        if version - 1 != self._cache.version:
+            self._cache.forget()
+        self._cache.version = version
+
+    def _write(self, key, value):
+        """Inserta o reemplaza un registro (dentro de una transacción)."""
+        record = dict(value)
+        nested = record.pop(NESTED_FIELD, None) if self._nested() else None
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} "
+            "(key, hotel_id, customer_id, data) VALUES (?, ?, ?, ?)",
+            (
+                key,
+                record.get("hotel_id"),
+                record.get("customer_id"),
+                json.dumps(record),
+            ),
+        )
+        if self._nested():
+            nested = nested or {}
+            stored = self._cache.records.get(key)
+            old = (
+                self._nested_rows(key) if stored is None
+                else stored.get(NESTED_FIELD, {})
+            )
+            self._conn.executemany(
+                "DELETE FROM hotel_reservations "
+                "WHERE hotel_id = ? AND reservation_id = ?",
+                [(key, rid) for rid in old if rid not in nested],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO hotel_reservations VALUES (?, ?, ?)",
+                [(key, rid, cid) for rid, cid in nested.items()
+                 if rid not in old or old[rid] != cid],
+            )
+        self._cache.records[key] = value
+
+    def _remove(self, key):
+        """Borra un registro (dentro de una transacción)."""
+        self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        if self._nested():
+            self._conn.execute(
+                "DELETE FROM hotel_reservations WHERE hotel_id = ?", (key,)
+            )
+        self._cache.records.pop(key, None)
+
+    def _run(self, action, *args):
+        """Ejecuta ``action`` en una transacción.
+
+        Si SQLite falla se deshace, se olvida la memoria y se lanza
+        StorageError.
+        """
+        with self._lock, metrics.timer("store_seconds", file=self.label,
+                                       action="write"):
+            try:
+                with self._conn:
+                    self._begin_write()
+                    action(*args)
+            except sqlite3.Error as e:
+                self._cache.forget()
+                LOGGER.error("Error en la base de datos de %s: %s",
+                             self.label, e)
+                error = StorageError(
+                    "No se pudo guardar la base de datos de %s: %s",
+                    self.label, e,
+                )
+                raise error from e
+
+    # --- Interfaz de Repository ---
+
+    def all(self):
+        """Todos los registros como diccionario nuevo."""
+        with self._lock:
+            self._sync()
+            if not self._cache.complete:
+                nested = {}
+                if self._nested():
+                    for hotel_id, rid, cid in self._conn.execute(
+                        "SELECT hotel_id, reservation_id, customer_id "
+                        "FROM hotel_reservations"
+                    ):
+                        nested.setdefault(hotel_id, {})[rid] = cid
+                for key, data in self._conn.execute(
+                    f"SELECT key, data FROM {self.table}"
+                ).fetchall():
+                    if key not in self._cache.records:
+                        self._decode(key, data, nested.get(key, {}))
+                self._cache.complete = True
+            return dict(self._cache.records)
+
+    def get(self, key):
+        """Regresa el registro con esa llave, o None.
+
+        El registro es compartido y no se debe modificar.
+        """
+        with self._lock, metrics.timer("store_seconds", file=self.label,
+                                       action="query"):
+            self._sync()
+            record = self._cache.records.get(key)
+            if record is not None or self._cache.complete:
+                return record
+            row = self._conn.execute(
+                f"SELECT data FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            return None if row is None else self._decode(key, row[0])
+
+    def contains(self, key):
+        """Indica si existe un registro con esa llave."""
+        with self._lock:
+            self._sync()
+            if key in self._cache.records or self._cache.complete:
+                return key in self._cache.records
+            row = self._conn.execute(
+                f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    def find(self, field, value):
+        """Llaves de los registros cuyo campo ``field`` vale ``value``.
+
+        ``hotel_id`` y ``customer_id`` usan las columnas con índice; los
+        demás campos se buscan dentro del JSON guardado.
+        """
+        if field in ("hotel_id", "customer_id"):
+            column = field
+        elif re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", field):
+            column = f"json_extract(data, '$.{field}')"
+        else:
+            raise ValueError(f"Campo inválido: {field}")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key FROM {self.table} WHERE {column} = ?", (value,)
+            ).fetchall()
+        return [key for (key,) in rows]
+
+    def validate(self, key, value):
+        """Acepta cualquier registro (ver ``MmapRepository.validate``)."""
+
+    def put(self, key, value):
+        """Guarda (o reemplaza) un registro."""
+        self._run(self._write, key, value)
+
+    def delete(self, key):
+        """Borra un registro existente."""
+        self._run(self._remove, key)
+
+    def update(self, puts, deletes=()):
+        """Guarda y borra varios registros en una sola transacción."""
+        def apply_changes():
+            for key, value in puts.items():
+                self._write(key, value)
+            for key in deletes:
+                self._remove(key)
+        self._run(apply_changes)
+
+    def replace(self, data):
+        """Sustituye todos los registros en una sola transacción."""
+        def replace_all():
+            self._conn.execute(f"DELETE FROM {self.table}")
+            if self._nested():
+                self._conn.execute("DELETE FROM hotel_reservations")
+            self._cache.records = {}
+            for key, value in data.items():
+                self._write(key, value)
+            self._cache.complete = True
+        self._run(replace_all)
+
+    def compact(self):
+        """SQLite no necesita compactación explícita."""
+
+    def invalidate(self):
+        """Olvida los registros en memoria."""
+        with self._lock:
+            self._cache.forget()
+
+    def close(self):
+        """Cierra la conexión con la base de datos."""
+        self.invalidate()
+        self._conn.close()
+
+
+def migrate(database, paths):
+    """Copia los archivos JSON indicados a la base de datos."""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        repository = SqliteRepository(path, table_name(path), database)
+        repository.replace(data)
+        repository.close()
+        print(f"{path}: {len(data)} registros migrados.")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Uso: python sqlite_store.py BASE.db ARCHIVO.json ...")
+        sys.exit(1)
+    migrate(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,215 @@
+"""Lectura incremental de los archivos JSON de datos.
+
+Los archivos son un solo objeto ``{llave: registro, ...}``. Aquí se leen
+por bloques y se entregan los registros uno a uno, sin armar el
+diccionario completo. También se puede guardar un índice de posiciones
+(``<archivo>.idx``) para ir directo a un registro con ``seek``.
+"""
+
+import json
+import os
+import re
+
+from reporting import get_logger
+
+LOGGER = get_logger("stream")
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+_DECODER = json.JSONDecoder()
+_KEY = re.compile(r'[ \t\n\r]*"((?:[^"\\]|\\.)*)"[ \t\n\r]*:')
+_SEPARATOR = re.compile(r"[ \t\n\r]*([,}])[ \t\n\r]*")
+
+
+def file_signature(path):
+    """Firma del archivo (inodo, tamaño, mtime), o None si no existe."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+class _Reader:
+    """Búfer de texto que se va llenando por bloques."""
+
+    def __init__(self, f, chunk_size):
+        """Lee de ``f`` en bloques de ``chunk_size`` caracteres."""
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.offset = 0  # bytes antes de buf[0]
+        self.eof = False
+
+    def fill(self):
+        """Agrega un bloque al búfer. Regresa False al final del archivo."""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def byte_offset(self):
+        """Posición actual en bytes dentro del archivo."""
+        return self.offset + len(self.buf[:self.pos].encode("utf-8"))
+
+    def discard(self):
+        """Suelta lo que ya se leyó para no acumular memoria."""
+        self.offset = self.byte_offset()
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+
+    def peek(self):
+        """Siguiente carácter que no sea espacio (o '' al final)."""
+        while True:
+            buf = self.buf
+            while self.pos < len(buf) and buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        """Consume ``char`` o lanza ValueError."""
+        if self.peek() != char:
+            raise ValueError(f"Se esperaba '{char}' en el byte "
+                             f"{self.byte_offset()}")
+        self.pos += 1
+
+    def value(self):
+        """Decodifica el siguiente valor JSON completo."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # Un número al final del búfer podría seguir en el siguiente
+            # bloque (p. ej. "1500." + "0").
+            if (
+                isinstance(value, (int, float))
+                and not self.buf[end:].strip(_NUMBER_CHARS)
+                and not self.eof
+                and self.fill()
+            ):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_entries(path, chunk_size=CHUNK_SIZE):
+    """Genera (llave, registro, offset, longitud) de cada registro.
+
+    ``offset`` y ``longitud`` están en bytes y cubren solo el registro.
+    Lanza ValueError si el archivo no es un objeto JSON válido.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _Reader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            reader.discard()
+            key = reader.value()
+            reader.expect(":")
+            reader.peek()  # el registro empieza después de los espacios
+            start = reader.byte_offset()
+            value = reader.value()
+            yield key, value, start, reader.byte_offset() - start
+            if reader.peek() == "}":
+                return
+            reader.expect(",")
+
+
+def iter_records(path, chunk_size=CHUNK_SIZE):
+    """Genera los pares (llave, registro) de un archivo de datos.
+
+    Como ``iter_entries`` pero sin calcular posiciones: la llave y los
+    separadores se reconocen con expresiones regulares y lo ya leído se
+    suelta una vez por bloque, no en cada registro.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _Reader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            if reader.pos > chunk_size:
+                reader.discard()
+            match = _KEY.match(reader.buf, reader.pos)
+            if match is None:
+                # Llave cortada por el final del bloque: camino lento.
+                key = reader.value()
+                reader.expect(":")
+            else:
+                key = match.group(1)
+                if "\\" in key:
+                    key = json.loads(f'"{key}"')
+                reader.pos = match.end()
+            yield key, reader.value()
+            match = _SEPARATOR.match(reader.buf, reader.pos)
+            if match is None:
+                if reader.peek() == "}":
+                    return
+                reader.expect(",")
+            elif match.group(1) == "}":
+                return
+            else:
+                reader.pos = match.end()
+
+
+def find_record(path, key):
+    """Busca un registro recorriendo el archivo; se detiene al hallarlo."""
+    for record_key, value in iter_records(path):
+        if record_key == key:
+            return value
+    return None
+
+
+def index_path(path):
+    """Ruta del índice de posiciones de un archivo de datos."""
+    return path + ".idx"
+
+
+def build_index(path):
+    """Arma y guarda el índice {llave: [offset, longitud]} del archivo."""
+    signature = file_signature(path)
+    entries = {
+        key: [start, length]
+        for key, _, start, length in iter_entries(path)
+    }
+    try:
+        with open(index_path(path), "w", encoding="utf-8") as f:
+            json.dump({"signature": signature, "entries": entries}, f)
+    except IOError as e:
+        LOGGER.warning("No se pudo guardar el índice de %s: %s", path, e)
+    return signature, entries
+
+
+def load_index(path):
+    """Lee el índice guardado si sigue vigente; si no, lo vuelve a armar."""
+    try:
+        with open(index_path(path), "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved["signature"] == file_signature(path):
+            return saved["signature"], saved["entries"]
+    except (IOError, ValueError, KeyError, TypeError):
+        pass
+    return build_index(path)
+
+
+def read_at(path, offset, length, signature):
+    """Lee un registro en la posición dada.
+
+    Regresa None si el archivo ya no es el mismo que describe
+    ``signature`` (otro proceso lo reemplazó).
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if [st.st_ino, st.st_size, st.st_mtime_ns] != signature:
+            return None
+        f.seek(offset)
+        return json.loads(f.read(length).decode("utf-8"))
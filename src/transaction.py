@@ -0,0 +1,479 @@
+"""Transacciones atómicas sobre varios archivos de datos.
+
+Una transacción junta los cambios (``put``/``delete``) de uno o más
+repositorios y los aplica todos juntos al salir del bloque ``with``:
+
+1. Se toman los candados de los recursos indicados (p. ej. un hotel).
+2. Los cambios, con el valor anterior de cada registro, se escriben en
+   un journal propio de la transacción dentro de ``JOURNAL_DIR``
+   (archivo temporal + os.replace). Con un solo cambio no hace falta:
+   es una sola escritura.
+3. Se aplican a cada repositorio, con una escritura por archivo.
+4. Se borra el journal y se sueltan los candados.
+
+No hay un candado global: dos reservaciones del mismo hotel se hacen una
+tras otra y las de hoteles distintos en paralelo, también al confirmar
+(cada archivo se bloquea solo mientras se escribe).
+
+Si el proceso muere entre 2 y 4, el journal se queda y la siguiente
+transacción sobre alguno de sus recursos (o ``recover``) lo vuelve a
+aplicar; como los cambios son idempotentes, repetirlos es seguro. Si un
+archivo no se puede escribir en 3, el journal se marca para deshacer, se
+restauran los valores anteriores y ``commit`` lanza ``StorageError``: un
+cambio reportado como fallido no aparece después. Si tampoco se puede
+deshacer, ``recover`` lo deshace más tarde.
+
+Dentro de un lote (``begin_batch``/``flush_batch``) las transacciones
+solo cambian la memoria; ``flush_batch`` escribe un único journal con
+los cambios de todas ellas y luego cada archivo una sola vez. Los
+candados que toman se quedan tomados hasta el flush, así ningún otro
+proceso cambia en disco lo que el lote tiene en memoria. Solo los
+almacenamientos con escritura diferida (ver ``repository``) aceptan
+lotes.
+"""
+
+import contextlib
+import functools
+import json
+import os
+
+from locks import FileLock
+from reporting import StorageError, get_logger
+from repository import get_repository, pending_repositories, set_deferred
+
+LOGGER = get_logger("transaction")
+JOURNAL_DIR = "transaction.journals"
+# Máximo de candados por transacción en las cargas masivas.
+BULK_LOCK_GROUP = 256
+_BATCH = {"active": False, "resources": set(),
+          "held": contextlib.ExitStack(), "error": None}
+
+
+def hotel_lock(hotel_id):
+    """Nombre del candado que protege las reservaciones de un hotel."""
+    return f"hotel:{hotel_id}"
+
+
+def customer_lock(customer_id):
+    """Nombre del candado que protege los datos de un cliente."""
+    return f"customer:{customer_id}"
+
+
+@contextlib.contextmanager
+def _holding(resources):
+    """Tiene los candados de ``resources``, tomados siempre en orden."""
+    with contextlib.ExitStack() as stack:
+        for name in sorted(set(resources)):
+            stack.enter_context(FileLock(name))
+        yield
+
+
+def _take(resources, blocking=True):
+    """Toma los candados de ``resources``; regresa un ExitStack que los suelta.
+
+    Antes termina los journals que otro proceso dejó a medias sobre esos
+    recursos; si aparece uno mientras se esperaban los candados, se
+    sueltan y se vuelve a empezar. Con ``blocking=False`` no espera ni
+    termina journals: regresa None si algún candado está ocupado o
+    algún recurso tiene un journal pendiente.
+    """
+    while True:
+        if blocking:
+            _recover(resources)
+        with contextlib.ExitStack() as stack:
+            for name in sorted(set(resources)):
+                lock = FileLock(name)
+                if not lock.acquire(blocking):
+                    return None
+                stack.callback(lock.release)
+            if not _journals(resources):
+                return stack.pop_all()
+        if not blocking:
+            return None
+
+
+@contextlib.contextmanager
+def _immediate():
+    """Escribe directo a disco aunque haya un lote abierto."""
+    set_deferred(False)
+    try:
+        yield
+    finally:
+        set_deferred(_BATCH["active"])
+
+
+def _apply(ops):
+    """Aplica los cambios del journal, una escritura por repositorio."""
+    grouped = {}
+    for op in ops:
+        puts, deletes = grouped.setdefault(
+            (op["path"], op["label"]), ({}, [])
+        )
+        if op["op"] == "put":
+            puts[op["key"]] = op["value"]
+        else:
+            deletes.append(op["key"])
+    for (path, label), (puts, deletes) in grouped.items():
+        get_repository(path, label).update(puts, deletes)
+
+
+def _inverse(ops):
+    """Cambios que regresan cada registro a su valor anterior."""
+    return [
+        dict(op, op="put" if op["old"] is not None else "delete",
+             value=op["old"])
+        for op in ops
+    ]
+
+
+def _journal_path():
+    """Ruta nueva para el journal de una transacción de este proceso."""
+    name = f"{os.getpid()}-{os.urandom(6).hex()}.journal"
+    return os.path.join(JOURNAL_DIR, name)
+
+
+def _journal_lock(path):
+    """Candado que tiene el dueño del journal mientras lo aplica."""
+    return f"journal:{os.path.basename(path)}"
+
+
+def _write_journal(path, header, ops):
+    """Escribe el journal completo de forma atómica y durable.
+
+    La primera línea es el encabezado (candados y si hay que deshacer),
+    que se lee sin cargar los cambios.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+        json.dump(ops, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _remove(path):
+    """Borra un journal (si todavía existe)."""
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def _journals(resources=None):
+    """(ruta, encabezado) de los journals pendientes.
+
+    Con ``resources`` solo los que usan alguno de esos candados.
+    """
+    try:
+        names = sorted(os.listdir(JOURNAL_DIR))
+    except FileNotFoundError:
+        return []
+    found = []
+    for name in names:
+        if not name.endswith(".journal"):
+            continue
+        path = os.path.join(JOURNAL_DIR, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+        except FileNotFoundError:
+            continue
+        except (ValueError, IOError) as e:
+            # El journal se escribe con os.replace, así que uno corrupto
+            # nunca llegó a confirmarse.
+            LOGGER.warning("Journal inválido, se descarta: %s", e)
+            _remove(path)
+            continue
+        if resources is None or set(header["locks"]) & set(resources):
+            found.append((path, header))
+    return found
+
+
+def _finish(path, header):
+    """Termina (o deshace) un journal que su dueño dejó a medias.
+
+    Se toman sus candados, así que si el dueño sigue vivo se espera a
+    que lo termine él. Si una escritura falla el journal se queda.
+    """
+    with _holding(header["locks"]):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                ops = json.load(f)
+        except FileNotFoundError:
+            return False
+        with _immediate():
+            _apply(_inverse(ops) if header["undo"] else ops)
+        _remove(path)
+    return True
+
+
+def _recover(resources=None):
+    """Termina los journals pendientes (de ``resources``, si se dan)."""
+    recovered = False
+    for path, header in _journals(resources):
+        recovered = _finish(path, header) or recovered
+    return recovered
+
+
+def recover():
+    """Termina los journals que quedaron a medias; True si había alguno."""
+    return _recover()
+
+
+def _roll_back(path, header, ops):
+    """Deshace un commit que falló; si no se puede, queda para ``recover``."""
+    try:
+        _write_journal(path, dict(header, undo=True), ops)
+    except OSError as e:
+        # Un journal que se volvería a aplicar es peor que ninguno.
+        LOGGER.error("No se pudo marcar el journal para deshacer: %s", e)
+        _remove(path)
+    try:
+        with _immediate():
+            _apply(_inverse(ops))
+    except StorageError as e:
+        LOGGER.error("No se pudo deshacer la transacción: %s", e)
+        return
+    _remove(path)
+
+
+def _commit(resources, ops, write):
+    """Escribe el journal de ``ops``, llama a ``write`` y lo borra.
+
+    Si ``write`` lanza StorageError los cambios se deshacen antes de
+    volver a lanzarlo.
+    """
+    path = _journal_path()
+    lock = _journal_lock(path)
+    header = {"locks": sorted(set(resources)) + [lock], "undo": False}
+    with FileLock(lock):
+        try:
+            os.makedirs(JOURNAL_DIR, exist_ok=True)
+            _write_journal(path, header, ops)
+        except OSError as e:
+            error = StorageError("No se pudo escribir el journal: %s", e)
+            raise error from e
+        try:
+            write()
+        except StorageError:
+            _roll_back(path, header, ops)
+            raise
+        _remove(path)
+
+
+def begin_batch():
+    """Desde aquí los cambios se quedan en memoria hasta ``flush_batch``.
+
+    Lanza ValueError si algún almacenamiento configurado no tiene
+    escritura diferida (sqlite, mmap).
+    """
+    set_deferred(True)
+    _BATCH["active"] = True
+
+
+def _batch_take(resources):
+    """Toma los candados que le faltan al lote; se sueltan en el flush.
+
+    Esperar un candado teniendo otros podría trabar a dos lotes entre
+    sí, así que si uno está ocupado primero se escribe el lote (y se
+    sueltan los suyos). Si ese flush falla el error se guarda y lo
+    lanza el siguiente ``flush_batch``.
+    """
+    missing = set(resources) - _BATCH["resources"]
+    if not missing:
+        return
+    held = None
+    if _BATCH["resources"]:
+        held = _take(missing, blocking=False)
+        if held is None:
+            try:
+                flush_batch()
+            except StorageError as e:
+                _BATCH["error"] = e
+            missing = set(resources)
+    if held is None:
+        held = _take(missing)
+    _BATCH["held"].enter_context(held)
+    _BATCH["resources"].update(missing)
+
+
+def _release_batch():
+    """Suelta los candados del lote."""
+    held, _BATCH["held"] = _BATCH["held"], contextlib.ExitStack()
+    _BATCH["resources"] = set()
+    held.close()
+
+
+def _flush(repositories):
+    """Escribe los pendientes; si uno falla, olvida los de todos."""
+    try:
+        for repository in repositories:
+            repository.flush()
+    except StorageError:
+        for repository in repositories:
+            repository.invalidate()
+        raise
+
+
+def _pending_ops(repositories):
+    """Cambios pendientes de los repositorios, en formato de journal."""
+    ops = []
+    for repository in repositories:
+        puts, deletes, originals = repository.pending()
+        ops.extend(
+            {"path": repository.path, "label": repository.label,
+             "op": "put", "key": key, "value": value,
+             "old": originals.get(key)}
+            for key, value in puts.items()
+        )
+        ops.extend(
+            {"path": repository.path, "label": repository.label,
+             "op": "delete", "key": key, "value": None,
+             "old": originals.get(key)}
+            for key in deletes
+        )
+    return ops
+
+
+def flush_batch():
+    """Escribe juntos, de forma atómica, todos los cambios pendientes.
+
+    Como ``Transaction.commit``, si falla una escritura deshace lo que
+    alcanzó a escribir, descarta el lote y lanza StorageError; lo mismo
+    si falló un flush anterior del lote. Al final suelta los candados.
+    """
+    error, _BATCH["error"] = _BATCH["error"], None
+    try:
+        if error is not None:
+            raise error
+        repositories = pending_repositories()
+        if repositories:
+            _commit(_BATCH["resources"], _pending_ops(repositories),
+                    functools.partial(_flush, repositories))
+    except StorageError:
+        discard_batch()
+        raise
+    finally:
+        _release_batch()
+
+
+def discard_batch():
+    """Descarta los cambios del lote que no se pudieron escribir.
+
+    Los repositorios olvidan su memoria y la siguiente lectura va a
+    disco, así el siguiente ``flush_batch`` no los vuelve a escribir.
+    También suelta los candados del lote.
+    """
+    for repository in pending_repositories():
+        repository.invalidate()
+    _BATCH["error"] = None
+    _release_batch()
+
+
+def end_batch():
+    """Escribe lo pendiente y regresa a la escritura inmediata."""
+    try:
+        flush_batch()
+    finally:
+        set_deferred(False)
+        _BATCH["active"] = False
+
+
+class Transaction:
+    """Conjunto de cambios que se aplican todos o ninguno."""
+
+    def __init__(self, *resources):
+        """``resources`` son los nombres de los candados a tomar."""
+        self._resources = set(resources)
+        self._held = None
+        self._ops = {}
+
+    def _stage(self, repository, op, key, value=None):
+        """Registra un cambio; uno nuevo sobre la misma llave lo reemplaza."""
+        self._ops[(repository.path, key)] = {
+            "path": repository.path,
+            "label": repository.label,
+            "op": op,
+            "key": key,
+            "value": value,
+        }
+
+    def put(self, repository, key, value):
+        """Agrega el guardado de un registro a la transacción.
+
+        El registro se valida aquí (ValueError), antes de escribir el
+        journal: uno que el repositorio no acepta nunca llega a disco.
+        """
+        repository.validate(key, value)
+        self._stage(repository, "put", key, value)
+
+    def delete(self, repository, key):
+        """Agrega el borrado de un registro a la transacción."""
+        self._stage(repository, "delete", key)
+
+    def get(self, repository, key):
+        """Lee un registro viendo los cambios pendientes de la transacción."""
+        op = self._ops.get((repository.path, key))
+        if op is None:
+            return repository.get(key)
+        return op["value"]
+
+    def staged(self, repository, key):
+        """Indica si el registro ya tiene un cambio en la transacción.
+
+        Ese valor es de la transacción (no del repositorio): quien lo
+        guardó lo puede seguir cambiando en su lugar.
+        """
+        return (repository.path, key) in self._ops
+
+    def contains(self, repository, key):
+        """Indica si el registro existe, con los cambios pendientes."""
+        return self.get(repository, key) is not None
+
+    def commit(self):
+        """Aplica todos los cambios pendientes.
+
+        Lanza StorageError si un archivo no se pudo escribir; para
+        entonces los cambios ya se deshicieron (ver el módulo).
+        """
+        if not self._ops:
+            return
+        ops, self._ops = list(self._ops.values()), {}
+        if _BATCH["active"] or len(ops) == 1:
+            # Un solo cambio es una sola escritura: no necesita journal.
+            _apply(ops)
+            return
+        for op in ops:
+            op["old"] = get_repository(op["path"], op["label"]).get(
+                op["key"]
+            )
+        _commit(self._resources, ops, functools.partial(_apply, ops))
+
+    def rollback(self):
+        """Descarta los cambios pendientes."""
+        self._ops = {}
+
+    def __enter__(self):
+        """Toma los candados de los recursos (siempre en el mismo orden).
+
+        Antes termina los journals que otro proceso dejó a medias sobre
+        esos recursos (ver ``_take``). Dentro de un lote los candados
+        son del lote y se quedan tomados hasta el flush.
+        """
+        if _BATCH["active"]:
+            _batch_take(self._resources)
+        else:
+            self._held = _take(self._resources)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Confirma si no hubo error y suelta los candados."""
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            if self._held is not None:
+                self._held.close()
+                self._held = None
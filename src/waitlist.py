@@ -0,0 +1,239 @@
+"""Lista de espera de los hoteles llenos.
+
+Las peticiones que llegan sin lugar se guardan en ``waitlist.json``, una
+por reservación (``{reservation_id: {hotel_id, customer_id, check_in,
+check_out, priority, turn}}``). Se atienden primero las de mayor
+``priority`` y, entre iguales, en orden de llegada (``turn``).
+
+En memoria cada hotel tiene un ``WaitQueue``: un heap por rango de
+fechas y un índice noche -> rangos. Cuando se libera una habitación en
+un rango (``drain``) solo se miran las cabezas de los rangos que se
+enciman con él, en un heap por prioridad: cada petición atendida cuesta
+O(log n) más lo que tarde en reservarse, y un rango cuya cabeza no cabe
+se deja completo (todas sus peticiones piden las mismas noches), sin
+recorrer la lista entera. Las peticiones retiradas se sacan del heap
+cuando llegan a la cabeza.
+
+Todos los cambios se hacen dentro de una transacción con el candado del
+hotel y le cambian al hotel su ``waitlist_token``. La cola en memoria se
+asocia a ese valor: si la transacción se deshace u otro proceso cambia
+la lista, el token ya no coincide y la cola se vuelve a armar con las
+peticiones del hotel.
+"""
+
+import copy
+import heapq
+import os
+import time
+
+from occupancy import nights
+from repository import get_repository
+
+WAITLIST_FILE = "waitlist.json"
+# Rango de las peticiones sin fechas: se encima con cualquier otro.
+UNDATED = (None, None)
+
+_CACHE = {}
+
+
+def _repository():
+    """Repositorio en memoria del archivo de la lista de espera."""
+    return get_repository(WAITLIST_FILE, "lista de espera")
+
+
+def load_waitlist(hotel_id=None):
+    """Regresa una copia de las peticiones en espera (de un hotel o todas)."""
+    waiting = _repository()
+    if hotel_id is None:
+        return copy.deepcopy(waiting.all())
+    return {
+        key: copy.deepcopy(waiting.get(key))
+        for key in waiting.find("hotel_id", str(hotel_id))
+    }
+
+
+class WaitQueue:
+    """Peticiones en espera de un hotel, por rango de fechas y prioridad."""
+
+    def __init__(self):
+        """Cola vacía."""
+        self.queues = {}
+        self.by_night = {}
+
+    @staticmethod
+    def from_entries(entries):
+        """Arma la cola a partir de los registros de ``waitlist.json``."""
+        queue = WaitQueue()
+        for reservation_id, entry in entries.items():
+            queue.add(reservation_id, entry)
+        return queue
+
+    def add(self, reservation_id, entry):
+        """Agrega la petición al heap de su rango."""
+        key = (entry["check_in"], entry["check_out"])
+        heap = self.queues.get(key)
+        if heap is None:
+            heap = self.queues[key] = []
+            if key != UNDATED:
+                for night in nights(*key):
+                    self.by_night.setdefault(night, set()).add(key)
+        heapq.heappush(heap, (-entry["priority"], entry["turn"],
+                              reservation_id))
+
+    def _discard(self, key):
+        """Olvida un rango sin peticiones."""
+        del self.queues[key]
+        if key != UNDATED:
+            for night in nights(*key):
+                keys = self.by_night[night]
+                keys.discard(key)
+                if not keys:
+                    del self.by_night[night]
+
+    def head(self, key, live):
+        """Primera petición del rango para la que ``live`` es cierto.
+
+        ``live(reservation_id, turn)`` indica si la petición sigue en la
+        lista; las que no, se sacan del heap al pasar.
+        """
+        heap = self.queues.get(key)
+        while heap:
+            _, turn, reservation_id = heap[0]
+            if live(reservation_id, turn):
+                return heap[0]
+            heapq.heappop(heap)
+        if heap is not None:
+            self._discard(key)
+        return None
+
+    def pop(self, key):
+        """Saca la cabeza del rango (ya vista con ``head``)."""
+        heapq.heappop(self.queues[key])
+
+    def overlapping(self, check_in=None, check_out=None):
+        """Rangos que comparten noches con el dado (sin fechas: todos)."""
+        if check_in is None:
+            return list(self.queues)
+        keys = set()
+        for night in nights(check_in, check_out):
+            keys.update(self.by_night.get(night, ()))
+        if UNDATED in self.queues:
+            keys.add(UNDATED)
+        return sorted(keys, key=str)
+
+
+def queue_for(hotel):
+    """Regresa la cola del hotel, armándola si su lista cambió."""
+    cached = _CACHE.get(hotel.hotel_id)
+    if cached is not None and cached[0] == hotel.waitlist_token:
+        return cached[1]
+    waiting = _repository()
+    queue = WaitQueue.from_entries({
+        key: waiting.get(key)
+        for key in waiting.find("hotel_id", hotel.hotel_id)
+    })
+    _CACHE[hotel.hotel_id] = (hotel.waitlist_token, queue)
+    return queue
+
+
+def _touch(hotel, queue):
+    """Marca la lista del hotel como cambiada por esta cola."""
+    hotel.waitlist_token = os.urandom(8).hex()
+    _CACHE[hotel.hotel_id] = (hotel.waitlist_token, queue)
+
+
+def _live(transaction):
+    """Función ``live`` de ``WaitQueue.head`` según la transacción."""
+    waiting = _repository()
+
+    def live(reservation_id, turn):
+        """Indica si la petición sigue en espera."""
+        entry = transaction.get(waiting, reservation_id)
+        return entry is not None and entry["turn"] == turn
+
+    return live
+
+
+def contains(transaction, reservation_id):
+    """Indica si hay una petición en espera con ese ID."""
+    return transaction.contains(_repository(), reservation_id)
+
+
+# pylint: disable-next=too-many-arguments,too-many-positional-arguments
+def enqueue(transaction, hotel, reservation_id, customer_id, check_in=None,
+            check_out=None, priority=0):
+    """Agrega una petición del hotel a la transacción.
+
+    Lanza ValueError si las fechas no son válidas.
+    """
+    if check_in is not None:
+        nights(check_in, check_out)
+    queue = queue_for(hotel)
+    entry = {
+        "reservation_id": reservation_id,
+        "hotel_id": hotel.hotel_id,
+        "customer_id": customer_id,
+        "check_in": check_in,
+        "check_out": check_out,
+        "priority": priority,
+        "turn": time.time_ns(),
+    }
+    queue.add(reservation_id, entry)
+    transaction.put(_repository(), reservation_id, entry)
+    _touch(hotel, queue)
+
+
+def withdraw(transaction, hotel, reservation_id):
+    """Quita una petición del hotel; regresa False si no estaba."""
+    waiting = _repository()
+    entry = transaction.get(waiting, reservation_id)
+    if entry is None or entry["hotel_id"] != hotel.hotel_id:
+        return False
+    queue = queue_for(hotel)
+    transaction.delete(waiting, reservation_id)
+    # El heap la descarta cuando llega a la cabeza (ver ``head``).
+    _touch(hotel, queue)
+    return True
+
+
+def discard_hotel(transaction, hotel_id):
+    """Agrega a la transacción el borrado de las peticiones del hotel."""
+    waiting = _repository()
+    for reservation_id in waiting.find("hotel_id", hotel_id):
+        transaction.delete(waiting, reservation_id)
+
+
+def drain(transaction, hotel, admit, check_in=None, check_out=None):
+    """Atiende las peticiones que pueden usar lo liberado en el rango.
+
+    ``admit(reservation_id, entry)`` intenta reservar y regresa True si
+    la petición sale de la lista (reservada o descartada) o False si no
+    cupo; en ese caso su rango se deja para la próxima vez. Regresa los
+    IDs que salieron de la lista, en el orden en que se atendieron.
+    """
+    queue = queue_for(hotel)
+    if not queue.queues:
+        return []
+    waiting = _repository()
+    live = _live(transaction)
+    heads = []
+    for key in queue.overlapping(check_in, check_out):
+        head = queue.head(key, live)
+        if head is not None:
+            heads.append((head, key))
+    heapq.heapify(heads)
+    served = []
+    while heads:
+        (_, _, reservation_id), key = heapq.heappop(heads)
+        if not admit(reservation_id,
+                     transaction.get(waiting, reservation_id)):
+            continue
+        queue.pop(key)
+        transaction.delete(waiting, reservation_id)
+        served.append(reservation_id)
+        head = queue.head(key, live)
+        if head is not None:
+            heapq.heappush(heads, (head, key))
+    if served:
+        _touch(hotel, queue)
+    return served
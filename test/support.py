@@ -0,0 +1,31 @@
+"""Utilerías compartidas por los módulos de prueba."""
+
+import os
+import shutil
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+import mmap_store  # noqa: E402
+import repository as repository_module  # noqa: E402
+import shard_store  # noqa: E402
+import transaction as transaction_module  # noqa: E402
+
+
+DATA_FILES = ["hotels.json", "customers.json", "reservations.json",
+              "idempotency.json", "waitlist.json"]
+
+
+def cleanup_files():
+    """Borra los archivos de datos que quedan de las pruebas."""
+    for name in DATA_FILES:
+        binary = repository_module.binary_path(name)
+        records = mmap_store.mmap_path(name)
+        for f in [name, name + ".log", name + ".tmp", name + ".idx", binary,
+                  binary + ".tmp", records, records + ".tmp"]:
+            if os.path.exists(f):
+                os.remove(f)
+        shutil.rmtree(shard_store.shard_dir(name), ignore_errors=True)
+    shutil.rmtree(transaction_module.JOURNAL_DIR, ignore_errors=True)
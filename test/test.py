@@ -8,6 +8,7 @@ sys.path.insert(
     0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
 )
 
+from support import cleanup_files  # noqa: E402
 import customer as customer_module  # noqa: E402
 import hotel as hotel_module  # noqa: E402
 import reservation as reservation_module  # noqa: E402
@@ -16,13 +17,6 @@ from hotel import Hotel  # noqa: E402
 from reservation import Reservation  # noqa: E402
 
 
-def cleanup_files():
-    """Borra los archivos JSON que quedan de las pruebas."""
-    for f in ["hotels.json", "customers.json", "reservations.json"]:
-        if os.path.exists(f):
-            os.remove(f)
-
-
 class TestHotel(unittest.TestCase):
     """Pruebas de la clase Hotel."""
     # pylint: disable=too-many-public-methods
@@ -0,0 +1,631 @@
+"""Pruebas de lotes, transacciones, idempotencia y candados."""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+from support import cleanup_files  # noqa: E402
+import customer as customer_module  # noqa: E402
+import hotel as hotel_module  # noqa: E402
+import reservation as reservation_module  # noqa: E402
+import repository as repository_module  # noqa: E402
+import idempotency  # noqa: E402
+from group_commit import GroupCommitter  # noqa: E402
+from async_service import (  # noqa: E402
+    AsyncCustomerService, AsyncHotelService, AsyncReservationService,
+    ServiceRunner,
+)
+import locks  # noqa: E402
+import metrics  # noqa: E402
+import reporting  # noqa: E402
+import transaction as transaction_module  # noqa: E402
+from customer import Customer  # noqa: E402
+from hotel import Hotel  # noqa: E402
+from reservation import Reservation  # noqa: E402
+
+
+class TestAsyncService(unittest.TestCase):
+    """Pruebas de la fachada asyncio."""
+
+    def setUp(self):
+        """Limpia el estado antes de cada prueba."""
+        cleanup_files()
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def test_concurrent_writes_share_flushes(self):
+        """Verifica que muchas escrituras concurrentes usan pocos flushes."""
+        repo = repository_module.get_repository("customers.json", "clientes")
+        calls = []
+        original = repo.store.record_changes
+
+        def counting(data, puts, deletes):
+            calls.append(len(puts))
+            return original(data, puts, deletes)
+
+        async def scenario():
+            async with ServiceRunner() as runner:
+                customers = AsyncCustomerService(runner)
+                return await asyncio.gather(*(
+                    customers.create_customer(f"CA{i}", "A", "a@x", "1")
+                    for i in range(30)
+                ))
+
+        repo.store.record_changes = counting
+        try:
+            results = asyncio.run(scenario())
+        finally:
+            repo.store.record_changes = original
+        self.assertTrue(all(results))
+        self.assertLess(len(calls), 30)
+        self.assertEqual(sum(calls), 30)
+        repository_module.reset_repositories()
+        self.assertEqual(len(customer_module.load_customers()), 30)
+
+    def test_reservations_through_services(self):
+        """Verifica reservaciones concurrentes sin sobreventa."""
+        async def scenario():
+            async with ServiceRunner() as runner:
+                hotels = AsyncHotelService(runner)
+                reservations = AsyncReservationService(runner)
+                await hotels.create_hotel("HA1", "Async", "City", 2)
+                created = await asyncio.gather(*(
+                    reservations.create_reservation(
+                        f"RA{i}", "C1", "HA1", "2025-01-01", "2025-01-02"
+                    )
+                    for i in range(5)
+                ))
+                hotel = await hotels.display_hotel("HA1")
+                return created, hotel
+
+        created, hotel = asyncio.run(scenario())
+        self.assertEqual(sum(1 for r in created if r is not None), 2)
+        self.assertEqual(hotel.available_rooms(), 0)
+        repository_module.reset_repositories()
+        self.assertEqual(len(reservation_module.load_reservations()), 2)
+
+    def test_identical_reads_coalesced(self):
+        """Verifica que lecturas iguales simultáneas se ejecutan una vez."""
+        calls = []
+
+        def slow_read(key):
+            calls.append(key)
+            return key
+
+        async def scenario():
+            async with ServiceRunner() as runner:
+                return await asyncio.gather(
+                    *(runner.read(slow_read, "k") for _ in range(5))
+                )
+
+        self.assertEqual(asyncio.run(scenario()), ["k"] * 5)
+        self.assertEqual(calls, ["k"])
+
+
+class TestGroupCommit(unittest.TestCase):
+    """Pruebas del group commit."""
+
+    def setUp(self):
+        """Crea un hotel con pocas habitaciones."""
+        cleanup_files()
+        Hotel.create_hotel("HG1", "Flash Sale", "City", 10)
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def test_threads_share_batches(self):
+        """Verifica que muchas reservaciones usan pocos lotes."""
+        results = []
+
+        def book(committer, worker):
+            for i in range(5):
+                results.append(committer.call(
+                    Reservation.create_reservation, f"RG{worker}-{i}",
+                    "C1", "HG1", "2025-01-01", "2025-01-02",
+                ))
+
+        with GroupCommitter(max_delay=0.05) as committer:
+            threads = [
+                threading.Thread(target=book, args=(committer, w))
+                for w in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            batches = committer.batches
+        self.assertEqual(len(results), 20)
+        self.assertEqual(sum(1 for r in results if r is not None), 10)
+        self.assertLess(batches, 20)
+        repository_module.reset_repositories()
+        self.assertEqual(len(reservation_module.load_reservations()), 10)
+
+    def test_batch_size_trigger(self):
+        """Verifica que el tamaño máximo del lote dispara el flush."""
+        with GroupCommitter(max_delay=60, max_batch=3) as committer:
+            futures = [
+                committer.submit(Customer.create_customer, f"CG{i}", "G",
+                                 "g@x", "1")
+                for i in range(3)
+            ]
+            self.assertTrue(all(f.result(timeout=5) for f in futures))
+            self.assertEqual(committer.batches, 1)
+
+    def test_errors_reach_caller(self):
+        """Verifica que el error de una operación llega a quien la pidió."""
+        def broken():
+            raise RuntimeError("falla")
+
+        with GroupCommitter() as committer:
+            with self.assertRaises(RuntimeError):
+                committer.call(broken)
+            self.assertIsNotNone(committer.call(
+                Customer.create_customer, "CG9", "G", "g@x", "1"
+            ))
+
+    def test_failed_batch_is_not_written_again(self):
+        """Verifica que un lote que no se escribió no se repite."""
+        os.mkdir("customers.json.tmp")
+        self.addCleanup(shutil.rmtree, "customers.json.tmp", True)
+        with GroupCommitter() as committer:
+            with self.assertRaises(reporting.StorageError):
+                committer.call(Customer.create_customer, "CG1", "G", "g@x",
+                               "1")
+            os.rmdir("customers.json.tmp")
+            self.assertIsNotNone(committer.call(
+                Customer.create_customer, "CG2", "G", "g@x", "1"
+            ))
+        repository_module.reset_repositories()
+        self.assertEqual(list(customer_module.load_customers()), ["CG2"])
+
+    def test_writer_survives_storage_errors(self):
+        """Verifica que una falla al escribir no detiene el hilo."""
+        os.mkdir("customers.json.tmp")
+        self.addCleanup(shutil.rmtree, "customers.json.tmp", True)
+        with GroupCommitter() as committer:
+            future = committer.submit(Customer.create_customer, "CG3", "G",
+                                      "g@x", "1")
+            with self.assertRaises(reporting.StorageError):
+                future.result(timeout=5)
+            os.rmdir("customers.json.tmp")
+            future = committer.submit(Customer.create_customer, "CG4", "G",
+                                      "g@x", "1")
+            self.assertIsNotNone(future.result(timeout=5))
+
+
+class TestBatch(unittest.TestCase):
+    """Pruebas de los lotes frente a las escrituras de otros procesos."""
+
+    def setUp(self):
+        """Dos hoteles y un lote abierto."""
+        cleanup_files()
+        Hotel.create_hotel("HB1", "Batch", "City", 10)
+        Hotel.create_hotel("HB2", "Other", "City", 10)
+        transaction_module.begin_batch()
+
+    def tearDown(self):
+        """Cierra el lote y limpia los archivos."""
+        transaction_module.discard_batch()
+        transaction_module.end_batch()
+        cleanup_files()
+
+    @staticmethod
+    def _on_disk():
+        """Reservaciones de cada hotel según el archivo."""
+        with open("hotels.json", "r", encoding="utf-8") as f:
+            return {
+                hotel_id: sorted(data["reservations"])
+                for hotel_id, data in json.load(f).items()
+            }
+
+    def test_other_process_waits_for_flush(self):
+        """Verifica que otro proceso no pisa un hotel tocado por el lote."""
+        self.assertTrue(Hotel.reserve_room("HB1", "RB1", "C1"))
+        child = _book_in_subprocess("RB2", "HB1")
+        self.addCleanup(child.wait)
+        time.sleep(0.5)
+        self.assertEqual(self._on_disk()["HB1"], [])
+        transaction_module.flush_batch()
+        self.assertEqual(child.wait(timeout=30), 0)
+        self.assertEqual(self._on_disk()["HB1"], ["RB1", "RB2"])
+
+    def test_reload_keeps_pending_changes(self):
+        """Verifica que recargar el archivo no pierde lo del lote."""
+        self.assertTrue(Hotel.reserve_room("HB1", "RB1", "C1"))
+        child = _book_in_subprocess("RB2", "HB2")
+        self.assertEqual(child.wait(timeout=30), 0)
+        self.assertTrue(Hotel.reserve_room("HB2", "RB3", "C1"))
+        transaction_module.flush_batch()
+        self.assertEqual(self._on_disk(),
+                         {"HB1": ["RB1"], "HB2": ["RB2", "RB3"]})
+
+    def test_busy_lock_flushes_first(self):
+        """Verifica que el lote no espera un candado teniendo otros."""
+        self.assertTrue(Hotel.reserve_room("HB1", "RB1", "C1"))
+        holder = locks.FileLock("hotel:HB2")
+        holder.acquire()
+        timer = threading.Timer(0.2, holder.release)
+        timer.start()
+        self.assertTrue(Hotel.reserve_room("HB2", "RB2", "C1"))
+        timer.join()
+        self.assertEqual(self._on_disk(), {"HB1": ["RB1"], "HB2": []})
+        transaction_module.flush_batch()
+        self.assertEqual(self._on_disk()["HB2"], ["RB2"])
+
+    def test_rejects_storage_without_deferral(self):
+        """Verifica que sqlite no acepta lotes."""
+        transaction_module.end_batch()
+        repository_module.configure("sqlite")
+        self.addCleanup(repository_module.configure)
+        with self.assertRaises(ValueError):
+            transaction_module.begin_batch()
+
+
+def _book_in_subprocess(reservation_id, hotel_id):
+    """Arranca un proceso nuevo (sin fork) que reserva en el hotel."""
+    src = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', 'src'
+    )
+    code = (
+        f"import sys; sys.path.insert(0, {src!r}); "
+        "from hotel import Hotel; "
+        f"sys.exit(not Hotel.reserve_room({hotel_id!r}, "
+        f"{reservation_id!r}, 'C1'))"
+    )
+    return subprocess.Popen([sys.executable, "-c", code])
+
+
+def _book_in_child(reservation_id):
+    """Crea una reservación desde otro proceso (para las pruebas)."""
+    repository_module.reset_repositories()
+    result = Reservation.create_reservation(
+        reservation_id, "C1", "HT1", "2025-01-01", "2025-01-02"
+    )
+    return result is not None
+
+
+def _bulk_hotels_in_child(worker):
+    """Crea los mismos hoteles en lote desde otro proceso."""
+    repository_module.reset_repositories()
+    results = Hotel.create_hotels(
+        {"hotel_id": f"HK{i}", "name": f"W{worker}", "location": "L",
+         "total_rooms": 1}
+        for i in range(20)
+    )
+    return sum(1 for hotel in results if hotel is not None)
+
+
+def _mixed_writer(worker):
+    """Reserva o modifica el mismo hotel y cliente desde otro proceso."""
+    repository_module.reset_repositories()
+    field = ("name", "email", "phone")[worker % 3]
+    for i in range(25):
+        if worker % 2:
+            Hotel.reserve_room("HL1", f"RL{worker}_{i}", "C1")
+        else:
+            Hotel.modify_hotel("HL1", name=f"N{worker}_{i}")
+        Customer.modify_customer("CL1", **{field: f"v{worker}"})
+
+
+def _write_journal(resources, ops, undo=False, name="crashed.journal"):
+    """Deja un journal como el de una transacción que no terminó."""
+    os.makedirs(transaction_module.JOURNAL_DIR, exist_ok=True)
+    path = os.path.join(transaction_module.JOURNAL_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"locks": resources, "undo": undo}) + "\n")
+        json.dump(ops, f)
+
+
+class TestTransaction(unittest.TestCase):
+    """Pruebas de las transacciones entre archivos."""
+
+    def setUp(self):
+        """Limpia el estado antes de cada prueba."""
+        cleanup_files()
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def test_rollback_on_error(self):
+        """Verifica que un error dentro del bloque no aplica cambios."""
+        repo = repository_module.get_repository("customers.json", "clientes")
+        with self.assertRaises(RuntimeError):
+            with transaction_module.Transaction("x") as tx:
+                tx.put(repo, "CX", {"customer_id": "CX"})
+                raise RuntimeError("falla")
+        self.assertFalse(repo.contains("CX"))
+
+    def test_recover_pending_journal(self):
+        """Verifica que un journal sin aplicar se termina de aplicar."""
+        Hotel.create_hotel("HJ1", "Journal", "City", 2)
+        hotels = repository_module.get_repository("hotels.json", "hoteles")
+        record = dict(hotels.get("HJ1"), reservations={"RJ1": "C1"})
+        _write_journal(["hotel:HJ1"], [
+            {"path": hotels.path, "label": "hoteles", "op": "put",
+             "key": "HJ1", "value": record, "old": hotels.get("HJ1")},
+            {"path": os.path.abspath("reservations.json"),
+             "label": "reservaciones", "op": "put", "key": "RJ1",
+             "value": Reservation("RJ1", "C1", "HJ1", "a", "b").to_dict(),
+             "old": None},
+        ])
+        self.assertTrue(transaction_module.recover())
+        self.assertIsNotNone(Reservation.display_reservation("RJ1"))
+        self.assertEqual(Hotel.display_hotel("HJ1").available_rooms(), 1)
+        self.assertEqual(os.listdir(transaction_module.JOURNAL_DIR), [])
+
+    def test_failed_write_is_rolled_back(self):
+        """Verifica que una escritura fallida no aparece después."""
+        Hotel.create_hotel("HJ2", "Disk", "City", 2)
+        # Un directorio en lugar del temporal hace fallar el os.replace.
+        os.mkdir("reservations.json.tmp")
+        self.addCleanup(shutil.rmtree, "reservations.json.tmp", True)
+        self.assertIsNone(Reservation.create_reservation(
+            "RJ2", "C1", "HJ2", "2025-01-01", "2025-01-02"
+        ))
+        self.assertIsInstance(reporting.last_error(), reporting.StorageError)
+        self.assertIsNone(Reservation.display_reservation("RJ2"))
+        self.assertEqual(Hotel.display_hotel("HJ2").available_rooms(), 2)
+        # Lo que no se pudo deshacer se termina antes de tocar el hotel.
+        self.assertFalse(Hotel.modify_hotel("HJ2", name="Other"))
+        self.assertIsInstance(reporting.last_error(), reporting.StorageError)
+        os.rmdir("reservations.json.tmp")
+        self.assertTrue(transaction_module.recover())
+        self.assertIsNone(Reservation.display_reservation("RJ2"))
+        self.assertIsNone(Hotel.display_hotel("HJ2").room_of("RJ2"))
+        self.assertTrue(Hotel.modify_hotel("HJ2", name="Other"))
+
+    def test_hotels_commit_in_parallel(self):
+        """Verifica que un commit a medias solo detiene a su hotel."""
+        Hotel.create_hotel("HP1", "Busy", "City", 2)
+        Hotel.create_hotel("HP2", "Free", "City", 2)
+        hotels = repository_module.get_repository("hotels.json", "hoteles")
+        lock = "journal:pending.journal"
+        _write_journal(["hotel:HP1", lock], [
+            {"path": hotels.path, "label": "hoteles", "op": "put",
+             "key": "HP1", "value": dict(hotels.get("HP1"), name="Done"),
+             "old": hotels.get("HP1")},
+        ], name="pending.journal")
+        # El dueño del journal sigue confirmando en otro proceso.
+        with locks.FileLock("hotel:HP1"), locks.FileLock(lock):
+            self.assertIsNotNone(Reservation.create_reservation(
+                "RP2", "C1", "HP2", "2025-01-01", "2025-01-02"
+            ))
+            self.assertEqual(Hotel.display_hotel("HP1").name, "Busy")
+        self.assertIsNotNone(Reservation.create_reservation(
+            "RP1", "C1", "HP1", "2025-01-01", "2025-01-02"
+        ))
+        hotel = Hotel.display_hotel("HP1")
+        self.assertEqual(hotel.name, "Done")
+        self.assertEqual(hotel.available_rooms(), 1)
+
+    def test_concurrent_bookers_do_not_overbook(self):
+        """Verifica que varios procesos no sobrevenden un hotel."""
+        Hotel.create_hotel("HT1", "One Room", "City", 1)
+        ctx = multiprocessing.get_context("fork")
+        with ctx.Pool(4) as pool:
+            results = pool.map(_book_in_child, [f"RT{i}" for i in range(8)])
+        self.assertEqual(results.count(True), 1)
+        repository_module.reset_repositories()
+        self.assertEqual(len(reservation_module.load_reservations()), 1)
+        self.assertEqual(len(hotel_module.load_hotels()["HT1"][
+            "reservations"]), 1)
+
+
+class TestIdempotency(unittest.TestCase):
+    """Pruebas de los reintentos con clave de idempotencia."""
+
+    def setUp(self):
+        """Un hotel con dos habitaciones y sin métricas."""
+        cleanup_files()
+        metrics.reset()
+        Hotel.create_hotel("HI1", "Retry", "City", 2)
+
+    def tearDown(self):
+        """Limpia los archivos y regresa los límites por omisión."""
+        cleanup_files()
+        idempotency.set_limits(ttl=24 * 60 * 60, max_entries=10000)
+
+    @staticmethod
+    def _written():
+        """Bytes escritos a disco hasta ahora."""
+        return sum(
+            value for key, value in metrics.snapshot()["counters"].items()
+            if key.startswith("store_bytes_written_total")
+        )
+
+    def _create(self, reservation_id="RI1", key="k1", **changes):
+        """Crea una reservación en HI1 con la clave dada."""
+        args = {"customer_id": "C1", "hotel_id": "HI1",
+                "check_in": "2025-01-01", "check_out": "2025-01-03"}
+        args.update(changes)
+        return Reservation.create_reservation(reservation_id,
+                                              idempotency_key=key, **args)
+
+    def test_retry_returns_original_without_writing(self):
+        """Verifica que el reintento no ocupa otra habitación ni escribe."""
+        first = self._create()
+        written = self._written()
+        retry = self._create()
+        self.assertEqual(retry.to_dict(), first.to_dict())
+        self.assertEqual(self._written(), written)
+        self.assertIsNone(reporting.last_error())
+        self.assertEqual(len(Hotel.display_hotel("HI1").reservations), 1)
+        self.assertEqual(
+            metrics.snapshot()["counters"][
+                'idempotent_replays_total{operation="create"}'], 1
+        )
+        # Sin clave sigue siendo un duplicado.
+        self.assertIsNone(Reservation.create_reservation(
+            "RI1", "C1", "HI1", "2025-01-01", "2025-01-03"))
+        self.assertIsInstance(reporting.last_error(),
+                              reporting.AlreadyExistsError)
+
+    def test_same_key_other_request_conflicts(self):
+        """Verifica que la clave no se puede usar con otra petición."""
+        self._create()
+        self.assertIsNone(self._create("RI2"))
+        self.assertIsInstance(reporting.last_error(),
+                              reporting.IdempotencyConflictError)
+        self.assertIsNone(Reservation.display_reservation("RI2"))
+
+    def test_failure_is_not_recorded(self):
+        """Verifica que una falla se puede reintentar con la misma clave."""
+        self.assertIsNone(self._create(hotel_id="NOPE"))
+        self.assertFalse(os.path.exists(idempotency.IDEMPOTENCY_FILE))
+        self.assertIsNotNone(self._create())
+
+    def test_cancel_retry(self):
+        """Verifica que reintentar una cancelación regresa True."""
+        self._create()
+        self.assertTrue(Reservation.cancel_reservation("RI1",
+                                                       idempotency_key="c1"))
+        written = self._written()
+        self.assertTrue(Reservation.cancel_reservation("RI1",
+                                                       idempotency_key="c1"))
+        self.assertEqual(self._written(), written)
+        self.assertFalse(Reservation.cancel_reservation("RI1"))
+        self.assertFalse(Reservation.cancel_reservation("RI1",
+                                                        idempotency_key="k1"))
+        self.assertIsInstance(reporting.last_error(),
+                              reporting.IdempotencyConflictError)
+
+    def test_keys_expire_and_are_bounded(self):
+        """Verifica la caducidad y el máximo de claves guardadas."""
+        idempotency.set_limits(max_entries=3)
+        for i in range(5):
+            self._create(f"RB{i}", f"b{i}", check_in=f"2025-02-0{i + 1}",
+                         check_out=f"2025-02-0{i + 2}")
+        stored = idempotency.load_keys()
+        self.assertLessEqual(len(stored), 3)
+        self.assertIn("b4", stored)
+        self.assertNotIn("b0", stored)
+        idempotency.set_limits(ttl=0)
+        # La clave caducó: se vuelve a ejecutar y la reservación ya existe.
+        self.assertIsNone(self._create("RB4", "b4", check_in="2025-02-05",
+                                       check_out="2025-02-06"))
+        self.assertIsInstance(reporting.last_error(),
+                              reporting.AlreadyExistsError)
+
+
+class TestLocking(unittest.TestCase):
+    """Pruebas de los candados de lectura/escritura entre procesos."""
+
+    def setUp(self):
+        """Empieza sin datos ni métricas."""
+        cleanup_files()
+        repository_module.reset_repositories()
+        metrics.reset()
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def test_no_lost_updates_between_processes(self):
+        """Verifica que reservas y cambios simultáneos no se pisan."""
+        Hotel.create_hotel("HL1", "Locked", "City", 100)
+        Customer.create_customer("CL1", "Ana", "a@x.com", "555")
+        ctx = multiprocessing.get_context("fork")
+        with ctx.Pool(4) as pool:
+            pool.map(_mixed_writer, range(4))
+        repository_module.reset_repositories()
+        hotel = Hotel.display_hotel("HL1")
+        self.assertEqual(len(hotel.reservations), 50)
+        self.assertTrue(hotel.name.startswith("N"))
+        customer = Customer.display_customer("CL1")
+        self.assertEqual(customer.email, "v1")
+        self.assertEqual(customer.phone, "v2")
+
+    def test_contention_is_reported(self):
+        """Verifica que una espera por el candado queda en las métricas."""
+        acquired = threading.Event()
+        holder = locks.FileLock("hotel:HX")
+        holder.acquire()
+
+        def waiter():
+            with locks.FileLock("hotel:HX"):
+                acquired.set()
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        holder.release()
+        thread.join()
+        data = metrics.snapshot()
+        self.assertEqual(
+            data["counters"][
+                'lock_contended_total{kind="hotel",mode="exclusive"}'
+            ], 1
+        )
+        self.assertEqual(
+            data["histograms"]['lock_wait_seconds{kind="hotel"}']["count"], 1
+        )
+
+    def test_shared_readers_do_not_wait(self):
+        """Verifica que varios lectores comparten el candado."""
+        with locks.FileLock("file:x", shared=True):
+            with locks.FileLock("file:x", shared=True):
+                pass
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(
+            counters['lock_acquisitions_total{kind="file",mode="shared"}'], 2
+        )
+        self.assertNotIn(
+            'lock_contended_total{kind="file",mode="shared"}', counters
+        )
+
+    def test_bulk_creates_do_not_duplicate(self):
+        """Verifica que cargas simultáneas crean cada hotel una vez."""
+        ctx = multiprocessing.get_context("fork")
+        with ctx.Pool(4) as pool:
+            created = pool.map(_bulk_hotels_in_child, range(4))
+        self.assertEqual(sum(created), 20)
+        repository_module.reset_repositories()
+        self.assertEqual(len(hotel_module.load_hotels()), 20)
+
+    def test_lock_files_are_removed(self):
+        """Verifica que los archivos de candado no se acumulan."""
+        with locks.FileLock("hotel:HR", shared=True):
+            with locks.FileLock("hotel:HR", shared=True) as other:
+                self.assertTrue(os.path.exists(other.path))
+            self.assertTrue(os.path.exists(other.path))
+        self.assertFalse(os.path.exists(other.path))
+        Hotel.create_hotel("HR1", "Locks", "City", 1)
+        Reservation.create_reservation("RR1", "C1", "HR1", None, None)
+        Customer.create_customers([Customer("CR1", "A", "a", "1").to_dict()])
+        for name in ("hotel:HR1", "customer:CR1"):
+            self.assertFalse(os.path.exists(locks.lock_path(name)))
+
+    def test_guard_is_reentrant(self):
+        """Verifica que el candado de archivo admite llamadas anidadas."""
+        guard = locks.FileGuard("file:reentrant")
+        try:
+            with guard.hold(False):
+                with guard.hold(True):
+                    with guard.hold(False):
+                        pass
+        finally:
+            guard.close()
+        self.assertEqual(
+            metrics.snapshot()["counters"][
+                'lock_acquisitions_total{kind="file",mode="exclusive"}'
+            ], 1
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,509 @@
+"""Pruebas de cargas masivas, columnas, análisis, índices y benchmarks."""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bench')
+)
+
+from support import cleanup_files  # noqa: E402
+import hotel as hotel_module  # noqa: E402
+import reservation as reservation_module  # noqa: E402
+import repository as repository_module  # noqa: E402
+import analytics  # noqa: E402
+import bulk  # noqa: E402
+import columnar  # noqa: E402
+import reporting  # noqa: E402
+from columnar import (  # noqa: E402
+    CustomerTable, HotelTable, ReservationTable,
+)
+import bench  # noqa: E402
+from customer import Customer  # noqa: E402
+from hotel import Hotel  # noqa: E402
+from reservation import Reservation  # noqa: E402
+
+
+class TestBulk(unittest.TestCase):
+    """Pruebas de las cargas masivas."""
+
+    IMPORT_FILES = ["import_hotels.csv", "import_customers.jsonl",
+                    "export_hotels.csv", "export_reservations.csv",
+                    "export_customers.jsonl"]
+
+    def setUp(self):
+        """Limpia el estado antes de cada prueba."""
+        cleanup_files()
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+        for name in self.IMPORT_FILES:
+            if os.path.exists(name):
+                os.remove(name)
+
+    def test_create_hotels_single_write(self):
+        """Verifica que el lote se guarda con una sola escritura."""
+        repo = repository_module.get_repository("hotels.json", "hoteles")
+        calls = []
+        original = repo.store.save
+        repo.store.save = lambda data: calls.append(1) or original(data)
+        try:
+            results = Hotel.create_hotels(
+                {"hotel_id": f"HB{i}", "name": "B", "location": "L",
+                 "total_rooms": 2}
+                for i in range(50)
+            )
+        finally:
+            repo.store.save = original
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(results))
+
+    def test_create_hotels_duplicates_and_invalid(self):
+        """Verifica los resultados por registro con errores mezclados."""
+        Hotel.create_hotel("HB0", "Existing", "L", 2)
+        results = Hotel.create_hotels([
+            {"hotel_id": "HB0", "name": "X", "location": "L",
+             "total_rooms": 2},
+            {"hotel_id": "HB1", "name": "X", "location": "L",
+             "total_rooms": 2},
+            {"hotel_id": "HB1", "name": "X", "location": "L",
+             "total_rooms": 2},
+            {"hotel_id": "HB2", "name": "X", "location": "L",
+             "total_rooms": 0},
+            {"hotel_id": "HB3", "name": "X"},
+        ])
+        self.assertEqual(
+            [r is not None for r in results],
+            [False, True, False, False, False],
+        )
+
+    def test_create_reservations(self):
+        """Verifica reservaciones masivas con hotel lleno y duplicados."""
+        Hotel.create_hotel("HB1", "One", "L", 1)
+        Hotel.create_hotel("HB2", "Two", "L", 2)
+        base = {"customer_id": "C1", "check_in": "2025-01-01",
+                "check_out": "2025-01-02"}
+        results = Reservation.create_reservations([
+            dict(base, reservation_id="RB1", hotel_id="HB1"),
+            dict(base, reservation_id="RB2", hotel_id="HB1"),
+            dict(base, reservation_id="RB3", hotel_id="HB2"),
+            dict(base, reservation_id="RB3", hotel_id="HB2"),
+            dict(base, reservation_id="RB4", hotel_id="NOPE"),
+        ])
+        self.assertEqual(
+            [r is not None for r in results],
+            [True, False, True, False, False],
+        )
+        hotels = hotel_module.load_hotels()
+        self.assertEqual(list(hotels["HB1"]["reservations"]), ["RB1"])
+        self.assertEqual(list(hotels["HB2"]["reservations"]), ["RB3"])
+        self.assertEqual(
+            sorted(reservation_module.load_reservations()), ["RB1", "RB3"]
+        )
+
+    def test_import_files(self):
+        """Verifica la carga desde CSV y JSON-lines."""
+        with open("import_hotels.csv", "w", encoding="utf-8") as f:
+            f.write("hotel_id,name,location,total_rooms\n")
+            f.write("HC1,Csv Hotel,Puebla,4\n")
+        with open("import_customers.jsonl", "w", encoding="utf-8") as f:
+            f.write(json.dumps(Customer("CJ1", "J", "j@x", "1").to_dict()))
+            f.write("\nnot json\n")
+        self.assertEqual(len(bulk.import_hotels("import_hotels.csv")), 1)
+        self.assertEqual(Hotel.display_hotel("HC1").total_rooms, 4)
+        self.assertEqual(
+            len(bulk.import_customers("import_customers.jsonl")), 1
+        )
+        self.assertIsNotNone(Customer.display_customer("CJ1"))
+
+    def test_import_skips_invalid_rows(self):
+        """Verifica líneas que no son objetos y celdas opcionales vacías."""
+        with open("import_hotels.csv", "w", encoding="utf-8") as f:
+            f.write("hotel_id,name,location,total_rooms,room_types\n")
+            f.write("HC1,Plain,Puebla,4,\n")
+            f.write('HC2,Typed,Puebla,3,"[[""suite"", 4, 3]]"\n')
+        with open("import_customers.jsonl", "w", encoding="utf-8") as f:
+            f.write('[1, 2]\n"text"\n')
+            f.write(json.dumps(Customer("CJ1", "J", "j@x", "1").to_dict()))
+        self.assertTrue(all(bulk.import_hotels("import_hotels.csv")))
+        self.assertEqual(Hotel.display_hotel("HC2").room_types,
+                         [["suite", 4, 3]])
+        self.assertEqual(
+            len(bulk.import_customers("import_customers.jsonl")), 1
+        )
+        self.assertIsInstance(reporting.last_error(),
+                              reporting.InvalidDataError)
+
+    def test_export_round_trip(self):
+        """Verifica que lo exportado se puede volver a cargar."""
+        Hotel.create_hotel("HE1", "Typed", "L", 3, [["suite", 4, 3]])
+        Customer.create_customer("CE1", "E", "e@x", "1")
+        Reservation.create_reservation("RE1", "CE1", "HE1", "2025-01-01",
+                                       "2025-01-02")
+        Reservation.create_reservation("RE2", "CE1", "HE1", None, None)
+        self.assertEqual(bulk.export_hotels("export_hotels.csv"), 1)
+        self.assertEqual(bulk.export_customers("export_customers.jsonl"), 1)
+        self.assertEqual(
+            bulk.export_reservations("export_reservations.csv"), 2
+        )
+        cleanup_files()
+        repository_module.reset_repositories()
+        self.assertTrue(all(bulk.import_hotels("export_hotels.csv")))
+        self.assertTrue(all(bulk.import_customers("export_customers.jsonl")))
+        self.assertTrue(all(
+            bulk.import_reservations("export_reservations.csv")
+        ))
+        self.assertEqual(Hotel.display_hotel("HE1").room_types,
+                         [["suite", 4, 3]])
+        self.assertIsNone(Reservation.display_reservation("RE2").check_in)
+        self.assertEqual(Customer.display_customer("CE1").email, "e@x")
+
+
+class TestColumnar(unittest.TestCase):
+    """Pruebas de los registros compactos y las tablas en columnas."""
+
+    def setUp(self):
+        """Limpia el estado antes de cada prueba."""
+        cleanup_files()
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def test_records_have_no_dict(self):
+        """Verifica que los registros usan __slots__."""
+        for record in (Hotel("H", "N", "L", 1), Customer("C", "N", "E", "P"),
+                       Reservation("R", "C", "H", "2025-01-01", "2025-01-02")):
+            self.assertFalse(hasattr(record, "__dict__"))
+
+    def test_reservation_round_trip(self):
+        """Verifica que la tabla regresa los mismos diccionarios."""
+        records = [
+            Reservation(f"RC{i}", "C1", f"H{i % 3}", "2025-01-01",
+                        "2025-01-03").to_dict()
+            for i in range(10)
+        ]
+        table = ReservationTable.from_records(records)
+        self.assertEqual(len(table), 10)
+        self.assertEqual([table.to_dict(i) for i in range(10)], records)
+        self.assertEqual(table.get("RC4").hotel_id, "H1")
+        self.assertEqual(table.columns["check_in"][0], 739252)
+
+    def test_shared_pool_and_file_load(self):
+        """Verifica que las tablas comparten IDs y se leen del archivo."""
+        Hotel.create_hotel("HC1", "Col", "City", 2)
+        Reservation.create_reservation(
+            "RC1", "C1", "HC1", "2025-01-01", "2025-01-02"
+        )
+        hotels = HotelTable.from_file("hotels.json")
+        reservations = ReservationTable.from_file(
+            "reservations.json", hotels.pool
+        )
+        self.assertEqual(
+            reservations.columns["hotel_id"][0], hotels.columns["hotel_id"][0]
+        )
+        self.assertEqual(hotels.get("HC1").total_rooms, 2)
+
+    def test_replace_existing_row(self):
+        """Verifica que agregar una llave existente la reemplaza."""
+        table = ReservationTable()
+        table.append(Reservation("R", "C", "H", "2025-01-01",
+                                 "2025-01-02").to_dict())
+        table.append(Reservation("R", "C", "H2", "2025-01-01",
+                                 "2025-01-02").to_dict())
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table.get("R").hotel_id, "H2")
+
+    def test_undated_reservation(self):
+        """Verifica que una reservación sin fechas usa MISSING_DATE."""
+        table = ReservationTable.from_records(
+            [Reservation("RU", "C", "H", None, None).to_dict()]
+        )
+        self.assertEqual(table.columns["check_in"][0], columnar.MISSING_DATE)
+        self.assertIsNone(table.get("RU").check_out)
+
+    def test_missing_customer_fields(self):
+        """Verifica que un teléfono o correo en None se queda en None."""
+        records = [Customer(f"CN{i}", "N", None, None).to_dict()
+                   for i in range(2)]
+        table = CustomerTable.from_records(records)
+        table.append(Customer("CN2", "N", "e@x", None).to_dict())
+        self.assertEqual(table.columns["phone"][0], columnar.MISSING_STRING)
+        self.assertEqual(table.to_dict(1), records[1])
+        self.assertEqual(table.get("CN2").email, "e@x")
+        self.assertIsNone(table.get("CN2").phone)
+        self.assertNotIn("None", table.pool.strings)
+
+
+class TestAnalytics(unittest.TestCase):
+    """Pruebas de los agregados de ocupación."""
+
+    def setUp(self):
+        """Dos hoteles con reservaciones que se enciman."""
+        cleanup_files()
+        Hotel.create_hotel("HA1", "Uno", "A", 2)
+        Hotel.create_hotel("HA2", "Dos", "B", 4)
+        for reservation_id, hotel_id, check_in, check_out in [
+            ("RA1", "HA1", "2025-01-01", "2025-01-03"),
+            ("RA2", "HA1", "2025-01-02", "2025-01-04"),
+            ("RA3", "HA2", "2025-01-02", "2025-01-03"),
+        ]:
+            Reservation.create_reservation(reservation_id, "C1", hotel_id,
+                                           check_in, check_out)
+        self.report = analytics.ReservationAnalytics.load()
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    @staticmethod
+    def _reservation(reservation_id, hotel_id, check_in, check_out):
+        """Diccionario de una reservación."""
+        return Reservation(reservation_id, "C1", hotel_id, check_in,
+                           check_out).to_dict()
+
+    def test_occupancy(self):
+        """Verifica la ocupación por noche y su tasa."""
+        self.assertEqual(self.report.occupancy("HA1"), {
+            "2025-01-01": 1, "2025-01-02": 2, "2025-01-03": 1,
+        })
+        self.assertEqual(self.report.occupancy_rate("HA2"),
+                         {"2025-01-02": 0.25})
+        self.assertEqual(self.report.occupancy("NOPE"), {})
+
+    def test_arrivals_departures_and_length_of_stay(self):
+        """Verifica llegadas, salidas y duración promedio."""
+        self.assertEqual(self.report.arrivals(),
+                         {"2025-01-01": 1, "2025-01-02": 2})
+        self.assertEqual(self.report.departures(),
+                         {"2025-01-03": 2, "2025-01-04": 1})
+        self.assertAlmostEqual(self.report.average_length_of_stay(), 5 / 3)
+        self.assertEqual(self.report.average_length_of_stay("HA2"), 1)
+
+    def test_summary(self):
+        """Verifica el resumen por hotel con y sin periodo."""
+        summary = {row["hotel_id"]: row for row in self.report.summary()}
+        self.assertEqual(summary["HA1"]["room_nights"], 4)
+        # Tres noches (del 1 al 3 de enero) con dos habitaciones.
+        self.assertAlmostEqual(summary["HA1"]["occupancy_rate"], 4 / 6)
+        window = self.report.summary("2025-01-02", "2025-01-03")
+        self.assertEqual([row["room_nights"] for row in window], [2, 1])
+        self.assertEqual(window[0]["occupancy_rate"], 1)
+
+    def test_incremental_update_and_remove(self):
+        """Verifica que los cambios se aplican sin recalcular todo."""
+        self.report.update([
+            self._reservation("RA4", "HA2", "2024-12-30", "2024-12-31"),
+            self._reservation("RA1", "HA1", "2025-01-01", "2025-01-02"),
+        ])
+        self.assertEqual(self.report.remove(["RA2", "NOPE"]), 1)
+        self.assertEqual(self.report.occupancy("HA1"), {"2025-01-01": 1})
+        self.assertEqual(self.report.arrivals(), {
+            "2024-12-30": 1, "2025-01-01": 1, "2025-01-02": 1,
+        })
+        fresh = analytics.ReservationAnalytics.from_records(
+            hotel_module.load_hotels().values(),
+            [self._reservation("RA1", "HA1", "2025-01-01", "2025-01-02"),
+             self._reservation("RA3", "HA2", "2025-01-02", "2025-01-03"),
+             self._reservation("RA4", "HA2", "2024-12-30", "2024-12-31")],
+        )
+        self.assertEqual(self.report.summary(), fresh.summary())
+
+    def test_unknown_hotel_counted_when_added(self):
+        """Verifica que las reservaciones de un hotel nuevo se cuentan."""
+        self.report.update(
+            [self._reservation("RA5", "HA3", "2025-01-05", "2025-01-06")]
+        )
+        self.assertNotIn("2025-01-05", self.report.arrivals())
+        self.report.add_hotels([Hotel("HA3", "Tres", "C", 1).to_dict()])
+        self.assertEqual(self.report.occupancy("HA3"), {"2025-01-05": 1})
+
+    def test_undated_reservation_not_counted(self):
+        """Verifica que una reservación sin fechas no ocupa noches."""
+        Reservation.create_reservation("RA6", "C1", "HA2", None, None)
+        report = analytics.ReservationAnalytics.load()
+        self.assertEqual(report.occupancy("HA2"), {"2025-01-02": 1})
+        self.assertEqual(report.summary(), self.report.summary())
+        self.assertEqual(report.remove(["RA6"]), 1)
+
+    def test_summary_after_add_hotels(self):
+        """Verifica que agregar hoteles no deja la ocupación desfasada."""
+        self.assertEqual(len(self.report.summary()), 2)
+        self.report.add_hotels([Hotel("HA3", "Tres", "C", 1).to_dict()])
+        self.assertEqual(len(self.report.summary()), 3)
+        self.assertEqual(self.report.occupancy("HA3"), {})
+
+    def test_skips_invalid_dates(self):
+        """Verifica que las fechas inválidas se saltan sin romper la carga."""
+        report = analytics.ReservationAnalytics.from_records(
+            hotel_module.load_hotels().values(),
+            [self._reservation("RB1", "HA1", "01/02/2025", "2025-01-03"),
+             self._reservation("RB2", "HA1", "2025-01-03", "2025-01-01"),
+             self._reservation("RB3", "HA1", "2025-01-01", None),
+             self._reservation("RB4", "HA1", "2025-01-01", "2025-01-02")],
+        )
+        self.assertEqual(report.skipped, ["RB1", "RB2", "RB3"])
+        self.assertEqual(report.occupancy("HA1"), {"2025-01-01": 1})
+        self.report.update([self._reservation("RA1", "HA1", "x", "y")])
+        self.assertEqual(self.report.skipped, ["RA1"])
+        self.assertEqual(self.report.occupancy("HA1")["2025-01-01"], 1)
+
+    def test_revenue(self):
+        """Verifica ingresos y RevPAR por hotel con su tarifa."""
+        revenue = self.report.revenue({"HA1": 100.0},
+                                      "2025-01-02", "2025-01-03")
+        self.assertEqual(revenue, [{
+            "hotel_id": "HA1", "room_nights": 2, "revenue": 200.0,
+            "revpar": 100.0,
+        }])
+
+    @unittest.skipIf(analytics.numpy is None, "NumPy no está instalado")
+    def test_numpy_matches_fallback(self):
+        """Verifica que con y sin NumPy se obtiene lo mismo."""
+        Reservation.create_reservation("RA7", "C1", "HA2", None, None)
+        changes = [
+            self._reservation("RA8", "HA3", "2024-12-20", "2024-12-22"),
+            self._reservation("RA2", "HA1", "2025-01-05", "2025-01-09"),
+        ]
+
+        def run():
+            """Reporte completo después de cambios incrementales."""
+            report = analytics.ReservationAnalytics.load()
+            report.update(changes)
+            report.add_hotels([Hotel("HA3", "Tres", "C", 1).to_dict()])
+            report.remove(["RA3"])
+            return (report.summary(), report.occupancy("HA1"),
+                    report.arrivals(), report.departures(),
+                    report.average_length_of_stay())
+
+        vectorized = run()
+        numpy_module, analytics.numpy = analytics.numpy, None
+        try:
+            self.assertEqual(run(), vectorized)
+        finally:
+            analytics.numpy = numpy_module
+
+    def test_without_hotels(self):
+        """Verifica el reporte sin hoteles (con y sin NumPy)."""
+        reservation = self._reservation("RA9", "HA9", "2025-01-01",
+                                        "2025-01-02")
+        numpy_module = analytics.numpy
+        try:
+            for module in (numpy_module, None):
+                analytics.numpy = module
+                report = analytics.ReservationAnalytics.from_records(
+                    [], [reservation]
+                )
+                self.assertEqual(report.summary(), [])
+                self.assertEqual(report.occupancy("HA9"), {})
+        finally:
+            analytics.numpy = numpy_module
+
+    def test_bulk_load_keeps_last_duplicate(self):
+        """Verifica que la carga en bloque respeta llaves repetidas."""
+        table = ReservationTable.from_records([
+            self._reservation("RA1", "HA1", "2025-01-01", "2025-01-02"),
+            self._reservation("RA5", "HA2", None, None),
+            self._reservation("RA1", "HA2", "2025-02-01", "2025-02-03"),
+        ])
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.get("RA1").hotel_id, "HA2")
+        self.assertIsNone(table.get("RA5").check_in)
+
+    def test_tables_must_share_pool(self):
+        """Verifica que se rechazan tablas con pools distintos."""
+        with self.assertRaises(ValueError):
+            analytics.ReservationAnalytics(HotelTable(), ReservationTable())
+
+
+class TestSecondaryIndexes(unittest.TestCase):
+    """Pruebas de las búsquedas por cliente, hotel y fecha."""
+
+    def setUp(self):
+        """Crea dos hoteles y varias reservaciones."""
+        cleanup_files()
+        Hotel.create_hotel("HI1", "Index One", "City", 5)
+        Hotel.create_hotel("HI2", "Index Two", "City", 5)
+        Reservation.create_reservation(
+            "RI1", "CI1", "HI1", "2025-01-01", "2025-01-02"
+        )
+        Reservation.create_reservation(
+            "RI2", "CI1", "HI2", "2025-01-05", "2025-01-06"
+        )
+        Reservation.create_reservation(
+            "RI3", "CI2", "HI1", "2025-01-05", "2025-01-07"
+        )
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    @staticmethod
+    def ids(reservations):
+        """IDs ordenados de una lista de reservaciones."""
+        return sorted(r.reservation_id for r in reservations)
+
+    def test_find_by_customer_hotel_and_date(self):
+        """Verifica las tres búsquedas."""
+        self.assertEqual(
+            self.ids(Reservation.find_by_customer("CI1")), ["RI1", "RI2"]
+        )
+        self.assertEqual(
+            self.ids(Reservation.find_by_hotel("HI1")), ["RI1", "RI3"]
+        )
+        self.assertEqual(
+            self.ids(Reservation.find_by_check_in("2025-01-05")),
+            ["RI2", "RI3"],
+        )
+        self.assertEqual(Reservation.find_by_customer("NOPE"), [])
+
+    def test_indexes_follow_create_and_cancel(self):
+        """Verifica que los índices se mantienen con cada cambio."""
+        Reservation.find_by_customer("CI1")
+        Reservation.cancel_reservation("RI1")
+        Reservation.create_reservation(
+            "RI4", "CI1", "HI2", "2025-02-01", "2025-02-02"
+        )
+        self.assertEqual(
+            self.ids(Reservation.find_by_customer("CI1")), ["RI2", "RI4"]
+        )
+
+    def test_indexes_rebuilt_after_external_change(self):
+        """Verifica que un cambio de otro proceso se refleja."""
+        Reservation.find_by_hotel("HI1")
+        data = reservation_module.load_reservations()
+        del data["RI3"]
+        with open("reservations.json", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        self.assertEqual(self.ids(Reservation.find_by_hotel("HI1")), ["RI1"])
+
+
+class TestBenchmark(unittest.TestCase):
+    """Prueba rápida del harness de benchmarks."""
+
+    def test_run_small_scale(self):
+        """Verifica que una escala pequeña produce todas las métricas."""
+        result = bench.run_scale(50, 3)
+        self.assertIn("populate_s", result)
+        for name in ("create_hotel", "reserve_room", "create_reservation",
+                     "cancel_reservation", "display_reservation"):
+            self.assertEqual(result[name]["count"], 3)
+            self.assertGreater(result[name]["p50_ms"], 0)
+        self.assertFalse(os.path.exists("hotels.json"))
+
+    def test_startup(self):
+        """Verifica la medición del arranque de la línea de comandos."""
+        result = bench.run_startup(50, 1)
+        for name in ("python", "hotel_show", "reservation_show"):
+            self.assertEqual(result[name]["runs"], 1)
+            self.assertGreater(result[name]["p50_ms"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
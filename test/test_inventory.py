@@ -0,0 +1,377 @@
+"""Pruebas de ocupación, habitaciones, lista de espera y búsqueda."""
+
+import copy
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+from support import cleanup_files  # noqa: E402
+import repository as repository_module  # noqa: E402
+from search import HotelSearch, search_hotels  # noqa: E402
+import reporting  # noqa: E402
+import transaction as transaction_module  # noqa: E402
+from occupancy import OccupancyIndex  # noqa: E402
+from rooms import RoomAllocator  # noqa: E402
+import waitlist  # noqa: E402
+from hotel import Hotel  # noqa: E402
+from reservation import Reservation  # noqa: E402
+
+
+class TestOccupancy(unittest.TestCase):
+    """Pruebas de la disponibilidad por fechas."""
+
+    def setUp(self):
+        """Crea un hotel de una habitación."""
+        cleanup_files()
+        Hotel.create_hotel("HO1", "Dated", "City", 1)
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def test_consecutive_stays_share_room(self):
+        """Verifica que estancias seguidas usan la misma habitación."""
+        self.assertTrue(Hotel.reserve_room(
+            "HO1", "RO1", "C1", "2025-01-01", "2025-01-03"
+        ))
+        self.assertTrue(Hotel.reserve_room(
+            "HO1", "RO2", "C2", "2025-01-03", "2025-01-05"
+        ))
+
+    def test_overlapping_stay_rejected(self):
+        """Verifica que no se acepta una estancia que se traslapa."""
+        Hotel.reserve_room("HO1", "RO1", "C1", "2025-01-01", "2025-01-03")
+        self.assertFalse(Hotel.reserve_room(
+            "HO1", "RO2", "C2", "2025-01-02", "2025-01-04"
+        ))
+
+    def test_cancel_frees_nights(self):
+        """Verifica que cancelar libera las noches de la estancia."""
+        Reservation.create_reservation(
+            "RO1", "C1", "HO1", "2025-01-01", "2025-01-03"
+        )
+        h = Hotel.display_hotel("HO1")
+        self.assertEqual(h.available_rooms("2025-01-02", "2025-01-03"), 0)
+        Reservation.cancel_reservation("RO1")
+        h = Hotel.display_hotel("HO1")
+        self.assertEqual(h.available_rooms("2025-01-02", "2025-01-03"), 1)
+
+    def test_invalid_dates_rejected(self):
+        """Verifica que fechas inválidas o al revés se rechazan."""
+        self.assertFalse(Hotel.reserve_room(
+            "HO1", "RO1", "C1", "2025-01-05", "2025-01-01"
+        ))
+        self.assertIsNone(Reservation.create_reservation(
+            "RO2", "C1", "HO1", "not a date", "2025-01-01"
+        ))
+
+    def test_undated_reservation_blocks_all_nights(self):
+        """Verifica que una reservación sin fechas ocupa todas las noches."""
+        Hotel.reserve_room("HO1", "RO1", "C1")
+        self.assertFalse(Hotel.reserve_room(
+            "HO1", "RO2", "C2", "2030-01-01", "2030-01-02"
+        ))
+
+    def test_transaction_copies_hotel_once(self):
+        """Verifica que una transacción copia el hotel una sola vez."""
+        Hotel.modify_hotel("HO1", total_rooms=3)
+        hotels = repository_module.get_repository("hotels.json", "hoteles")
+        stored = hotels.get("HO1")
+        before = copy.deepcopy(stored)
+        with self.assertRaises(RuntimeError):
+            with transaction_module.Transaction("hotel:HO1") as tx:
+                staged = None
+                for number in range(3):
+                    self.assertTrue(Hotel.reserve_room(
+                        "HO1", f"RO{number}", "C1", "2025-01-01",
+                        "2025-01-02", transaction=tx,
+                    ))
+                    staged = staged or tx.get(hotels, "HO1")
+                self.assertIs(tx.get(hotels, "HO1")["stays"],
+                              staged["stays"])
+                self.assertEqual(len(staged["reservations"]), 3)
+                raise RuntimeError("falla")
+        self.assertEqual(stored, before)
+        self.assertEqual(Hotel.display_hotel("HO1").available_rooms(
+            "2025-01-01", "2025-01-02"
+        ), 3)
+
+    def test_index_peak(self):
+        """Verifica el máximo de ocupación de un rango."""
+        index = OccupancyIndex.from_stays([
+            ("2025-01-01", "2025-01-04"), ("2025-01-03", "2025-01-05"),
+        ])
+        self.assertEqual(index.peak("2025-01-01", "2025-01-03"), 1)
+        self.assertEqual(index.peak("2025-01-01", "2025-01-05"), 2)
+        index.remove("2025-01-03", "2025-01-05")
+        self.assertEqual(index.peak(), 1)
+
+
+class TestRooms(unittest.TestCase):
+    """Pruebas de las habitaciones y su asignación."""
+
+    def setUp(self):
+        """Un hotel con dos estándar y una suite."""
+        cleanup_files()
+        Hotel.create_hotel("HR1", "Rooms", "City", 3,
+                           [["standard", 2, 2], ["suite", 4, 1]])
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def _reserve(self, reservation_id, check_in, check_out, **options):
+        """Reserva en HR1 y regresa la habitación asignada (o None)."""
+        if not Hotel.reserve_room("HR1", reservation_id, "C1", check_in,
+                                  check_out, **options):
+            return None
+        return Hotel.display_hotel("HR1").room_of(reservation_id)
+
+    def test_allocator_reuses_rooms_by_night(self):
+        """Verifica que una habitación se reusa en noches distintas."""
+        allocator = RoomAllocator([["standard", 2, 70]])
+        for _ in range(70):
+            allocator.place(allocator.find("2025-01-01", "2025-01-03"),
+                            "2025-01-01", "2025-01-03")
+        self.assertIsNone(allocator.find("2025-01-02", "2025-01-04"))
+        self.assertEqual(allocator.find("2025-01-03", "2025-01-04"), 1)
+        allocator.free(65, "2025-01-01", "2025-01-03")
+        self.assertEqual(allocator.find("2025-01-02", "2025-01-04"), 65)
+
+    def test_types_capacity_and_whole_stay(self):
+        """Verifica tipo, capacidad y que la habitación sea la misma."""
+        self.assertEqual(self._reserve("RR1", "2025-01-01", "2025-01-03",
+                                       guests=3), 3)
+        self.assertEqual(self._reserve("RR2", "2025-01-01", "2025-01-02"), 1)
+        self.assertEqual(self._reserve("RR3", "2025-01-02", "2025-01-03",
+                                       room_type="standard"), 1)
+        # La 1 quedó ocupada las dos noches con estancias distintas.
+        self.assertEqual(self._reserve("RR4", "2025-01-01", "2025-01-03"), 2)
+        self.assertIsNone(self._reserve("RR5", "2025-01-01", "2025-01-02",
+                                        room_type="suite"))
+        self.assertIsInstance(reporting.last_error(),
+                              reporting.NoAvailabilityError)
+        self.assertTrue(Hotel.cancel_room_reservation("HR1", "RR1"))
+        self.assertEqual(self._reserve("RR5", "2025-01-01", "2025-01-02",
+                                       room_type="suite"), 3)
+
+    def test_fragmented_nights_are_rejected(self):
+        """Verifica que no se parte una estancia entre habitaciones."""
+        Hotel.create_hotel("HR2", "Two", "City", 2)
+        Hotel.reserve_room("HR2", "RF1", "C1", "2025-01-01", "2025-01-02")
+        Hotel.reserve_room("HR2", "RF2", "C1", "2025-01-01", "2025-01-02")
+        Hotel.reserve_room("HR2", "RF3", "C1", "2025-01-02", "2025-01-03")
+        Hotel.cancel_room_reservation("HR2", "RF1")
+        hotel = Hotel.display_hotel("HR2")
+        self.assertEqual(hotel.room_of("RF2"), 2)
+        self.assertEqual(hotel.room_of("RF3"), 1)
+        # Cada noche hay una libre, pero no la misma las dos noches.
+        self.assertEqual(hotel.available_rooms("2025-01-01", "2025-01-03"), 1)
+        self.assertFalse(Hotel.reserve_room("HR2", "RF4", "C1", "2025-01-01",
+                                            "2025-01-03"))
+        self.assertTrue(Hotel.reserve_room("HR2", "RF4", "C1", "2025-01-01",
+                                           "2025-01-02"))
+
+    def test_resize_moves_reservations(self):
+        """Verifica que reducir el hotel mueve o rechaza reservaciones."""
+        Hotel.create_hotel("HR3", "Resize", "City", 3)
+        for reservation_id in ("RZ1", "RZ2", "RZ3"):
+            Hotel.reserve_room("HR3", reservation_id, "C1",
+                               "2025-01-01", "2025-01-02")
+        Hotel.cancel_room_reservation("HR3", "RZ1")
+        self.assertTrue(Hotel.modify_hotel("HR3", total_rooms=2))
+        hotel = Hotel.display_hotel("HR3")
+        self.assertEqual(hotel.room_types, [["standard", 2, 2]])
+        self.assertEqual(sorted(hotel.rooms.values()), [1, 2])
+        self.assertFalse(Hotel.modify_hotel("HR3", total_rooms=1))
+        self.assertEqual(Hotel.display_hotel("HR3").total_rooms, 2)
+        self.assertTrue(Hotel.modify_hotel("HR3", total_rooms=4))
+        self.assertEqual(
+            Hotel.display_hotel("HR3").room_types, [["standard", 2, 4]]
+        )
+
+    def test_legacy_hotel_gets_rooms(self):
+        """Verifica que un hotel sin habitaciones asignadas las recibe."""
+        hotels = repository_module.get_repository("hotels.json", "hoteles")
+        hotels.put("HR4", {
+            "hotel_id": "HR4", "name": "Old", "location": "City",
+            "total_rooms": 2,
+            "reservations": {"RL1": "C1", "RL2": "C1", "RL3": "C1"},
+            "stays": {"RL1": ["2025-01-02", "2025-01-04"],
+                      "RL2": ["2025-01-01", "2025-01-02"],
+                      "RL3": ["2025-01-03", "2025-01-05"]},
+        })
+        hotel = Hotel.display_hotel("HR4")
+        self.assertEqual(hotel.room_of("RL2"), 1)
+        self.assertEqual(hotel.room_of("RL1"), 1)
+        self.assertEqual(hotel.room_of("RL3"), 2)
+
+    def test_invalid_room_types(self):
+        """Verifica que los tipos deben sumar total_rooms."""
+        with self.assertRaises(ValueError):
+            Hotel("HX", "Bad", "City", 3, [["standard", 2, 2]])
+        with self.assertRaises(ValueError):
+            Hotel("HX", "Bad", "City", 2, [["standard", 0, 2]])
+
+
+class TestWaitlist(unittest.TestCase):
+    """Pruebas de la lista de espera."""
+
+    def setUp(self):
+        """Un hotel de una habitación ocupada del 1 al 3 de enero."""
+        cleanup_files()
+        Hotel.create_hotel("HW1", "Full", "City", 1)
+        Reservation.create_reservation("RW0", "C1", "HW1", "2025-01-01",
+                                       "2025-01-03")
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def _wait(self, reservation_id, check_in, check_out, priority=0):
+        """Pide una reservación en HW1 con lista de espera."""
+        return Reservation.create_reservation(
+            reservation_id, "C1", "HW1", check_in, check_out,
+            waitlist_priority=priority,
+        )
+
+    def test_full_hotel_queues_request(self):
+        """Verifica que sin lugar la petición queda en espera."""
+        self.assertIsNone(self._wait("RW1", "2025-01-02", "2025-01-04"))
+        self.assertIsInstance(reporting.last_error(),
+                              reporting.WaitlistedError)
+        self.assertIn("RW1", waitlist.load_waitlist("HW1"))
+        self.assertIsNone(Reservation.display_reservation("RW1"))
+        # Sin prioridad no se forma.
+        self.assertIsNone(Reservation.create_reservation(
+            "RW2", "C1", "HW1", "2025-01-02", "2025-01-04"))
+        self.assertNotIn("RW2", waitlist.load_waitlist("HW1"))
+
+    def test_cancel_promotes_by_priority_then_fifo(self):
+        """Verifica el orden de atención al liberar la habitación."""
+        self._wait("RW1", "2025-01-01", "2025-01-02")
+        self._wait("RW2", "2025-01-01", "2025-01-03", priority=5)
+        self._wait("RW3", "2025-01-02", "2025-01-03", priority=5)
+        self.assertTrue(Reservation.cancel_reservation("RW0"))
+        hotel = Hotel.display_hotel("HW1")
+        # RW2 llegó antes que RW3 con la misma prioridad y ocupa todo.
+        self.assertEqual(set(hotel.reservations), {"RW2"})
+        self.assertEqual(set(waitlist.load_waitlist("HW1")), {"RW1", "RW3"})
+        self.assertEqual(
+            Reservation.display_reservation("RW2").check_out, "2025-01-03"
+        )
+        self.assertTrue(Hotel.cancel_room_reservation("HW1", "RW2"))
+        hotel = Hotel.display_hotel("HW1")
+        self.assertEqual(set(hotel.reservations), {"RW1", "RW3"})
+        self.assertEqual(waitlist.load_waitlist(), {})
+
+    def test_only_overlapping_ranges_are_served(self):
+        """Verifica que lo liberado solo se ofrece a esas noches."""
+        Hotel.create_hotel("HW2", "Two", "City", 1)
+        Reservation.create_reservation("RX0", "C1", "HW2", "2025-03-01",
+                                       "2025-03-02")
+        Reservation.create_reservation("RX1", "C1", "HW2", "2025-03-05",
+                                       "2025-03-06")
+        for reservation_id, check_in, check_out in [
+            ("RX2", "2025-03-01", "2025-03-02"),
+            ("RX3", "2025-03-05", "2025-03-06"),
+        ]:
+            Reservation.create_reservation(reservation_id, "C1", "HW2",
+                                           check_in, check_out,
+                                           waitlist_priority=0)
+        Reservation.cancel_reservation("RX0")
+        hotel = Hotel.display_hotel("HW2")
+        self.assertIn("RX2", hotel.reservations)
+        self.assertEqual(set(waitlist.load_waitlist("HW2")), {"RX3"})
+
+    def test_growth_and_leave(self):
+        """Verifica que crecer atiende la lista y que se puede salir."""
+        self._wait("RW1", "2025-01-01", "2025-01-02")
+        self._wait("RW2", "2025-01-01", "2025-01-02")
+        self.assertTrue(Hotel.leave_waitlist("HW1", "RW1"))
+        self.assertFalse(Hotel.leave_waitlist("HW1", "RW1"))
+        self.assertTrue(Hotel.modify_hotel("HW1", total_rooms=2))
+        hotel = Hotel.display_hotel("HW1")
+        self.assertEqual(set(hotel.reservations), {"RW0", "RW2"})
+        self.assertEqual(hotel.room_of("RW2"), 2)
+        self.assertEqual(waitlist.load_waitlist("HW1"), {})
+
+    def test_rollback_and_hotel_delete(self):
+        """Verifica que la cola se rearma tras deshacer y al borrar."""
+        self._wait("RW1", "2025-01-01", "2025-01-02")
+        hotels = repository_module.get_repository("hotels.json", "hoteles")
+        with self.assertRaises(RuntimeError):
+            with transaction_module.Transaction("hotel:HW1") as tx:
+                Hotel.cancel_room_reservation("HW1", "RW0", transaction=tx)
+                self.assertIn("RW1", tx.get(hotels, "HW1")["reservations"])
+                raise RuntimeError("falla")
+        self.assertIn("RW1", waitlist.load_waitlist("HW1"))
+        self.assertTrue(Reservation.cancel_reservation("RW0"))
+        self.assertIsNotNone(Reservation.display_reservation("RW1"))
+        self._wait("RW2", "2025-01-01", "2025-01-02")
+        self.assertTrue(Hotel.delete_hotel("HW1"))
+        self.assertEqual(waitlist.load_waitlist(), {})
+
+    def test_queue_skips_withdrawn_entries(self):
+        """Verifica que la cola ignora las peticiones que ya no están."""
+        entries = {
+            "A": {"check_in": "2025-01-01", "check_out": "2025-01-02",
+                  "priority": 0, "turn": 0},
+            "B": {"check_in": "2025-01-01", "check_out": "2025-01-02",
+                  "priority": 1, "turn": 1},
+        }
+        queue = waitlist.WaitQueue.from_entries(entries)
+        key = ("2025-01-01", "2025-01-02")
+        self.assertEqual(queue.head(key, lambda *_: True)[2], "B")
+        self.assertEqual(queue.head(key, lambda rid, _: rid == "A")[2], "A")
+        self.assertIsNone(queue.head(key, lambda *_: False))
+        self.assertEqual(queue.overlapping("2025-01-01", "2025-01-05"), [])
+
+
+class TestSearch(unittest.TestCase):
+    """Pruebas de la búsqueda de hoteles."""
+
+    def setUp(self):
+        """Crea hoteles en dos ciudades con distinta ocupación."""
+        cleanup_files()
+        Hotel.create_hotels(
+            {"hotel_id": f"HQ{i}", "name": "Q",
+             "location": "Cuernavaca" if i % 2 else "Puebla",
+             "total_rooms": i + 1}
+            for i in range(10)
+        )
+        Hotel.reserve_room("HQ1", "RQ1", "C1", "2025-01-01", "2025-01-03")
+        Hotel.reserve_room("HQ9", "RQ2", "C1", "2025-01-01", "2025-01-03")
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def test_filter_and_rank(self):
+        """Verifica el filtro por ubicación, fechas y el orden."""
+        results = search_hotels(
+            "Cuernavaca", 2, "2025-01-02", "2025-01-03"
+        )
+        self.assertEqual(
+            results, [("HQ9", 9), ("HQ7", 8), ("HQ5", 6), ("HQ3", 4)]
+        )
+        self.assertEqual(search_hotels("Puebla", 10), [])
+        self.assertEqual(len(search_hotels(limit=3)), 3)
+
+    def test_parallel_matches_serial(self):
+        """Verifica que el pool de procesos da el mismo resultado."""
+        expected = search_hotels(None, 1, "2025-01-01", "2025-01-02")
+        with HotelSearch(workers=3, parallel_threshold=1) as search:
+            self.assertEqual(
+                search.search(None, 1, "2025-01-01", "2025-01-02"), expected
+            )
+            Hotel.create_hotel("HQ99", "New", "Puebla", 50)
+            self.assertEqual(search.search(limit=1), [("HQ99", 50)])
+
+
+if __name__ == "__main__":
+    unittest.main()
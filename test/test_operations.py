@@ -0,0 +1,421 @@
+"""Pruebas de métricas, mensajes, línea de comandos y consistencia."""
+
+import contextlib
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+from support import cleanup_files  # noqa: E402
+import repository as repository_module  # noqa: E402
+import cli  # noqa: E402
+import consistency  # noqa: E402
+import metrics  # noqa: E402
+import reporting  # noqa: E402
+from customer import Customer  # noqa: E402
+from hotel import Hotel  # noqa: E402
+from reservation import Reservation  # noqa: E402
+
+
+class TestMetrics(unittest.TestCase):
+    """Pruebas de los contadores e histogramas."""
+
+    def setUp(self):
+        """Empieza sin datos ni métricas."""
+        cleanup_files()
+        repository_module.reset_repositories()
+        metrics.reset()
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+        if os.path.exists("metrics.prom"):
+            os.remove("metrics.prom")
+
+    def test_operations_and_storage(self):
+        """Verifica latencias por operación, bytes y aciertos de caché."""
+        Hotel.create_hotel("HM1", "Metrics", "City", 2)
+        Hotel.reserve_room("HM1", "RM1", "C1")
+        Hotel.display_hotel("HM1")
+        data = metrics.snapshot()
+        histograms = data["histograms"]
+        counters = data["counters"]
+        self.assertEqual(
+            histograms['operation_seconds{operation="Hotel.reserve_room"}'][
+                "count"], 1
+        )
+        self.assertEqual(
+            histograms['store_seconds{action="save",file="hoteles"}'][
+                "count"], 2
+        )
+        self.assertGreater(
+            counters['store_bytes_written_total{file="hoteles"}'], 0
+        )
+        self.assertGreater(counters['cache_hits_total{file="hoteles"}'], 0)
+        self.assertEqual(counters['cache_misses_total{file="hoteles"}'], 1)
+
+    def test_prometheus_dump(self):
+        """Verifica el archivo en formato de texto de Prometheus."""
+        Customer.create_customer("CM1", "Ana", "a@x.com", "555")
+        metrics.write_prometheus("metrics.prom")
+        with open("metrics.prom", "r", encoding="utf-8") as f:
+            text = f.read()
+        self.assertIn("# TYPE reservations_operation_seconds histogram", text)
+        self.assertIn(
+            'reservations_operation_seconds_count'
+            '{operation="Customer.create_customer"} 1', text
+        )
+        self.assertIn(
+            'reservations_operation_seconds_bucket'
+            '{operation="Customer.create_customer",le="+Inf"} 1', text
+        )
+
+    def test_disabled(self):
+        """Verifica que sin recolección no se registra nada."""
+        metrics.set_enabled(False)
+        try:
+            Customer.create_customer("CM2", "Ana", "a@x.com", "555")
+        finally:
+            metrics.set_enabled(True)
+        self.assertEqual(
+            metrics.snapshot(), {"counters": {}, "histograms": {}}
+        )
+
+
+class TestReporting(unittest.TestCase):
+    """Pruebas de los errores estructurados y los mensajes por logging."""
+
+    def setUp(self):
+        """Empieza sin datos."""
+        cleanup_files()
+        repository_module.reset_repositories()
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def test_last_error(self):
+        """Verifica el tipo y los datos de la última falla."""
+        self.assertIsNone(Hotel.display_hotel("NOPE"))
+        error = reporting.last_error()
+        self.assertIsInstance(error, reporting.NotFoundError)
+        self.assertEqual(error.code, "not_found")
+        self.assertEqual(error.args, ("NOPE",))
+        self.assertEqual(str(error), "Hotel con ID NOPE no encontrado.")
+        Hotel.create_hotel("HE1", "Error", "City", 1)
+        self.assertIsNone(reporting.last_error())
+        Hotel.reserve_room("HE1", "RE1", "C1")
+        self.assertFalse(Hotel.reserve_room("HE1", "RE2", "C1"))
+        self.assertIsInstance(
+            reporting.last_error(), reporting.NoAvailabilityError
+        )
+
+    def test_require(self):
+        """Verifica que require lanza la falla como excepción."""
+        Customer.create_customer("CE1", "Ana", "a@x.com", "555")
+        customer = reporting.require(Customer.display_customer("CE1"))
+        self.assertEqual(customer.name, "Ana")
+        with self.assertRaises(reporting.AlreadyExistsError):
+            reporting.require(
+                Customer.create_customer("CE1", "Ana", "a@x.com", "555")
+            )
+
+    def test_console_opt_in(self):
+        """Verifica que la salida de consola solo aparece al pedirla."""
+        output = io.StringIO()
+        handler = reporting.enable_console(stream=output)
+        try:
+            Customer.create_customer("CE2", "Ana", "a@x.com", "555")
+            Customer.display_customer("CE2")
+        finally:
+            reporting.disable_console(handler)
+        text = output.getvalue()
+        self.assertIn("Cliente 'Ana' creado correctamente.", text)
+        self.assertIn("--- Información del Cliente ---\nID     : CE2", text)
+        self.assertFalse(
+            logging.getLogger("reservations.customer").isEnabledFor(
+                logging.INFO
+            )
+        )
+
+    def test_sample_filter(self):
+        """Verifica que el filtro deja pasar uno de cada n mensajes."""
+        sample = reporting.SampleFilter(3)
+        record = logging.makeLogRecord({"msg": "x"})
+        passed = [sample.filter(record) for _ in range(7)]
+        self.assertEqual(passed.count(True), 3)
+
+
+class TestCli(unittest.TestCase):
+    """Pruebas de la línea de comandos."""
+
+    def setUp(self):
+        """Crea un hotel, un cliente y una reservación."""
+        cleanup_files()
+        Hotel.create_hotel("H1", "Hotel", "Lugar", 2)
+        Customer.create_customer("C1", "Ana", "ana@x.com", "555")
+        Reservation.create_reservation("R1", "C1", "H1", "2026-03-01",
+                                       "2026-03-03")
+        self.out = io.StringIO()
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def _run(self, *argv):
+        """Corre un comando; regresa (código, salida como JSON)."""
+        self.out = io.StringIO()
+        with contextlib.redirect_stdout(self.out):
+            code = cli.main(list(argv))
+        text = self.out.getvalue()
+        return code, json.loads(text) if text else None
+
+    def test_show(self):
+        """Verifica que se imprime el registro pedido."""
+        self.assertEqual(self._run("hotel", "show", "H1")[1]["name"],
+                         "Hotel")
+        self.assertEqual(self._run("customer", "show", "C1")[1]["name"],
+                         "Ana")
+        code, record = self._run("reservation", "show", "R1")
+        self.assertEqual(code, 0)
+        self.assertEqual(record["hotel_id"], "H1")
+
+    def test_show_not_found(self):
+        """Verifica el código de salida de un registro inexistente."""
+        self.assertEqual(self._run("hotel", "show", "H9"), (1, None))
+        self.assertIsInstance(reporting.last_error(),
+                              reporting.NotFoundError)
+
+    def test_list(self):
+        """Verifica las listas por hotel y por cliente."""
+        code, records = self._run("reservation", "list", "--hotel", "H1")
+        self.assertEqual(code, 0)
+        self.assertEqual([r["reservation_id"] for r in records], ["R1"])
+        _, records = self._run("reservation", "list", "--customer", "C1")
+        self.assertEqual([r["reservation_id"] for r in records], ["R1"])
+        self.assertEqual(
+            self._run("reservation", "list", "--customer", "C9")[1], []
+        )
+
+    def test_storage_options(self):
+        """Verifica que se puede elegir el almacenamiento y sus opciones."""
+        try:
+            code, records = self._run(
+                "--storage", "wal", "--option", "compact_bytes=4096",
+                "--entity", "customers.json=binary",
+                "reservation", "list", "--customer", "C1",
+            )
+            self.assertEqual(code, 0)
+            self.assertEqual([r["reservation_id"] for r in records], ["R1"])
+            self.assertEqual(repository_module.current_configuration(), (
+                "wal", {"compact_bytes": 4096,
+                        "entities": {"customers.json": "binary"}},
+            ))
+        finally:
+            repository_module.configure("json")
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                self._run("--storage", "nope", "hotel", "show", "H1")
+            with self.assertRaises(SystemExit):
+                self._run("--option", "buckets", "hotel", "show", "H1")
+
+    def test_available(self):
+        """Verifica la consulta de habitaciones libres."""
+        self.assertEqual(self._run("hotel", "available", "H1")[1], 1)
+        self.assertEqual(
+            self._run("hotel", "available", "H1", "2026-03-03",
+                      "2026-03-04")[1], 2
+        )
+        self.assertEqual(self._run("hotel", "available", "H1", "x", "y"),
+                         (1, None))
+
+    def test_create_and_cancel(self):
+        """Verifica que se crean y cancelan reservaciones."""
+        code, record = self._run("reservation", "create", "R2", "C1", "H1",
+                                 "2026-03-01", "2026-03-02")
+        self.assertEqual((code, record["reservation_id"]), (0, "R2"))
+        self.assertEqual(self._run("reservation", "cancel", "R2"), (0, None))
+        self.assertEqual(self._run("reservation", "cancel", "R2"), (1, None))
+
+    def test_reservation_does_not_import_hotel(self):
+        """Verifica que importar reservation no carga el módulo hotel."""
+        src = os.path.dirname(cli.__file__)
+        output = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, reservation; print('hotel' in sys.modules)"],
+            cwd=src, capture_output=True, text=True, check=True,
+        ).stdout
+        self.assertEqual(output.strip(), "False")
+
+
+class TestConsistency(unittest.TestCase):
+    """Pruebas del ciclo de vida y de la revisión de consistencia."""
+
+    def setUp(self):
+        """Crea un hotel con una reservación."""
+        cleanup_files()
+        self.state = "test_consistency.state"
+        Hotel.create_hotel("H1", "Hotel", "Lugar", 2)
+        Reservation.create_reservation("R1", "C1", "H1", "2026-03-01",
+                                       "2026-03-03")
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+        if os.path.exists(self.state):
+            os.remove(self.state)
+
+    @staticmethod
+    def _hotels():
+        """Repositorio de hoteles."""
+        return repository_module.get_repository("hotels.json", "hoteles")
+
+    @staticmethod
+    def _reservations():
+        """Repositorio de reservaciones."""
+        return repository_module.get_repository("reservations.json",
+                                                "reservaciones")
+
+    def test_delete_hotel_removes_reservations(self):
+        """Verifica que borrar un hotel borra también sus reservaciones."""
+        self.assertTrue(Hotel.delete_hotel("H1"))
+        self.assertIsNone(self._reservations().get("R1"))
+        self.assertEqual(consistency.check().total(), 0)
+
+    def test_cancel_without_hotel_entry(self):
+        """Verifica que se cancela una reservación que el hotel no tenía."""
+        data = self._hotels().get("H1")
+        self._hotels().put("H1", dict(data, reservations={}, stays={}))
+        self.assertTrue(Reservation.cancel_reservation("R1"))
+        self.assertIsNone(self._reservations().get("R1"))
+
+    def test_clean_data(self):
+        """Verifica que datos consistentes no reportan diferencias."""
+        report = consistency.check()
+        self.assertEqual(report.total(), 0)
+
+    def test_orphan_reservation(self):
+        """Verifica que se detecta y borra una reservación sin hotel."""
+        self._hotels().delete("H1")
+        report = consistency.check()
+        self.assertEqual(report.orphans, ["R1"])
+        self.assertEqual(consistency.repair(report), 1)
+        self.assertIsNone(self._reservations().get("R1"))
+
+    def test_unbooked_reservation(self):
+        """Verifica que se vuelve a ocupar la habitación en el hotel."""
+        data = self._hotels().get("H1")
+        self._hotels().put("H1", dict(data, reservations={}, stays={}))
+        report = consistency.check()
+        self.assertEqual(report.unbooked, ["R1"])
+        self.assertEqual(consistency.repair(report), 1)
+        hotel = self._hotels().get("H1")
+        self.assertEqual(hotel["stays"]["R1"], ["2026-03-01", "2026-03-03"])
+        self.assertEqual(consistency.check().total(), 0)
+
+    def test_dangling_hotel_entry(self):
+        """Verifica que se libera la habitación de un ID sin registro."""
+        self._reservations().delete("R1")
+        report = consistency.check()
+        self.assertEqual(report.dangling, [["H1", "R1"]])
+        self.assertEqual(consistency.repair(report), 1)
+        self.assertNotIn("R1", self._hotels().get("H1")["reservations"])
+
+    def test_stay_mismatch(self):
+        """Verifica que el hotel toma las fechas del registro."""
+        data = self._reservations().get("R1")
+        self._reservations().put("R1", dict(data, check_out="2026-03-05"))
+        report = consistency.check()
+        self.assertEqual(report.stay_mismatch, [["H1", "R1"]])
+        self.assertEqual(consistency.repair(report), 1)
+        self.assertEqual(self._hotels().get("H1")["stays"]["R1"],
+                         ["2026-03-01", "2026-03-05"])
+
+    def test_check_in_parts(self):
+        """Verifica que la revisión por partes da el mismo reporte."""
+        template = self._hotels().get("H1")
+        record = self._reservations().get("R1")
+        hotels = {}
+        reservations = {}
+        stay = ["2026-03-01", "2026-03-03"]
+        for number in range(50):
+            hotel_id = f"H{number}"
+            booked = [f"R{number}-{index}" for index in range(4)]
+            hotels[hotel_id] = dict(
+                template, hotel_id=hotel_id,
+                reservations={key: True for key in booked},
+                stays={key: stay for key in booked},
+            )
+            for key in booked:
+                reservations[key] = dict(record, reservation_id=key,
+                                         hotel_id=hotel_id)
+        del reservations["R3-0"]
+        del hotels["H5"]["reservations"]["R5-1"]
+        reservations["R7-2"]["hotel_id"] = "H8"
+        reservations["R9-3"]["check_out"] = "2026-03-05"
+        reservations["R10-0"]["hotel_id"] = "H99"
+        self._hotels().replace(hotels)
+        self._reservations().replace(reservations)
+        sizes = []
+        booked = consistency._booked  # pylint: disable=protected-access
+
+        def counted(parts, part):
+            """Registra cuántas reservaciones tiene cada parte."""
+            result = booked(parts, part)
+            sizes.append(len(result))
+            return result
+
+        whole = consistency.check().to_dict()
+        consistency._booked = counted  # pylint: disable=protected-access
+        try:
+            parts = consistency.check(max_booked=20).to_dict()
+        finally:
+            consistency._booked = booked  # pylint: disable=protected-access
+        self.assertEqual(parts, whole)
+        self.assertEqual(whole["orphans"], ["R10-0"])
+        self.assertEqual(whole["unbooked"], ["R5-1", "R7-2"])
+        self.assertEqual(whole["dangling"], [["H10", "R10-0"],
+                                             ["H3", "R3-0"],
+                                             ["H7", "R7-2"]])
+        self.assertEqual(whole["stay_mismatch"], [["H9", "R9-3"]])
+        self.assertEqual(len(sizes), 10)
+        self.assertEqual(sum(sizes), 199)
+        self.assertLessEqual(max(sizes), 40)
+
+    def test_sharded_storage(self):
+        """Verifica que con cubetas se revisa cubeta por cubeta."""
+        repository_module.configure("sharded", buckets=4)
+        try:
+            self._hotels().delete("H1")
+            self.assertEqual(consistency.check().orphans, ["R1"])
+        finally:
+            repository_module.configure("json")
+
+    def test_run_skips_unchanged_files(self):
+        """Verifica que no se vuelve a revisar si nada cambió."""
+        self.assertFalse(consistency.run(state_file=self.state).skipped)
+        self.assertTrue(consistency.run(state_file=self.state).skipped)
+        self._reservations().delete("R1")
+        report = consistency.run(True, self.state)
+        self.assertFalse(report.skipped)
+        self.assertEqual(report.repaired, 1)
+        self.assertTrue(consistency.run(state_file=self.state).skipped)
+
+    def test_main(self):
+        """Verifica la línea de comandos."""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            report = consistency.main(["--state", self.state])
+        self.assertEqual(report.total(), 0)
+        self.assertEqual(json.loads(out.getvalue())["repaired"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,679 @@
+"""Pruebas de los repositorios y sus almacenamientos."""
+
+import json
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+from support import cleanup_files  # noqa: E402
+import customer as customer_module  # noqa: E402
+import hotel as hotel_module  # noqa: E402
+import reservation as reservation_module  # noqa: E402
+import repository as repository_module  # noqa: E402
+import sqlite_store  # noqa: E402
+import consistency  # noqa: E402
+import stream  # noqa: E402
+import mmap_store  # noqa: E402
+import locks  # noqa: E402
+import reporting  # noqa: E402
+import shard_store  # noqa: E402
+import transaction as transaction_module  # noqa: E402
+from customer import Customer  # noqa: E402
+from hotel import Hotel  # noqa: E402
+from reservation import Reservation  # noqa: E402
+
+
+class TestRepository(unittest.TestCase):
+    """Pruebas del repositorio en memoria."""
+
+    def setUp(self):
+        """Limpia el estado antes de cada prueba."""
+        cleanup_files()
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        cleanup_files()
+
+    def test_reads_served_from_memory(self):
+        """Verifica que leer varias veces no vuelve a cargar el archivo."""
+        Hotel.create_hotel("HR1", "Cache Hotel", "City", 3)
+        repo = repository_module.get_repository("hotels.json", "hoteles")
+        calls = []
+        original = repo.store.load
+        repo.store.load = lambda: calls.append(1) or original()
+        try:
+            Hotel.display_hotel("HR1")
+            Hotel.display_hotel("HR1")
+        finally:
+            repo.store.load = original
+        self.assertEqual(calls, [])
+
+    def test_detects_external_change(self):
+        """Verifica que se recarga si otro proceso cambia el archivo."""
+        Hotel.create_hotel("HR2", "Old Name", "City", 3)
+        data = hotel_module.load_hotels()
+        data["HR2"]["name"] = "Changed Outside, Longer"
+        with open("hotels.json", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        self.assertEqual(
+            Hotel.display_hotel("HR2").name, "Changed Outside, Longer"
+        )
+
+    def test_load_returns_independent_copy(self):
+        """Verifica que modificar lo cargado no altera el repositorio."""
+        Hotel.create_hotel("HR3", "Copy Hotel", "City", 3)
+        data = hotel_module.load_hotels()
+        data["HR3"]["name"] = "Mutated"
+        self.assertEqual(Hotel.display_hotel("HR3").name, "Copy Hotel")
+
+    def test_save_replaces_all_records(self):
+        """Verifica que save_hotels reemplaza el contenido completo."""
+        Hotel.create_hotel("HR4", "Gone Hotel", "City", 3)
+        hotel_module.save_hotels({})
+        self.assertIsNone(Hotel.display_hotel("HR4"))
+
+
+class TestWalStorage(unittest.TestCase):
+    """Pruebas del almacenamiento con log de cambios."""
+
+    def setUp(self):
+        """Activa el modo WAL con un umbral pequeño."""
+        cleanup_files()
+        repository_module.configure("wal", compact_bytes=4096)
+
+    def tearDown(self):
+        """Regresa al modo JSON y limpia los archivos."""
+        repository_module.configure("json")
+        cleanup_files()
+
+    def test_changes_appended_to_log(self):
+        """Verifica que los cambios van al log y no al snapshot."""
+        Customer.create_customer("CW1", "Wal", "w@x.com", "555")
+        Customer.modify_customer("CW1", name="Wally")
+        self.assertFalse(os.path.exists("customers.json"))
+        with open("customers.json.log", encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_state_rebuilt_from_snapshot_and_log(self):
+        """Verifica que otro proceso reconstruye el estado completo."""
+        Hotel.create_hotel("HW1", "Snapshot", "City", 2)
+        repository_module.get_repository("hotels.json", "hoteles").compact()
+        Hotel.reserve_room("HW1", "RW1", "C1")
+        Hotel.create_hotel("HW2", "Tail", "City", 2)
+        Hotel.delete_hotel("HW2")
+        repository_module.reset_repositories()
+        hotels = hotel_module.load_hotels()
+        self.assertEqual(list(hotels), ["HW1"])
+        self.assertIn("RW1", hotels["HW1"]["reservations"])
+
+    def test_compaction_after_threshold(self):
+        """Verifica que al crecer el log se escribe un snapshot."""
+        for i in range(60):
+            Customer.create_customer(f"CC{i}", "Bulk", "b@x.com", "555")
+        self.assertTrue(os.path.exists("customers.json"))
+        repository_module.reset_repositories()
+        self.assertEqual(len(customer_module.load_customers()), 60)
+
+    def test_ignores_truncated_log_line(self):
+        """Verifica que una línea incompleta al final no rompe la carga."""
+        Customer.create_customer("CT1", "Torn", "t@x.com", "555")
+        with open("customers.json.log", "a", encoding="utf-8") as f:
+            f.write('{"op": "put", "key"')
+        repository_module.reset_repositories()
+        self.assertEqual(list(customer_module.load_customers()), ["CT1"])
+
+    def test_appends_after_truncated_log_line(self):
+        """Verifica que lo escrito tras una línea rota no se pierde."""
+        Customer.create_customer("CT1", "Torn", "t@x.com", "555")
+        with open("customers.json.log", "a", encoding="utf-8") as f:
+            f.write('{"op": "put", "key": "CX", "value": {}}')
+        repository_module.reset_repositories()
+        Customer.create_customer("CT2", "After", "a@x.com", "555")
+        Customer.modify_customer("CT1", name="Fixed")
+        repository_module.reset_repositories()
+        customers = customer_module.load_customers()
+        self.assertEqual(sorted(customers), ["CT1", "CT2"])
+        self.assertEqual(customers["CT1"]["name"], "Fixed")
+
+    def test_unknown_storage(self):
+        """Verifica que un almacenamiento desconocido lanza ValueError."""
+        with self.assertRaises(ValueError):
+            repository_module.configure("nope")
+
+
+class TestBinaryStorage(unittest.TestCase):
+    """Pruebas del snapshot binario."""
+
+    def setUp(self):
+        """Activa el formato binario."""
+        cleanup_files()
+        repository_module.configure("binary")
+
+    def tearDown(self):
+        """Regresa al modo JSON y limpia los archivos."""
+        repository_module.configure("json")
+        cleanup_files()
+
+    def test_round_trip(self):
+        """Verifica que los datos se guardan y recargan del binario."""
+        Hotel.create_hotel("HB1", "Binary", "City", 2)
+        Hotel.reserve_room("HB1", "RB1", "C1", "2025-01-01", "2025-01-02")
+        self.assertFalse(os.path.exists("hotels.json"))
+        with open("hotels.bin", "rb") as f:
+            self.assertEqual(f.read(4), b"RSNP")
+        repository_module.reset_repositories()
+        hotels = hotel_module.load_hotels()
+        self.assertEqual(hotels["HB1"]["stays"],
+                         {"RB1": ["2025-01-01", "2025-01-02"]})
+
+    def test_converters(self):
+        """Verifica la conversión de JSON a binario y de regreso."""
+        repository_module.configure("json")
+        Customer.create_customer("CB1", "Ana", "a@x.com", "555")
+        os.remove("customers.json")
+        Customer.create_customer("CB2", "Luis", "l@x.com", "555")
+        self.assertTrue(repository_module.json_to_binary("customers.json"))
+        os.remove("customers.json")
+        self.assertTrue(repository_module.binary_to_json("customers.json"))
+        with open("customers.json", encoding="utf-8") as f:
+            self.assertEqual(list(json.load(f)), ["CB2"])
+
+    def test_reads_json_until_first_snapshot(self):
+        """Verifica que sin snapshot se usa el JSON existente."""
+        with open("customers.json", "w", encoding="utf-8") as f:
+            json.dump({"CB3": Customer("CB3", "A", "a", "1").to_dict()}, f)
+        self.assertIsNotNone(Customer.display_customer("CB3"))
+        Customer.create_customer("CB4", "B", "b", "2")
+        repository_module.reset_repositories()
+        self.assertEqual(sorted(customer_module.load_customers()),
+                         ["CB3", "CB4"])
+
+    def test_rejects_unknown_header(self):
+        """Verifica que un encabezado desconocido no se interpreta."""
+        with open("customers.bin", "wb") as f:
+            f.write(b"XXXX\x01\x00garbage")
+        self.assertEqual(customer_module.load_customers(), {})
+
+
+class TestMmapStorage(unittest.TestCase):
+    """Pruebas del almacenamiento de reservaciones con mmap."""
+
+    def setUp(self):
+        """Usa mmap solo para las reservaciones, con poca capacidad."""
+        cleanup_files()
+        repository_module.configure("json", entities={
+            "reservations.json": ("mmap", {"capacity": 4}),
+        })
+        Hotel.create_hotel("HMM", "Mapped", "City", 50)
+
+    def tearDown(self):
+        """Regresa al modo JSON y limpia los archivos."""
+        repository_module.configure("json")
+        cleanup_files()
+
+    @staticmethod
+    def _book(reservation_id, customer_id):
+        """Crea una reservación de una noche en el hotel de prueba."""
+        return Reservation.create_reservation(
+            reservation_id, customer_id, "HMM", "2025-01-01", "2025-01-02"
+        )
+
+    def _repository(self):
+        """Repositorio de reservaciones del proceso."""
+        return repository_module.get_repository(
+            "reservations.json", "reservaciones"
+        )
+
+    def test_crud_in_place(self):
+        """Verifica crear, leer y cancelar sin tocar reservations.json."""
+        self._book("RM1", "C1")
+        self.assertIsInstance(self._repository(),
+                              mmap_store.MmapRepository)
+        self.assertFalse(os.path.exists("reservations.json"))
+        self.assertEqual(
+            Reservation.display_reservation("RM1").check_out, "2025-01-02"
+        )
+        self.assertTrue(Reservation.cancel_reservation("RM1"))
+        self.assertIsNone(Reservation.display_reservation("RM1"))
+
+    def test_growth_and_free_list(self):
+        """Verifica que el archivo crece y reusa los slots cancelados."""
+        for i in range(20):
+            self._book(f"RG{i}", "C1")
+        size = os.path.getsize("reservations.mmap")
+        for i in range(10):
+            Reservation.cancel_reservation(f"RG{i}")
+        for i in range(10):
+            self._book(f"RN{i}", "C2")
+        self.assertEqual(os.path.getsize("reservations.mmap"), size)
+        repository_module.reset_repositories()
+        data = reservation_module.load_reservations()
+        self.assertEqual(len(data), 20)
+        self.assertIn("RN9", data)
+        self.assertNotIn("RG0", data)
+
+    def test_other_reader_sees_changes(self):
+        """Verifica que otra instancia ve escrituras y crecimiento."""
+        other = mmap_store.MmapRepository(
+            os.path.abspath("reservations.json"), "reservaciones"
+        )
+        try:
+            self._book("RO1", "C1")
+            self.assertEqual(other.get("RO1")["customer_id"], "C1")
+            for i in range(10):
+                self._book(f"RO{i + 2}", "C1")
+            self.assertEqual(len(other.all()), 11)
+            other.delete("RO1")
+            self.assertIsNone(self._repository().get("RO1"))
+        finally:
+            other.close()
+
+    def test_find_after_changes(self):
+        """Verifica que las búsquedas siguen los cambios."""
+        self._book("RF1", "C9")
+        self.assertEqual(len(Reservation.find_by_customer("C9")), 1)
+        self._book("RF2", "C9")
+        Reservation.cancel_reservation("RF1")
+        self.assertEqual(
+            [r.reservation_id for r in Reservation.find_by_customer("C9")],
+            ["RF2"],
+        )
+
+    def test_migrates_json_and_exports(self):
+        """Verifica la migración desde JSON y la exportación de regreso."""
+        with open("reservations.json", "w", encoding="utf-8") as f:
+            json.dump({"RJ": Reservation("RJ", "C", "H", "a", "b")
+                       .to_dict()}, f)
+        self.assertIsNotNone(Reservation.display_reservation("RJ"))
+        self.assertTrue(os.path.exists("reservations.mmap"))
+        os.remove("reservations.json")
+        mmap_store.export_json(os.path.abspath("reservations.json"))
+        with open("reservations.json", encoding="utf-8") as f:
+            self.assertEqual(list(json.load(f)), ["RJ"])
+
+    def test_rejects_wide_fields(self):
+        """Verifica que un campo más ancho que el registro se rechaza."""
+        with self.assertRaises(ValueError):
+            self._repository().put("R" * 40, Reservation(
+                "R" * 40, "C", "H", "a", "b"
+            ).to_dict())
+
+    def test_wide_reservation_is_rejected_before_journal(self):
+        """Verifica que un ID muy ancho falla sin dejar nada a medias."""
+        self.assertIsNone(Reservation.create_reservation(
+            "R" * 40, "C1", "HMM", "2025-01-01", "2025-01-02"
+        ))
+        self.assertIsInstance(reporting.last_error(),
+                              reporting.InvalidDataError)
+        self.assertFalse(transaction_module.recover())
+        self.assertEqual(Hotel.display_hotel("HMM").available_rooms(), 50)
+        self.assertIsNotNone(self._book("RW1", "C1"))
+
+    def test_update_is_all_or_nothing(self):
+        """Verifica que un registro inválido cancela todo el update."""
+        good = Reservation("RA1", "C", "H", "a", "b").to_dict()
+        wide = Reservation("R" * 40, "C", "H", "a", "b").to_dict()
+        with self.assertRaises(ValueError):
+            self._repository().update({"RA1": good, "R" * 40: wide})
+        self.assertIsNone(self._repository().get("RA1"))
+
+    def test_undated_round_trip(self):
+        """Verifica que las fechas en None se leen como None."""
+        self.assertIsNotNone(Reservation.create_reservation(
+            "RU1", "C1", "HMM", None, None
+        ))
+        self._repository().close()
+        stored = Reservation.display_reservation("RU1")
+        self.assertIsNone(stored.check_in)
+        self.assertIsNone(stored.check_out)
+        self._repository().put("RU2", Reservation("RU2", "C", "H", "", "")
+                               .to_dict())
+        self.assertEqual(self._repository().get("RU2")["check_in"], "")
+
+    def test_configuration_round_trip(self):
+        """Verifica que la configuración por archivo se puede repetir."""
+        storage, options = repository_module.current_configuration()
+        self.assertEqual(storage, "json")
+        self.assertIn("reservations.json", options["entities"])
+        with self.assertRaises(ValueError):
+            repository_module.configure("json", entities={"x.json": "nope"})
+
+
+class TestShardedStorage(unittest.TestCase):
+    """Pruebas del archivo de hoteles repartido en cubetas."""
+
+    def setUp(self):
+        """Reparte los hoteles en 4 cubetas."""
+        cleanup_files()
+        repository_module.configure("json", entities={
+            "hotels.json": ("sharded", {"buckets": 4}),
+        })
+
+    def tearDown(self):
+        """Regresa al modo JSON y limpia los archivos."""
+        repository_module.configure("json")
+        cleanup_files()
+
+    @staticmethod
+    def _bucket_file(hotel_id):
+        """Archivo de la cubeta donde vive un hotel."""
+        directory = shard_store.shard_dir(os.path.abspath("hotels.json"))
+        bucket = shard_store.bucket_of(hotel_id, 4)
+        return os.path.join(directory, f"{bucket:04d}.json")
+
+    def _hotels_in_other_buckets(self, hotel_id):
+        """Dos hoteles: ``hotel_id`` y otro de una cubeta distinta."""
+        other = next(
+            f"H{i}" for i in range(100)
+            if shard_store.bucket_of(f"H{i}", 4)
+            != shard_store.bucket_of(hotel_id, 4)
+        )
+        Hotel.create_hotel(hotel_id, "Uno", "A", 2)
+        Hotel.create_hotel(other, "Dos", "B", 2)
+        return other
+
+    def test_booking_rewrites_only_its_bucket(self):
+        """Verifica que reservar toca solo la cubeta del hotel."""
+        other = self._hotels_in_other_buckets("HS1")
+        before = os.stat(self._bucket_file(other)).st_mtime_ns
+        self.assertTrue(Hotel.reserve_room("HS1", "R1", "C1", "2025-01-01",
+                                           "2025-01-02"))
+        self.assertEqual(os.stat(self._bucket_file(other)).st_mtime_ns,
+                         before)
+        self.assertFalse(os.path.exists("hotels.json"))
+        repository_module.reset_repositories()
+        self.assertEqual(sorted(hotel_module.load_hotels()),
+                         sorted(["HS1", other]))
+        self.assertEqual(Hotel.display_hotel("HS1").reservations,
+                         {"R1": "C1"})
+
+    def test_reservations_across_buckets(self):
+        """Verifica crear, cancelar y borrar con hoteles repartidos."""
+        other = self._hotels_in_other_buckets("HS1")
+        Reservation.create_reservation("R1", "C1", "HS1", "2025-01-01",
+                                       "2025-01-02")
+        Reservation.create_reservation("R2", "C1", other, "2025-01-01",
+                                       "2025-01-02")
+        self.assertTrue(Reservation.cancel_reservation("R1"))
+        self.assertTrue(Hotel.modify_hotel(other, total_rooms=5))
+        self.assertTrue(Hotel.delete_hotel(other))
+        self.assertEqual(list(hotel_module.load_hotels()), ["HS1"])
+        self.assertEqual(reservation_module.load_reservations(), {})
+        self.assertEqual(consistency.check().total(), 0)
+
+    def test_migrates_and_exports_json(self):
+        """Verifica que se reparte el JSON existente y se puede regresar."""
+        repository_module.configure("json")
+        Hotel.create_hotel("HS1", "Uno", "A", 2)
+        Hotel.create_hotel("HS2", "Dos", "B", 2)
+        repository_module.configure("json", entities={
+            "hotels.json": ("sharded", {"buckets": 4}),
+        })
+        self.assertEqual(Hotel.display_hotel("HS2").name, "Dos")
+        os.remove("hotels.json")
+        repository_module.reset_repositories()
+        self.assertEqual(Hotel.display_hotel("HS1").name, "Uno")
+        Hotel.create_hotel("HS3", "Tres", "C", 2)
+        repository_module.reset_repositories()
+        self.assertTrue(shard_store.export_json(
+            os.path.abspath("hotels.json"), "hoteles"
+        ))
+        with open("hotels.json", encoding="utf-8") as f:
+            self.assertEqual(sorted(json.load(f)), ["HS1", "HS2", "HS3"])
+
+    def test_manifest_sets_bucket_count(self):
+        """Verifica que el número de cubetas lo fija el manifiesto."""
+        Hotel.create_hotel("HS1", "Uno", "A", 2)
+        repository_module.configure("json", entities={
+            "hotels.json": ("sharded", {"buckets": 16}),
+        })
+        hotels = repository_module.get_repository("hotels.json", "hoteles")
+        self.assertEqual(hotels.buckets, 4)
+        self.assertIsNotNone(hotels.get("HS1"))
+
+    def test_all_files_sharded_book_in_parallel(self):
+        """Verifica que reservar en un hotel no espera a otro ocupado."""
+        repository_module.configure("sharded", buckets=4)
+        other = self._hotels_in_other_buckets("HS1")
+        busy = next(
+            f"RS{i}" for i in range(100)
+            if shard_store.bucket_of(f"RS{i}", 4)
+            != shard_store.bucket_of("RS0", 4)
+        )
+        reservations = shard_store.shard_dir(
+            os.path.abspath("reservations.json")
+        )
+        bucket = shard_store.bucket_of(busy, 4)
+        held = [
+            locks.FileLock("hotel:HS1"),
+            locks.FileLock(f"file:{self._bucket_file('HS1')}"),
+            locks.FileLock(
+                f"file:{os.path.join(reservations, f'{bucket:04d}.json')}"
+            ),
+        ]
+        for lock in held:
+            lock.acquire()
+        try:
+            booking = threading.Thread(
+                target=Reservation.create_reservation,
+                args=("RS0", "C1", other, "2025-01-01", "2025-01-02"),
+            )
+            booking.start()
+            booking.join(timeout=10)
+            self.assertFalse(booking.is_alive())
+        finally:
+            for lock in held:
+                lock.release()
+        self.assertFalse(os.path.exists("reservations.json"))
+        self.assertIsNotNone(Reservation.display_reservation("RS0"))
+
+    def test_batch_writes_buckets(self):
+        """Verifica la escritura diferida por lotes con cubetas."""
+        transaction_module.begin_batch()
+        try:
+            Hotel.create_hotel("HS1", "Uno", "A", 2)
+            Hotel.create_hotel("HS2", "Dos", "B", 2)
+            hotels = repository_module.get_repository("hotels.json",
+                                                      "hoteles")
+            self.assertEqual(sorted(hotels.pending()[0]), ["HS1", "HS2"])
+        finally:
+            transaction_module.end_batch()
+        self.assertIsNone(hotels.pending())
+        repository_module.reset_repositories()
+        self.assertEqual(sorted(hotel_module.load_hotels()), ["HS1", "HS2"])
+
+
+class TestSqliteStorage(unittest.TestCase):
+    """Pruebas del almacenamiento en SQLite."""
+
+    DATABASE = "test_system.db"
+
+    def setUp(self):
+        """Activa SQLite en una base de datos de prueba."""
+        cleanup_files()
+        if os.path.exists(self.DATABASE):
+            os.remove(self.DATABASE)
+        repository_module.configure("sqlite", database=self.DATABASE)
+
+    def tearDown(self):
+        """Regresa al modo JSON y borra la base de datos."""
+        repository_module.configure("json")
+        cleanup_files()
+        if os.path.exists(self.DATABASE):
+            os.remove(self.DATABASE)
+
+    def test_reservation_flow(self):
+        """Verifica el flujo completo de reservación sobre SQLite."""
+        Hotel.create_hotel("HS1", "SQL Hotel", "City", 1)
+        Customer.create_customer("CS1", "Sql", "s@x.com", "555")
+        r = Reservation.create_reservation(
+            "RS1", "CS1", "HS1", "2025-01-01", "2025-01-02"
+        )
+        self.assertIsNotNone(r)
+        self.assertIsNone(Reservation.create_reservation(
+            "RS2", "CS1", "HS1", "2025-01-01", "2025-01-02"
+        ))
+        self.assertEqual(Hotel.display_hotel("HS1").available_rooms(), 0)
+        self.assertTrue(Reservation.cancel_reservation("RS1"))
+        self.assertEqual(Hotel.display_hotel("HS1").available_rooms(), 1)
+        self.assertFalse(os.path.exists("hotels.json"))
+
+    def test_find_uses_sql(self):
+        """Verifica las búsquedas secundarias sobre SQLite."""
+        Hotel.create_hotel("HS3", "Find", "City", 3)
+        Reservation.create_reservation(
+            "RF1", "CF1", "HS3", "2025-03-01", "2025-03-02"
+        )
+        self.assertEqual(
+            [r.reservation_id for r in Reservation.find_by_customer("CF1")],
+            ["RF1"],
+        )
+        self.assertEqual(len(Reservation.find_by_check_in("2025-03-01")), 1)
+
+    def test_hotel_reservations_in_own_table(self):
+        """Verifica que el mapa de reservaciones va en su propia tabla."""
+        Hotel.create_hotel("HS2", "Nested", "City", 3)
+        Hotel.reserve_room("HS2", "RN1", "CN1")
+        repo = repository_module.get_repository("hotels.json", "hoteles")
+        rows = repo._conn.execute(  # pylint: disable=protected-access
+            "SELECT reservation_id, customer_id FROM hotel_reservations"
+        ).fetchall()
+        self.assertEqual(rows, [("RN1", "CN1")])
+        self.assertEqual(
+            hotel_module.load_hotels()["HS2"]["reservations"],
+            {"RN1": "CN1"},
+        )
+
+    def test_hotel_write_touches_only_changes(self):
+        """Verifica que reservar no reescribe todas las reservaciones."""
+        Hotel.create_hotel("HS4", "Diff", "City", 10)
+        for i in range(5):
+            Hotel.reserve_room("HS4", f"RD{i}", "C1")
+        repo = repository_module.get_repository("hotels.json", "hoteles")
+        conn = repo._conn  # pylint: disable=protected-access
+        before = conn.total_changes
+        Hotel.reserve_room("HS4", "RD5", "C1")
+        # Versión de la tabla, renglón del hotel y la reservación nueva.
+        self.assertEqual(conn.total_changes - before, 3)
+        before = conn.total_changes
+        Hotel.cancel_room_reservation("HS4", "RD0")
+        self.assertEqual(conn.total_changes - before, 3)
+        self.assertEqual(
+            sorted(hotel_module.load_hotels()["HS4"]["reservations"]),
+            ["RD1", "RD2", "RD3", "RD4", "RD5"],
+        )
+
+    def test_loads_reuse_records(self):
+        """Verifica que las lecturas regresan el mismo registro."""
+        Hotel.create_hotel("HS5", "Same", "City", 2)
+        Hotel.reserve_room("HS5", "RS5", "C1", "2025-01-01", "2025-01-02")
+        repo = repository_module.get_repository("hotels.json", "hoteles")
+        self.assertIs(repo.get("HS5"), repo.get("HS5"))
+        self.assertIs(repo.all()["HS5"], repo.get("HS5"))
+        other = sqlite_store.SqliteRepository(
+            "hotels.json", "hoteles", self.DATABASE
+        )
+        try:
+            other.put("HS5", dict(other.get("HS5"), name="Changed"))
+        finally:
+            other.close()
+        self.assertEqual(repo.get("HS5")["name"], "Changed")
+        self.assertEqual(repo.get("HS5")["reservations"], {"RS5": "C1"})
+
+    def test_errors_raise(self):
+        """Verifica que un error de SQLite se reporta como falla."""
+        repo = repository_module.get_repository("hotels.json", "hoteles")
+        repo._conn.execute(  # pylint: disable=protected-access
+            "CREATE TRIGGER no_hotels BEFORE INSERT ON hotels "
+            "BEGIN SELECT RAISE(ABORT, 'read only'); END"
+        )
+        with self.assertRaises(reporting.StorageError):
+            repo.put("HS6", Hotel("HS6", "N", "L", 1).to_dict())
+        self.assertIsNone(Hotel.create_hotel("HS7", "N", "L", 1))
+        self.assertIsInstance(reporting.last_error(), reporting.StorageError)
+        self.assertFalse(repo.contains("HS6"))
+
+    def test_migrate_from_json(self):
+        """Verifica que la migración copia los registros del JSON."""
+        with open("customers.json", "w", encoding="utf-8") as f:
+            json.dump({"CM1": Customer("CM1", "M", "m@x", "1").to_dict()}, f)
+        sqlite_store.migrate(self.DATABASE, ["customers.json"])
+        self.assertEqual(Customer.display_customer("CM1").name, "M")
+
+
+class TestStream(unittest.TestCase):
+    """Pruebas de la lectura incremental y el índice de posiciones."""
+
+    def setUp(self):
+        """Escribe un archivo de clientes con varios formatos."""
+        cleanup_files()
+        self.data = {
+            f"CS{i}": Customer(f"CS{i}", "Añil ñ" * i, "e@x", "1").to_dict()
+            for i in range(20)
+        }
+        with open("customers.json", "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=4, ensure_ascii=False)
+
+    def tearDown(self):
+        """Limpia los archivos al terminar cada prueba."""
+        repository_module.reset_repositories()
+        cleanup_files()
+
+    def test_iter_records_small_chunks(self):
+        """Verifica que se leen todos los registros con bloques pequeños."""
+        records = dict(stream.iter_records("customers.json", chunk_size=7))
+        self.assertEqual(records, self.data)
+
+    def test_offsets_point_to_records(self):
+        """Verifica que el índice permite leer un registro con seek."""
+        signature, entries = stream.build_index("customers.json")
+        value = stream.read_at("customers.json", *entries["CS7"], signature)
+        self.assertEqual(value, self.data["CS7"])
+
+    def test_display_uses_index_without_full_load(self):
+        """Verifica que consultar en frío no carga el archivo completo."""
+        repository_module.reset_repositories()
+        repo = repository_module.get_repository("customers.json", "clientes")
+        repo.store.load = None  # falla si se intenta una carga completa
+        self.assertEqual(Customer.display_customer("CS3").name, "Añil ñ" * 3)
+        self.assertIsNone(Customer.display_customer("NOPE"))
+        self.assertTrue(os.path.exists("customers.json.idx"))
+
+    def test_stale_index_rebuilt(self):
+        """Verifica que el índice se rehace si el archivo cambió."""
+        stream.build_index("customers.json")
+        self.data["CS1"]["name"] = "Nuevo"
+        with open("customers.json", "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        repository_module.reset_repositories()
+        self.assertEqual(Customer.display_customer("CS1").name, "Nuevo")
+
+    def test_numbers_and_escapes_across_chunks(self):
+        """Verifica números cortados por el bloque y llaves con escapes."""
+        data = {"a\"b": 1500.25, "c\\d": -2e-07, "e": [10, 2.5], "f": 7}
+        with open("customers.json", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        for chunk_size in (1, 2, 3, 5):
+            self.assertEqual(
+                dict(stream.iter_records("customers.json", chunk_size)), data
+            )
+            self.assertEqual(
+                {key: value for key, value, _, _ in
+                 stream.iter_entries("customers.json", chunk_size)}, data
+            )
+
+    def test_invalid_file(self):
+        """Verifica que un archivo corrupto lanza ValueError."""
+        with open("customers.json", "w", encoding="utf-8") as f:
+            f.write('{"a": {"b": 1}, "c": ')
+        with self.assertRaises(ValueError):
+            list(stream.iter_records("customers.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()